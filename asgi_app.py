@@ -0,0 +1,223 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+ASGI application of the currency converter
+- Serves the same `/currency_converter` and `/currency_converter/status`
+endpoints as the flask app, from a single event loop
+- Every request of the process shares one AsyncCurrencyConverter (one
+snapshot of the rates and one in-flight refresh)
+- Conversions at the actual rates carry the same caching headers as the ones
+of the flask app (see `http_caching`), conditional requests get 304
+- No framework is needed, run it with any ASGI server, e.g.
+`uvicorn asgi_app:app`
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import asyncio
+import json
+import time
+from urllib.parse import parse_qsl
+from async_converter import AsyncCurrencyConverter
+import batch_io
+import http_caching
+from converter_class import CurrencyConverter
+
+
+class ConverterApp(object):
+    '''ASGI application of the currency converter
+
+    Attributes:
+        reload_interval (float): the rates file is checked for changes (e.g.
+            by another worker process) at most once per this number of
+            seconds
+    '''
+
+    def __init__(self, converter_factory=CurrencyConverter):
+        '''ConverterApp's __init__ method
+
+        Args:
+            converter_factory (callable): creates the CurrencyConverter
+                (called in a worker thread during the first request)
+        '''
+        self.reload_interval = 1.0
+        self._converter_factory = converter_factory
+        self._converter = None
+        self._converter_task = None
+        self._last_reload = 0.0
+
+    async def __call__(self, scope, receive, send):
+        '''handles an ASGI connection (HTTP requests and lifespan events)
+        '''
+        if scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if scope['method'] != 'GET':
+            await _send_json(send, 405, {'error': 'Method not allowed'})
+            return
+        path = scope['path'].rstrip('/')
+        headers = {}
+        if path == '/currency_converter':
+            status, body, headers = await self.get_cached_conversion(
+                scope.get('query_string', b''), _get_request_headers(scope))
+        elif path == '/currency_converter/status':
+            status, body = await self.get_status()
+        else:
+            status, body = 404, {'error': 'Not found'}
+        await _send_json(send, status, body, headers)
+
+    async def get_cached_conversion(self, query_string, request_headers):
+        '''handles the conversion requests with the HTTP caching
+
+        Args:
+            query_string (bytes): query of the request
+            request_headers (dict of str: str): headers of the request (lower
+                case names)
+
+        Returns:
+            tuple: HTTP status, the dictionary to be sent as JSON (None for
+            304) and the caching headers (dict)
+        '''
+        arguments = _get_arguments(query_string)
+        validators = None
+        if arguments is not None and 'date' not in arguments:
+            converter = await self.get_converter()
+            validators = http_caching.get_validators(converter)
+        if validators is not None and http_caching.is_not_modified(
+                validators,
+                request_headers.get('if-none-match'),
+                request_headers.get('if-modified-since')):
+            return 304, None, http_caching.get_headers(validators)
+        status, body = await self.get_conversion(query_string)
+        if validators is None or status != 200:
+            return status, body, {}
+        actual_validators = http_caching.get_validators(converter)
+        if actual_validators is None or \
+                actual_validators['etag'] != validators['etag']:
+            return status, body, {}
+        return status, body, http_caching.get_headers(actual_validators)
+
+    async def get_conversion(self, query_string):
+        '''handles the conversion requests
+
+        Args:
+            query_string (bytes): query of the request (amount,
+                input_currency, optional output_currency, date and format)
+
+        Returns:
+            tuple: HTTP status and the dictionary to be sent as JSON
+        '''
+        arguments = _get_arguments(query_string)
+        if arguments is None:
+            return 400, {'error': 'Wrong parameters'}
+        converter = await self.get_converter()
+        amount = batch_io.get_amount(arguments.get('amount'))
+        try:
+            result = await converter.convert(
+                amount,
+                arguments['input_currency'],
+                arguments.get('output_currency'),
+                on_date=arguments.get('date'),
+                output_format=arguments.get('format'))
+        except ValueError:
+            return 400, {'error': 'Wrong parameters'}
+        return 200, result
+
+    async def get_status(self):
+        '''returns the actuality of the rates and the state of the refresh
+
+        Returns:
+            tuple: HTTP status and the dictionary to be sent as JSON
+        '''
+        converter = await self.get_converter()
+        status = converter.get_rates_status()
+        for key, value in status.items():
+            if hasattr(value, 'isoformat'):
+                status[key] = value.isoformat()
+        return 200, status
+
+    async def get_converter(self):
+        '''returns the converter shared by every request
+
+        The converter is created on the first call (in a worker thread, it
+        may download the rates). Later calls check, whether the rates file
+        has been changed on disk, at most once per `reload_interval`.
+
+        Returns:
+            :obj:`async_converter.AsyncCurrencyConverter`: the converter
+        '''
+        if self._converter is None:
+            if self._converter_task is None or \
+                    (self._converter_task.done() and
+                     self._converter_task.exception() is not None):
+                loop = asyncio.get_event_loop()
+                self._converter_task = loop.run_in_executor(
+                    None, self._converter_factory)
+            converter = await asyncio.shield(self._converter_task)
+            if self._converter is None:
+                self._converter = AsyncCurrencyConverter(converter)
+                self._last_reload = time.time()
+        if time.time() - self._last_reload >= self.reload_interval:
+            self._last_reload = time.time()
+            await self._converter.reload_if_changed()
+        return self._converter
+
+    async def _handle_lifespan(self, receive, send):
+        '''answers the startup and shutdown events of the server
+        '''
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._converter is not None:
+                    self._converter.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _get_arguments(query_string):
+    '''returns the arguments of a conversion request
+
+    Returns:
+        dict: the arguments, None if they are wrong
+    '''
+    arguments = dict(parse_qsl(query_string.decode('utf-8',
+                                                   errors='replace')))
+    if len(arguments) not in (2, 3, 4, 5) or \
+            'amount' not in arguments or 'input_currency' not in arguments:
+        return None
+    return arguments
+
+
+def _get_request_headers(scope):
+    '''returns the headers of a request as a dictionary with lower case names
+    '''
+    return {name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])}
+
+
+async def _send_json(send, status, body, headers=None):
+    '''sends a JSON response (an empty one, if the body is None)
+    '''
+    response_headers = [(name.lower().encode('latin-1'),
+                         value.encode('latin-1'))
+                        for name, value in sorted((headers or {}).items())]
+    content = b''
+    if body is not None:
+        content = json.dumps(body, sort_keys=True).encode('utf-8')
+        response_headers.append((b'content-type', b'application/json'))
+    response_headers.append((b'content-length',
+                             str(len(content)).encode('ascii')))
+    await send({'type': 'http.response.start',
+                'status': status,
+                'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+app = ConverterApp()
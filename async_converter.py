@@ -0,0 +1,226 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the AsyncCurrencyConverter class
+- AsyncCurrencyConverter is an asyncio front-end of a CurrencyConverter, it
+can serve any number of concurrent conversions from one event loop
+- Conversions of the actual rates are calculated in the loop (no I/O is
+needed, the rates are kept in memory). The symbols map is loaded in the
+thread pool before, whenever it isn't loaded yet
+- Everything blocking (download of the rates, writing and reading of the
+snapshot, downloads of historical rates) runs in a thread pool, so the loop
+is never blocked
+- Concurrent conversions share one in-flight refresh of the rates
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import datetime as dt
+import functools
+from converter_class import (CurrencyConverter, get_conversion_errors,
+                             get_error_message)
+import pytz
+
+
+class AsyncCurrencyConverter(object):
+    '''Asyncio front-end of a CurrencyConverter
+
+    The wrapped converter doesn't refresh the rates during the conversions
+    (its `auto_refresh` is switched off), the refresh is scheduled by this
+    class as a single asyncio task instead.
+
+    Attributes:
+        converter (:obj:`converter_class.CurrencyConverter`): the wrapped
+            converter
+        auto_refresh (bool): If True (default), newer rates are downloaded
+            once they are available
+        refresh_wait (float): How long (in seconds) a conversion waits for
+            the refresh of the rates. After that the conversion uses the
+            current rates. None means waiting until the refresh is finished
+    '''
+
+    def __init__(self, converter=None, executor=None):
+        '''AsyncCurrencyConverter's __init__ method
+
+        Args:
+            converter (:obj:`converter_class.CurrencyConverter`, optional):
+                the converter to be wrapped. Defaults to a new
+                CurrencyConverter (created in the calling thread)
+            executor (:obj:`concurrent.futures.Executor`, optional): executor
+                of the blocking calls. Defaults to an own thread pool
+        '''
+        self.converter = converter if converter is not None \
+            else CurrencyConverter()
+        self.converter.auto_refresh = False
+        self.auto_refresh = True
+        self.refresh_wait = 2.0
+        self._own_executor = executor is None
+        self._executor = executor if executor is not None \
+            else ThreadPoolExecutor(max_workers=4)
+        self._refresh_task = None
+
+    async def convert(self,
+                      input_amount,
+                      raw_input_currency,
+                      raw_output_currency=None,
+                      on_date=None,
+                      output_format=None):
+        '''Converts the input amount into output currency
+
+        The same as `CurrencyConverter.convert`. If newer rates should be
+        available, the conversion waits for the shared refresh at most
+        `self.refresh_wait` seconds.
+
+        Returns:
+            dict: dictionary representation of the response (see
+            `CurrencyConverter.convert`)
+        '''
+        if on_date is not None:
+            return await self._run(self.converter.convert,
+                                   input_amount,
+                                   raw_input_currency,
+                                   raw_output_currency,
+                                   on_date=on_date,
+                                   output_format=output_format)
+        timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+        try:
+            await self._check_rates_actuality(timestamp)
+        except get_conversion_errors() as error:
+            input_dict = self.converter._get_input_dict(input_amount,
+                                                        raw_input_currency)
+            return {'input': input_dict,
+                    'output': {'error': get_error_message(error)}}
+        await self._load_symbols()
+        return self.converter.convert(input_amount,
+                                      raw_input_currency,
+                                      raw_output_currency,
+                                      output_format=output_format)
+
+    async def refresh_rates(self, timestamp=None):
+        '''Refreshes the rates (see `CurrencyConverter.refresh_rates`)
+
+        Only one refresh runs at a time, concurrent callers wait for the same
+        one.
+
+        Args:
+            timestamp (:obj:`datetime.datetime`, optional): If provided, the
+                rates are downloaded only if newer rates should be available
+                at `timestamp`. None forces the download
+
+        Returns:
+            bool: True if newer rates are used after the call
+
+        Raises:
+            ConnectionError: If fixer.io can't be reached
+        '''
+        return await asyncio.shield(self._get_refresh_task(timestamp))
+
+    async def reload_if_changed(self):
+        '''Reloads the rates, if the rates file has been changed (see
+        `CurrencyConverter.reload_if_changed`)
+
+        Returns:
+            bool: True if the rates have been reloaded
+        '''
+        return await self._run(self.converter.reload_if_changed)
+
+    def get_rates_status(self, timestamp=None):
+        '''returns information about the actuality of the rates (see
+        `CurrencyConverter.get_rates_status`) extended with `refreshing`
+        (True while a refresh is running)
+
+        Returns:
+            dict: the status
+        '''
+        rates_status = self.converter.get_rates_status(timestamp)
+        rates_status['refreshing'] = self._refresh_task is not None and \
+            not self._refresh_task.done()
+        return rates_status
+
+    def get_rates_version(self):
+        '''returns the version of the actual rates (see
+        `CurrencyConverter.get_rates_version`)
+
+        Returns:
+            str: the version, None if no rates are available
+        '''
+        return self.converter.get_rates_version()
+
+    def stats(self):
+        '''returns the statistics of the conversions (see
+        `CurrencyConverter.stats`)
+
+        Returns:
+            dict: the statistics
+        '''
+        return self.converter.stats()
+
+    def close(self):
+        '''shuts down the own thread pool
+        '''
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def _check_rates_actuality(self, timestamp):
+        '''waits for the refresh of the rates, if newer rates are available
+
+        Args:
+            timestamp (:obj:`datetime.datetime`): timestamp of conversion
+
+        Raises:
+            ConnectionError: If fixer.io can't be reached
+        '''
+        if not self.auto_refresh:
+            return
+        if not self.converter.get_rates_status(timestamp)['stale']:
+            return
+        refresh_task = self._get_refresh_task(timestamp)
+        try:
+            await asyncio.wait_for(asyncio.shield(refresh_task),
+                                   self.refresh_wait)
+        except asyncio.TimeoutError:
+            return
+
+    async def _load_symbols(self):
+        '''loads the symbols map of the converter in the executor
+
+        The converter would read the symbols file (and write its cache) on
+        the first symbol lookup, i.e. in the loop. The map is dropped after
+        a refresh, which changes the available currencies, so it's checked
+        before every conversion.
+        '''
+        if self.converter._symbols is None:
+            await self._run(self.converter._load_symbols)
+
+    def _get_refresh_task(self, timestamp):
+        '''returns the running refresh task, starts a new one if none runs
+
+        Returns:
+            :obj:`asyncio.Future`: the refresh task
+        '''
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(
+                self._run(self.converter.refresh_rates, timestamp))
+            self._refresh_task.add_done_callback(_retrieve_exception)
+        return self._refresh_task
+
+    async def _run(self, function, *args, **kwargs):
+        '''runs a blocking call in the executor
+        '''
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs))
+
+
+def _retrieve_exception(task):
+    '''
+    marks the exception of a refresh as retrieved (the conversions, which
+    gave up waiting, don't await the task)
+    '''
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,205 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains generators for streaming batch conversions
+- Conversions are read from NDJSON or CSV lines
+- They are converted by `CurrencyConverter.iter_convert_batch`
+- The results are written as NDJSON or CSV lines
+Every step is a generator, so a stream of any length is processed in
+constant memory.
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import csv
+import io
+import itertools
+import json
+from converter_class import get_error_message
+import currency_exceptions as exceptions
+
+
+CSV_INPUT_FIELDS = ('amount', 'input_currency', 'output_currency')
+CSV_OUTPUT_FIELDS = ('amount', 'input_currency', 'output_currency',
+                     'output_amount', 'error')
+
+
+def get_amount(raw_amount):
+    '''converts the amount to float, if possible
+
+    Args:
+        raw_amount: amount as received (e.g. string from a request or a file)
+
+    Returns:
+        float or the original `raw_amount`, if it can't be converted
+    '''
+    try:
+        return float(raw_amount)
+    except (TypeError, ValueError):
+        return raw_amount
+
+
+def get_conversion(raw_item):
+    '''gets the parameters of `convert` from a conversion item
+
+    Args:
+        raw_item (dict): conversion item with `amount`, `input_currency` and
+            optional `output_currency` keys
+
+    Returns:
+        tuple: (amount, input currency, output currency) or None if the item
+        isn't a valid conversion item
+    '''
+    if not isinstance(raw_item, dict) or \
+            raw_item.get('amount') in (None, ''):
+        return None
+    raw_input_currency = raw_item.get('input_currency')
+    raw_output_currency = raw_item.get('output_currency') or None
+    if not isinstance(raw_input_currency, str):
+        return None
+    if raw_output_currency is not None and \
+            not isinstance(raw_output_currency, str):
+        return None
+    amount = get_amount(raw_item['amount'])
+    return amount, raw_input_currency, raw_output_currency
+
+
+def get_invalid_input(raw_item):
+    '''gets the input node of the error result of an invalid item
+
+    The submitted values are echoed, so the failed item can be identified.
+
+    Args:
+        raw_item: the invalid conversion item, None if it couldn't be read
+
+    Returns:
+        dict: raw `amount` and `currency` of the item, None if missing
+    '''
+    if not isinstance(raw_item, dict):
+        return {'amount': None, 'currency': None}
+    return {'amount': raw_item.get('amount'),
+            'currency': raw_item.get('input_currency')}
+
+
+def read_ndjson(lines):
+    '''reads conversions from NDJSON lines
+
+    Args:
+        lines (iterable): lines (bytes or str), one JSON object per line.
+            Empty lines are skipped
+
+    Yields:
+        tuple: (amount, input currency, output currency), the decoded item
+        for lines, which aren't valid conversion items, or None for lines,
+        which aren't valid JSON
+    '''
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            raw_item = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        conversion = get_conversion(raw_item)
+        yield raw_item if conversion is None else conversion
+
+
+def read_csv(lines):
+    '''reads conversions from CSV lines
+
+    The first line is the header, it has to contain the `amount` and
+    `input_currency` columns. The `output_currency` column is optional, an
+    empty value means every available currency.
+
+    Args:
+        lines (iterable): lines (str) of the CSV file
+
+    Yields:
+        tuple: (amount, input currency, output currency) or the row (dict)
+        for rows, which aren't valid conversion items
+    '''
+    for row in csv.DictReader(lines):
+        conversion = get_conversion(row)
+        yield row if conversion is None else conversion
+
+
+def convert_stream(converter, conversions):
+    '''converts a stream of conversions
+
+    Args:
+        converter (:obj:`converter_class.CurrencyConverter`): converter used
+            for every conversion (the rates are checked only once)
+        conversions (iterable): (amount, input currency, output currency)
+            triples. Items, which aren't valid conversions, are passed as
+            read (see `get_invalid_input`)
+
+    Yields:
+        dict: output of `CurrencyConverter.convert` for every item
+    '''
+    all_conversions, valid_conversions = itertools.tee(conversions)
+    results = converter.iter_convert_batch(conversion for conversion
+                                           in valid_conversions
+                                           if isinstance(conversion, tuple))
+    for conversion in all_conversions:
+        if isinstance(conversion, tuple):
+            yield next(results)
+            continue
+        err_str = get_error_message(exceptions.ConversionError())
+        yield {'input': get_invalid_input(conversion),
+               'output': {'error': err_str}}
+
+
+def write_ndjson(results):
+    '''formats conversion results as NDJSON lines
+
+    Args:
+        results (iterable): outputs of `CurrencyConverter.convert`
+
+    Yields:
+        str: compact JSON line for every result
+    '''
+    for result in results:
+        yield json.dumps(result, sort_keys=True) + '\n'
+
+
+def write_csv(results):
+    '''formats conversion results as CSV lines
+
+    Every output currency of a result gets its own row. Results with an
+    error get one row with the error message.
+
+    Args:
+        results (iterable): outputs of `CurrencyConverter.convert`
+
+    Yields:
+        str: CSV lines, starting with the header
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    def format_row(row):
+        '''
+        returns a single row formatted as CSV line
+        '''
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    yield format_row(CSV_OUTPUT_FIELDS)
+    for result in results:
+        input_dict = result['input']
+        output_dict = result['output']
+        if 'error' in output_dict:
+            yield format_row((input_dict['amount'], input_dict['currency'],
+                              '', '', output_dict['error']))
+            continue
+        for currency in sorted(output_dict):
+            yield format_row((input_dict['amount'], input_dict['currency'],
+                              currency, output_dict[currency], ''))
@@ -6,10 +6,27 @@ Created on 27. 11. 2017
 This module contains code for the CurrencyConverter class
 - CurrencyConverter can be used to convert amounts of money between different
 currencies
-- Actual conversion rates are downloaded from fixer.io website
-- After downloading the actual rates, they are stored in a pickle file
-- This pickle can be used to convert amounts in offline (of course the
+- Actual conversion rates are downloaded from fixer.io website (or from
+another provider, see `rate_providers`)
+- After downloading the actual rates, they are stored in a snapshot file (see
+`rates_snapshot`, older pickle files can be still read). Rates pickled by
+older versions into the default `rates.pickle` are used, until the first
+snapshot is written next to it
+- This snapshot can be used to convert amounts in offline (of course the
 actuality is questionable in offline mode)
+- Historical rates are downloaded on demand and stored day by day in a
+history file (see `rates_history`), so amounts can be converted at the rates
+of a past day
+- The results of the most frequent conversions can be cached (see
+`result_cache`), the cache is keyed by the version of the rates
+- The whole cross-rate matrix can be exported (JSON, CSV or binary, see
+`matrix_export`), the exports are made once per rates snapshot
+- The conversions are instrumented (latencies of their stages, errors and
+refreshes of the rates, see `converter_metrics`), the statistics are returned
+by `stats`
+
+Heavy modules (requests, numpy, concurrent.futures) are imported only when
+they are needed, so a single conversion from the rates file starts fast.
 
 Google style documentation is used in this file. See guideline here:
 http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
@@ -18,15 +35,114 @@ http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
 from collections import defaultdict
 import datetime as dt
 import io
-import decimal
 import json
+import math
 import os
 import pickle
 import numbers
-import requests
-from requests.exceptions import ConnectionError
+import sys
+import threading
+import time
+import converter_metrics
+from currency_index import CurrencyIndex
 import currency_exceptions as exceptions
+import currency_units
+from file_lock import FileLock
+import fixed_point
+import matrix_export
 import pytz
+from rate_providers import HttpJsonProvider
+from rates_history import RatesHistory
+from rates_matrix import CrossRateMatrix, calculate_cross_rate
+import rates_snapshot
+import response_json
+from result_cache import ResultCache
+import symbols_cache
+
+
+ERROR_MESSAGES = (
+    (exceptions.ConversionError,
+     'Conversion error, check the input parameters'),
+    (exceptions.CurrencyError,
+     'Conversion error, the currency can\'t be recognized'),
+    (exceptions.TooManyCurrencies,
+     'Conversion error, the input symbol represents more than one ' +
+     'currency, try to use 3-letter currency code'),
+    (exceptions.DateError,
+     'Conversion error, the date is not valid or out of range'),
+)
+
+CONNECTION_ERROR_MESSAGE = 'Connection error!'
+
+CONVERSION_ERRORS = tuple(error_type for error_type, _ in ERROR_MESSAGES)
+
+FIRST_HISTORICAL_DAY = dt.date(1999, 1, 4)
+
+DEFAULT_RATES_FILE = 'rates.snapshot'
+LEGACY_RATES_FILE = 'rates.pickle'
+
+# Number of kept matrix exports (per snapshot and format) and matrices of
+# past days
+MATRIX_EXPORTS_CACHED = 16
+HISTORICAL_MATRICES_CACHED = 8
+
+
+def get_conversion_errors():
+    '''returns the exceptions turned into error messages by `convert`
+
+    These are the `CONVERSION_ERRORS` and the ConnectionError of requests.
+    The latter can't be raised before requests is imported (by the download
+    of the rates), so it is added only after that. The function is called in
+    the except clauses, i.e. only if an exception has been raised.
+
+    Returns:
+        tuple: the exception types
+    '''
+    requests_exceptions = sys.modules.get('requests.exceptions')
+    if requests_exceptions is None:
+        return CONVERSION_ERRORS
+    return CONVERSION_ERRORS + (requests_exceptions.ConnectionError,)
+
+
+def get_error_message(error):
+    '''returns the error message of `convert` for an exception
+
+    Args:
+        error (Exception): one of the `get_conversion_errors()`
+
+    Returns:
+        str: error message placed into the output node of the result
+    '''
+    for error_type, message in ERROR_MESSAGES:
+        if isinstance(error, error_type):
+            return message
+    if isinstance(error, get_conversion_errors()):
+        return CONNECTION_ERROR_MESSAGE
+    raise error
+
+
+def get_error_name(error):
+    '''returns the name of an error of `convert` counted by the metrics
+
+    Args:
+        error (Exception): one of the `get_conversion_errors()`
+
+    Returns:
+        str: one of the `converter_metrics.ERROR_NAMES`
+    '''
+    for error_type, _ in ERROR_MESSAGES:
+        if isinstance(error, error_type):
+            return error_type.__name__
+    return 'ConnectionError'
+
+
+def _copy_result(result):
+    '''
+    returns a copy of a result of `convert`, which can be modified without
+    modifying the original one
+    '''
+    return {'input': dict(result['input']),
+            'output': dict(result['output'])}
 
 
 class CurrencyConverter(object):
@@ -36,37 +152,112 @@ class CurrencyConverter(object):
         available_currencies(:obj:`list` of :obj:`str`): List of currently
             available currencies from fixer.io
         actual_rates (dict): Dictionary of conversion rates
+        auto_refresh (bool): If True (default), newer rates are downloaded
+            during the conversion, once they are available. Set to False, if
+            the rates are refreshed in the background (see
+            `rates_refresher.RatesRefresher`)
+        refresh_wait (float): How long (in seconds) a conversion waits for
+            the rates being refreshed by another thread or process. After
+            that the conversion uses the current rates. None means waiting
+            until the refresh is finished
+        refresh_retry_interval (float): If a refresh of the rates fails, no
+            other thread or process tries to refresh them for this number of
+            seconds (they use the current rates)
+        provider (:obj:`rate_providers.RateProvider`): Source of the rates
+        max_parallel_fetches (int): Maximal number of rates (base currencies)
+            downloaded at the same time
+        output_format (str): Format of the output amounts of `convert` and
+            `convert_batch` (see `currency_units.OUTPUT_FORMATS`): 'float'
+            (default) - floats rounded to 2 decimal places, 'decimal' -
+            strings rounded to the decimal places of the output currency
+            (ISO 4217, e.g. 0 for JPY), 'minor' - integer minor units of the
+            output currency (e.g. cents)
+        result_cache (:obj:`result_cache.ResultCache`): Cache of the
+            successful conversions at the actual rates (results of `convert`
+            and `convert_json`). None (default) means no caching
+        metrics (:obj:`converter_metrics.ConverterMetrics`): Latencies of
+            the stages of the conversions, counts of the errors and of the
+            refreshes of the rates (see `stats`)
     '''
 
     def __init__(self,
                  symbols_file=r'txt/symbols.txt',
                  symbols_sep='\t',
-                 rates_file='rates.pickle'):
+                 rates_file=DEFAULT_RATES_FILE,
+                 extra_bases=(),
+                 history_file='rates.history',
+                 provider=None):
         '''CurrencyConverter's __init__ method
 
         Args:
             symbols_file (str): Description of `param1`.
             symbols_sep (str): Description of `param2`. Multiple
                 lines are supported.
-            rates_file (str): Description of `param3`.
+            rates_file (str): Description of `param3`. If a snapshot with
+                the default name doesn't exist yet, the rates are read from
+                the legacy `rates.pickle` in the same directory (if there is
+                one)
+            extra_bases (:obj:`tuple` of :obj:`str`): 3-letter codes of
+                currencies, whose direct rates are downloaded together with
+                the rates of the base currency (EUR). They are stored under
+                `actual_rates['rates'][currency]`
+            history_file (str): path of the store of the historical rates
+                (see `rates_history.RatesHistory`)
+            provider (:obj:`rate_providers.RateProvider`, optional): Source
+                of the rates. Defaults to `rate_providers.HttpJsonProvider`
+                (fixer.io)
         '''
-        self._api_base_url = 'https://api.fixer.io'
+        self.provider = provider if provider is not None \
+            else HttpJsonProvider()
         self._base_currency = 'EUR'
+        self._extra_bases = tuple(currency for currency in extra_bases
+                                  if currency != self._base_currency)
+        self.max_parallel_fetches = 4
+        self.output_format = currency_units.FLOAT_FORMAT
         self.available_currencies = []
-        self._symbols_map = {}
+        self._symbols = None
+        self._currency_index = CurrencyIndex((), {})
+        self._symbols_file = symbols_file
+        self._symbols_sep = symbols_sep
         self._rates_file = rates_file
+        self._rates_file_signature = None
+        self._rates_matrix = None
+        self._response_serializer = None
+        self.result_cache = None
+        self.metrics = converter_metrics.ConverterMetrics()
+        self._matrix_exports = ResultCache(MATRIX_EXPORTS_CACHED)
+        self._historical_matrices = ResultCache(HISTORICAL_MATRICES_CACHED)
+        self._history_file = history_file
+        self._history = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self.auto_refresh = True
+        self.refresh_wait = 2.0
+        self.refresh_retry_interval = 60.0
         try:
-            self.actual_rates = self._check_rates_file(self._rates_file)
+            self.actual_rates = self._check_rates_file(
+                self._get_initial_rates_file())
             self.available_currencies = self._get_available_currencies()
-        except ConnectionError:
+        except exceptions.get_connection_error():
             return
-        if symbols_file is not None:
-            self._symbols_map = self._get_symbols_map(symbols_file, symbols_sep)
+        self.provider.validators = dict(self.actual_rates.get('validators',
+                                                              {}))
+        self._currency_index = CurrencyIndex(self.available_currencies, {})
+
+    @property
+    def _symbols_map(self):
+        '''dict: maps the utf-8 encoded symbols to their 3-letter currency
+        codes (loaded on the first access, see `_load_symbols`)
+        '''
+        self._load_symbols()
+        return self._symbols
 
     def convert(self,
                 input_amount,
                 raw_input_currency,
-                raw_output_currency=None):
+                raw_output_currency=None,
+                on_date=None,
+                output_format=None):
         '''Method for currency conversion
         Converts the input amount into output currency. The result is a
         dictionary.
@@ -80,6 +271,14 @@ class CurrencyConverter(object):
             raw_output_currency(:obj: `str`, optional): The output currency.
                 Defaults to None. In case of None, the amount is converted to
                 every available currency (self.available_currencies)
+            on_date(:obj:`datetime.date` or :obj:`str`, optional): The day
+                of the conversion rates (date or 'YYYY-MM-DD' string).
+                Defaults to None, which means the actual rates. The rates of
+                past days are taken from the history file, missing days are
+                downloaded from fixer.io and stored
+            output_format(:obj:`str`, optional): Format of the output
+                amounts, 'float', 'decimal' or 'minor'. Defaults to None,
+                which means `self.output_format`
 
         Returns:
             dict: dictionary representation of the response
@@ -100,47 +299,371 @@ class CurrencyConverter(object):
             2. Unknown currency - a not known currency is provided
             3. Amount is not a number
             4. The input currency symbol represent more than one currency
+            5. The date is not valid (or it's in the future)
 
             Other than that if you provide a symbol representing more than one
             currency as output currency, than the amount is converted to all
             currencies represented by that symbol. (E.g. $ can represent USD,
             AUD, NZD, etc.)
 
+        Raises:
+            ValueError: If the output format isn't known
         '''
+        output_format = currency_units.check_output_format(
+            output_format or self.output_format)
+        cache_key = None
+        if on_date is None:
+            cache_key = self._get_result_cache_key('dict',
+                                                   input_amount,
+                                                   raw_input_currency,
+                                                   raw_output_currency,
+                                                   output_format)
+        if cache_key is not None:
+            cached_result = self.result_cache.get(cache_key)
+            if cached_result is not None:
+                return _copy_result(cached_result)
         conversion_result = {}
         input_dict = self._get_input_dict(input_amount,
                                           raw_input_currency)
         conversion_result['input'] = input_dict
         conversion_result['output'] = {}
+        metrics = self.metrics
         try:
+            started = time.perf_counter()
             input_currency = self._check_input_currency(raw_input_currency)
             output_currencies = self._check_output_currency(input_currency,
                                                             raw_output_currency)
             self._check_input_amount(input_amount)
+            started = metrics.observe_since(converter_metrics.RESOLUTION_STAGE,
+                                            started)
             timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
-            self._check_rates_actuality(timestamp=timestamp)
+            day = self._check_date(on_date, timestamp)
+            if day is None:
+                self._check_rates_actuality(timestamp=timestamp)
+                started = metrics.observe_since(
+                    converter_metrics.ACTUALITY_STAGE, started)
             conversion_result['input'] = self._get_input_dict(input_amount,
                                                               input_currency)
-            output_dict = self._get_all_conversions(input_amount,
-                                                    input_currency,
-                                                    output_currencies)
+            if day is None:
+                output_dict = self._get_all_conversions(input_amount,
+                                                        input_currency,
+                                                        output_currencies,
+                                                        output_format)
+            else:
+                output_dict = self._get_historical_conversions(
+                    input_amount, input_currency, output_currencies,
+                    raw_output_currency, day, output_format)
+            metrics.observe_since(converter_metrics.CALCULATION_STAGE, started)
             conversion_result['output'] = output_dict
-        except exceptions.ConversionError:
-            err_str = 'Conversion error, check the input parameters'
-            conversion_result['output']['error'] = err_str
-        except exceptions.CurrencyError:
-            err_str = 'Conversion error, the currency can\'t be' + \
-                      ' recognized'
+        except get_conversion_errors() as error:
+            metrics.count_error(get_error_name(error))
+            err_str = get_error_message(error)
             conversion_result['output']['error'] = err_str
-        except exceptions.TooManyCurrencies:
-            err_str = 'Conversion error, the input symbol represents more ' + \
-                      'than one currency, try to use 3-letter currency code'
-            conversion_result['output']['error'] = err_str
-        except ConnectionError:
-            err_str = 'Connection error!'
+            return conversion_result
+        if cache_key is not None:
+            self.result_cache.put(cache_key, _copy_result(conversion_result))
+        return conversion_result
+
+    def convert_json(self,
+                     input_amount,
+                     raw_input_currency,
+                     raw_output_currency=None,
+                     on_date=None,
+                     output_format=None):
+        '''Converts the input amount into output currency, the result is
+        compact JSON
+
+        The parameters are the same as the parameters of `convert`. A
+        successful conversion at the actual rates is serialized straight from
+        the row of the cross-rate matrix (see
+        `response_json.ResponseSerializer`), no intermediate dictionaries are
+        built. Other results (errors, historical rates, other amount types)
+        are serialized from the result of `convert`. The JSON of successful
+        conversions is kept in `self.result_cache` (if there is one). The
+        serialization stage of the metrics includes the calculation of the
+        amounts, they are calculated while serializing.
+
+        Returns:
+            bytes: the same JSON as `response_json.dumps(self.convert(...))`
+            (compact, sorted keys)
+
+        Raises:
+            ValueError: If the output format isn't known
+        '''
+        output_format = currency_units.check_output_format(
+            output_format or self.output_format)
+        if on_date is not None or type(input_amount) not in (float, int) or \
+                type(input_amount) is float and \
+                not math.isfinite(input_amount):
+            return response_json.dumps(self.convert(input_amount,
+                                                    raw_input_currency,
+                                                    raw_output_currency,
+                                                    on_date,
+                                                    output_format))
+        cache_key = self._get_result_cache_key('json',
+                                               input_amount,
+                                               raw_input_currency,
+                                               raw_output_currency,
+                                               output_format)
+        if cache_key is not None:
+            cached_response = self.result_cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+        metrics = self.metrics
+        try:
+            started = time.perf_counter()
+            input_currency = self._check_input_currency(raw_input_currency)
+            output_currencies = self._check_output_currency(input_currency,
+                                                            raw_output_currency)
+            started = metrics.observe_since(converter_metrics.RESOLUTION_STAGE,
+                                            started)
+            timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+            self._check_rates_actuality(timestamp=timestamp)
+            started = metrics.observe_since(converter_metrics.ACTUALITY_STAGE,
+                                            started)
+        except get_conversion_errors() as error:
+            metrics.count_error(get_error_name(error))
+            return response_json.dumps({
+                'input': self._get_input_dict(input_amount,
+                                              raw_input_currency),
+                'output': {'error': get_error_message(error)}})
+        try:
+            response = self._get_response_serializer().serialize(
+                input_amount, input_currency, output_currencies,
+                output_format, self._calculate_formatted_amount)
+        except exceptions.ConversionError as error:
+            metrics.count_error(get_error_name(error))
+            return response_json.dumps({
+                'input': self._get_input_dict(input_amount, input_currency),
+                'output': {'error': get_error_message(error)}})
+        metrics.observe_since(converter_metrics.SERIALIZATION_STAGE, started)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, response)
+        return response
+
+    def value_portfolio(self,
+                        holdings,
+                        raw_target_currency,
+                        output_format=None,
+                        rounding=currency_units.LINES_ROUNDING):
+        '''Values a portfolio of holdings in many currencies in one target
+        currency
+
+        The rates of every holding are read from the column of the target
+        currency of the cross-rate matrix in one pass. The value of every
+        line is rounded like in `convert`. The total is either the sum of the
+        rounded lines (`rounding='lines'`, the lines add up to the total), or
+        the exact sum of the unrounded values rounded once
+        (`rounding='total'`, see `fixed_point.get_minor_units_of_sum`).
+
+        Args:
+            holdings (dict): maps currencies (3-letter codes or symbols, see
+                `convert`) to the held amounts
+            raw_target_currency (str): currency of the values (3-letter code
+                or a symbol of a single currency)
+            output_format (str, optional): format of the values (see
+                `currency_units.OUTPUT_FORMATS`). Defaults to
+                `self.output_format`
+            rounding (str): rounding point, 'lines' (default) or 'total'
+
+        Returns:
+            dict: dictionary representation of the valuation
+
+                {
+                    "input": {
+                        "holdings": the holdings as provided,
+                        "currency": 3-letter target currency
+                    },
+                    "output": {
+                        "lines": {3-letter currency: value of the holding},
+                        "total": value of the portfolio
+                    }
+                }
+
+            If a holding (or the target currency) can't be converted, the
+            output node holds only the error message (the same as in
+            `convert`). Holdings resolving to the same currency (e.g. 'EUR'
+            and '€') are a conversion error too.
+
+        Raises:
+            ValueError: If the output format or the rounding point isn't
+            known
+        '''
+        output_format = currency_units.check_output_format(
+            output_format or self.output_format)
+        rounding = currency_units.check_rounding_point(rounding)
+        valuation = {'input': {'holdings': holdings,
+                               'currency': raw_target_currency},
+                     'output': {}}
+        try:
+            target_currency = self._check_input_currency(raw_target_currency)
+            currencies = []
+            for raw_currency, amount in holdings.items():
+                currencies.append(self._check_input_currency(raw_currency))
+                self._check_input_amount(amount)
+            if len(set(currencies)) != len(currencies):
+                raise exceptions.ConversionError
+            timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+            self._check_rates_actuality(timestamp=timestamp)
+            valuation['input']['currency'] = target_currency
+            valuation['output'] = self._get_portfolio_values(
+                currencies, list(holdings.values()), target_currency,
+                output_format, rounding)
+        except get_conversion_errors() as error:
+            self.metrics.count_error(get_error_name(error))
+            valuation['output'] = {'error': get_error_message(error)}
+        return valuation
+
+    def export_rates_matrix(self,
+                            export_format=matrix_export.JSON_EXPORT,
+                            on_date=None):
+        '''Exports the whole cross-rate matrix (the rates between every pair
+        of currencies)
+
+        The export is made only once for every rates snapshot and format,
+        the matrices of past days are kept as well (see
+        `MATRIX_EXPORTS_CACHED` and `HISTORICAL_MATRICES_CACHED`).
+
+        Args:
+            export_format (str): 'json' (default), 'csv' or 'binary' (see
+                `matrix_export`)
+            on_date (:obj:`datetime.date` or str, optional): day of the rates
+                (date or 'YYYY-MM-DD' string). None means the actual rates
+
+        Returns:
+            bytes: the exported matrix
+
+        Raises:
+            ValueError: If the export format isn't known
+            exceptions.DateError: If the date isn't valid
+            ConnectionError: If the rates can't be retrieved
+            exceptions.FixerError: If the connection limits on fixer.io are
+            exceeded
+        '''
+        export_format = matrix_export.check_export_format(export_format)
+        timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+        day = self._check_date(on_date, timestamp)
+        if day is not None:
+            rates_matrix = self._get_historical_matrix(day)
+        elif not self.available_currencies:
+            raise exceptions.get_connection_error()
+        else:
+            self._check_rates_actuality(timestamp=timestamp)
+            rates_matrix = self._get_rates_matrix()
+        key = (rates_matrix.version, export_format)
+        exported_matrix = self._matrix_exports.get(key)
+        if exported_matrix is None:
+            exported_matrix = matrix_export.export_matrix(rates_matrix,
+                                                          export_format)
+            self._matrix_exports.put(key, exported_matrix)
+        return exported_matrix
+
+    def convert_many(self,
+                     input_amounts,
+                     raw_input_currencies,
+                     raw_output_currency=None):
+        '''Method for bulk currency conversion
+        Converts many amounts at once. Every distinct currency is checked only
+        once, the rates are checked only once and the amounts are converted
+        in vectorized form (see `vector_conversion.round_amounts`). The
+        output amounts are the same as the ones returned by `convert`.
+
+        Args:
+            input_amounts (:obj:`list` or :obj:`numpy.ndarray`): amounts to
+                convert
+            raw_input_currencies (:obj:`str` or :obj:`list` of :obj:`str`):
+                input currency of every amount (3-letter codes or symbols).
+                If a single string is provided, it is used for every amount
+            raw_output_currency(:obj: `str`, optional): The output currency.
+                Works the same way as in `convert` (None means every
+                available currency, a symbol can mean more currencies)
+
+        Returns:
+            dict: columnar representation of the response
+
+                {
+                    "input": {
+                        "amount": array of the amounts (float64)
+                        "currency": array of 3-letter input currencies
+                    },
+                    "output": {
+                        currency_code: array of the output amounts
+                    },
+                    "errors": {
+                        row_number: error message
+                    }
+                }
+
+            Note: rows with an unknown input currency (or a symbol
+            representing more currencies) are listed in the errors node,
+            their output amounts are NaN. Output amounts of rows, where
+            `convert` would omit the output currency (the input currency
+            itself), are NaN as well, currencies omitted for every row are
+            left out of the output node. Errors concerning every row (e.g.
+            ConnectionError, unknown output currency) are returned in the
+            output node the same way as in `convert`.
+        '''
+        import numpy as np
+        conversion_result = {}
+        conversion_result['input'] = self._get_input_dict(
+            input_amounts, raw_input_currencies)
+        conversion_result['output'] = {}
+        conversion_result['errors'] = {}
+        try:
+            amounts = self._get_amounts_array(input_amounts)
+            raw_currencies = self._get_currencies_array(raw_input_currencies,
+                                                        len(amounts))
+            tokens, token_rows = np.unique(raw_currencies,
+                                           return_inverse=True)
+            input_currencies = []
+            for token in tokens:
+                try:
+                    input_currencies.append(self._check_input_currency(token))
+                except (exceptions.CurrencyError,
+                        exceptions.TooManyCurrencies) as error:
+                    input_currencies.append(get_error_message(error))
+            output_currencies = self._check_output_currency(
+                None, raw_output_currency)
+            timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+            self._check_rates_actuality(timestamp=timestamp)
+            conversion_result['input'] = self._get_input_dict(
+                amounts, np.empty(len(amounts), dtype=object))
+            conversion_result['output'], conversion_result['errors'] = \
+                self._get_all_conversions_many(amounts,
+                                               conversion_result['input'],
+                                               input_currencies,
+                                               token_rows,
+                                               raw_output_currency,
+                                               output_currencies)
+        except get_conversion_errors() as error:
+            self.metrics.count_error(get_error_name(error))
+            err_str = get_error_message(error)
             conversion_result['output']['error'] = err_str
         return conversion_result
 
+    def reload_if_changed(self):
+        '''Reloads the conversion rates, if the rates file has been changed
+
+        Compares the modification time and size of the rates file with the
+        ones recorded during the last load. The rates (and the symbols map,
+        which depends on the available currencies) are reloaded only if the
+        file on disk differs, so this method is cheap enough to be called
+        before every conversion of a long living converter.
+
+        Returns:
+            bool: True if the rates have been reloaded, otherwise False
+        '''
+        signature = self._get_file_signature(self._rates_file)
+        if signature is None or signature == self._rates_file_signature:
+            return False
+        with self._lock:
+            if signature == self._rates_file_signature:
+                return False
+            actual_rates = self._load_rates_file(self._rates_file)
+            self._rates_file_signature = signature
+            self._set_actual_rates(actual_rates)
+        return True
+
     def stringify_output(self, conversion_dict):
         '''Dumps the output of `convert` into json
 
@@ -157,8 +680,9 @@ class CurrencyConverter(object):
     def _check_input_currency(self, raw_input_currency):
         '''Checks whether the `raw_input_currency` is in correct format
 
-        Checks whether the `raw_input_currency` is a symbol or 3-letter code.
-        At the end returns 3-letter currency code.
+        Checks whether the `raw_input_currency` is a symbol or 3-letter code
+        (see `currency_index.CurrencyIndex` for the accepted tokens). At the
+        end returns 3-letter currency code.
 
         Args:
             raw_input_currency (str): string representing the input currency to
@@ -173,26 +697,29 @@ class CurrencyConverter(object):
             exceptions.TooManyCurrencies: If the symbol represents more than
                 one currency
             exceptions.CurrencyError: If an unknown currency is provided
+            TypeError: If the currency isn't a string
         '''
         if not self.available_currencies:
-            raise ConnectionError
-        real_input_currency = raw_input_currency
-        b_input_currency = bytes(raw_input_currency, encoding='utf-8')
-        if b_input_currency in self._symbols_map.keys():
-            input_currencies = self._symbols_map[b_input_currency]
-            if len(input_currencies) != 1:
-                raise exceptions.TooManyCurrencies
-            real_input_currency = input_currencies[0]
-        if real_input_currency in self.available_currencies:
-            return real_input_currency
-        raise exceptions.CurrencyError
+            raise exceptions.get_connection_error()
+        if not isinstance(raw_input_currency, str):
+            raise TypeError('The currency must be a string')
+        input_currencies = self._currency_index.inputs.get(raw_input_currency)
+        if input_currencies is None and self._load_symbols():
+            input_currencies = self._currency_index.inputs.get(
+                raw_input_currency)
+        if input_currencies is None:
+            raise exceptions.CurrencyError
+        if len(input_currencies) != 1:
+            raise exceptions.TooManyCurrencies
+        return input_currencies[0]
 
     def _check_output_currency(self, real_input_currency, raw_output_currency):
         '''Checks whether the `raw_output_currency` is in correct format
 
         Checks whether the `raw_output_currency` is an existing symbol,
-        3-letter code or None. At the end returns a list of 3-letter output
-        currencies.
+        3-letter code or None. At the end returns a tuple of 3-letter output
+        currencies. The tuples are precomputed for every input currency (see
+        `currency_index.CurrencyIndex`).
 
         Args:
             real_input_currency (str): 3-letter input currency (output of
@@ -201,28 +728,55 @@ class CurrencyConverter(object):
                 to be checked by this method
 
         Returns:
-            (:obj:`list` of :obj:`str`): list of 3-letter currency codes. The
-                amount value will be converted to all of these currencies
+            (:obj:`tuple` of :obj:`str`): tuple of 3-letter currency codes.
+                The amount value will be converted to all of these currencies
 
         Raises:
             exceptions.CurrencyError: If an unknown currency is provided
+            TypeError: If the currency isn't a string (or None)
+        '''
+        if raw_output_currency is not None and \
+                not isinstance(raw_output_currency, str):
+            raise TypeError('The currency must be a string')
+        variants = self._currency_index.outputs.get(raw_output_currency)
+        if variants is None and self._load_symbols():
+            variants = self._currency_index.outputs.get(raw_output_currency)
+        if variants is None:
+            raise exceptions.CurrencyError
+        return variants.get(real_input_currency, variants[None])
+
+    def _check_date(self, on_date, timestamp):
+        '''Checks the day of a historical conversion
+
+        Args:
+            on_date (:obj:`datetime.date` or :obj:`str`): the day of the
+                conversion rates, date or 'YYYY-MM-DD' string. None means the
+                actual rates
+            timestamp (:obj:`datetime.datetime`): current time (CET)
+
+        Returns:
+            :obj:`datetime.date`: the day, or None if the actual rates have to
+            be used (`on_date` is None or today)
+
+        Raises:
+            exceptions.DateError: If the date can't be parsed, it's in the
+            future or before the first published rates
         '''
-        if raw_output_currency is None:
-            output_currencies = [currency for currency
-                                 in self.available_currencies
-                                 if currency != real_input_currency]
-            return output_currencies
-        b_output_currency = bytes(raw_output_currency, encoding='utf-8')
-        if b_output_currency in self._symbols_map.keys():
-            possible_currencies = self._symbols_map[b_output_currency]
-            output_currencies = list(set(self.available_currencies) &
-                                     set(possible_currencies) -
-                                     set([real_input_currency]))
-            return output_currencies
-        if raw_output_currency in self.available_currencies:
-            output_currencies = [raw_output_currency]
-            return output_currencies
-        raise exceptions.CurrencyError
+        if on_date is None:
+            return None
+        if isinstance(on_date, dt.datetime):
+            on_date = on_date.date()
+        elif not isinstance(on_date, dt.date):
+            try:
+                on_date = dt.datetime.strptime(str(on_date), '%Y-%m-%d').date()
+            except ValueError:
+                raise exceptions.DateError
+        today = timestamp.date()
+        if on_date > today or on_date < FIRST_HISTORICAL_DAY:
+            raise exceptions.DateError
+        if on_date == today:
+            return None
+        return on_date
 
     def _check_input_amount(self, input_amount):
         '''Checks whether the `input_amount` is a numeric value
@@ -240,13 +794,161 @@ class CurrencyConverter(object):
         if not isinstance(input_amount, numbers.Number):
             raise exceptions.ConversionError
 
+    def convert_batch(self, conversions):
+        '''Converts a batch of independent conversion requests
+
+        Args:
+            conversions (iterable): (input_amount, raw_input_currency,
+                raw_output_currency) triples, the same parameters as the
+                parameters of `convert`
+
+        Returns:
+            (:obj:`list` of :obj:`dict`): the results of `convert` for every
+            conversion, in the same order
+        '''
+        return list(self.iter_convert_batch(conversions))
+
+    def iter_convert_batch(self, conversions):
+        '''Lazy version of `convert_batch`
+
+        The results are yielded one by one, so the conversions can be streamed
+        from and to a file or socket. The actuality of the rates is checked
+        only once, before the first conversion. Each distinct pair of input
+        and output currencies is checked (and its conversion rates looked up)
+        only once per batch. The output amounts are formatted according to
+        `self.output_format`.
+
+        Args:
+            conversions (iterable): (input_amount, raw_input_currency,
+                raw_output_currency) triples
+
+        Yields:
+            dict: the result of `convert` for the conversion
+        '''
+        output_format = currency_units.check_output_format(
+            self.output_format)
+        resolved_pairs = {}
+        rates_error = None
+        if self.available_currencies:
+            try:
+                timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+                self._check_rates_actuality(timestamp=timestamp)
+            except exceptions.get_connection_error() as error:
+                rates_error = error
+        for input_amount, raw_input_currency, raw_output_currency in \
+                conversions:
+            conversion_result = {}
+            conversion_result['input'] = self._get_input_dict(
+                input_amount, raw_input_currency)
+            conversion_result['output'] = {}
+            try:
+                pair = (raw_input_currency, raw_output_currency)
+                if pair not in resolved_pairs:
+                    resolved_pairs[pair] = self._resolve_pair(*pair)
+                resolved_pair = resolved_pairs[pair]
+                if isinstance(resolved_pair, Exception):
+                    raise resolved_pair
+                input_currency, output_rates = resolved_pair
+                self._check_input_amount(input_amount)
+                if rates_error is not None:
+                    raise rates_error
+                conversion_result['input'] = self._get_input_dict(
+                    input_amount, input_currency)
+                conversion_result['output'] = {
+                    currency: self._calculate_formatted_amount(
+                        input_amount, rate, exponent, output_format)
+                    for currency, rate, exponent in output_rates}
+            except get_conversion_errors() as error:
+                self.metrics.count_error(get_error_name(error))
+                err_str = get_error_message(error)
+                conversion_result['output']['error'] = err_str
+            yield conversion_result
+
+    def _resolve_pair(self, raw_input_currency, raw_output_currency):
+        '''Checks a pair of currencies and looks up their conversion rates
+
+        Args:
+            raw_input_currency (str): input currency (code or symbol)
+            raw_output_currency (str): output currency (code, symbol or None)
+
+        Returns:
+            tuple: 3-letter input currency and the list of (output currency,
+            conversion rate, exponent of the output currency) tuples, or the
+            exception raised by the checks
+        '''
+        try:
+            input_currency = self._check_input_currency(raw_input_currency)
+            output_currencies = self._check_output_currency(
+                input_currency, raw_output_currency)
+        except get_conversion_errors() as error:
+            return error
+        rates_matrix = self._get_rates_matrix()
+        rates_row = rates_matrix.row(input_currency)
+        output_rates = [(currency,
+                         rates_row[rates_matrix.index[currency]],
+                         rates_matrix.exponents[rates_matrix.index[currency]])
+                        for currency in output_currencies]
+        return input_currency, output_rates
+
+    def _get_amounts_array(self, input_amounts):
+        '''Checks the amounts of `convert_many` and returns them as an array
+
+        Args:
+            input_amounts (:obj:`list` or :obj:`numpy.ndarray`): amounts to
+                be converted
+
+        Returns:
+            :obj:`numpy.ndarray`: one dimensional float64 array of the amounts
+
+        Raises:
+            exceptions.ConversionError: If any of the amounts is not a numeric
+                value
+        '''
+        import numpy as np
+        amounts = np.asarray(input_amounts)
+        if amounts.ndim != 1:
+            raise exceptions.ConversionError
+        if amounts.dtype.kind == 'O':
+            for input_amount in amounts:
+                self._check_input_amount(input_amount)
+        elif amounts.dtype.kind not in 'biuf':
+            raise exceptions.ConversionError
+        return amounts.astype(np.float64)
+
+    def _get_currencies_array(self, raw_input_currencies, size):
+        '''Checks the input currencies of `convert_many`
+
+        Args:
+            raw_input_currencies (:obj:`str` or :obj:`list` of :obj:`str`):
+                one input currency or an input currency for every amount
+            size (int): number of amounts
+
+        Returns:
+            :obj:`numpy.ndarray`: array of `size` input currencies
+
+        Raises:
+            exceptions.ConversionError: If the number of currencies doesn't
+                match the number of amounts
+            exceptions.CurrencyError: If a currency is not a string
+        '''
+        import numpy as np
+        if isinstance(raw_input_currencies, str):
+            raw_input_currencies = [raw_input_currencies] * size
+        raw_currencies = np.asarray(raw_input_currencies, dtype=object)
+        if raw_currencies.shape != (size,):
+            raise exceptions.ConversionError
+        if not all(isinstance(currency, str) for currency in raw_currencies):
+            raise exceptions.CurrencyError
+        return raw_currencies
+
     def _check_rates_actuality(self, timestamp):
         '''Checks whether the `actual_rates` dictionary holds the newest currency
         rates available from fixer.io
 
         Fixer.io is updated every day at 4PM CET. This function checks if
         during the time of conversion newer rates are available from fixer.io
-        If yes updates `self.actual_rates` and pickles the new rates
+        If yes updates `self.actual_rates` and stores the new rates. Nothing
+        is checked, if `self.auto_refresh` is False.
 
         Args:
             timestamp (:obj:`datetime.datetime`): timestamp of conversion
@@ -255,27 +957,262 @@ class CurrencyConverter(object):
         Returns:
             None
         '''
+        if not self.auto_refresh or timestamp <= self._get_next_update():
+            return
+        self.refresh_rates(timestamp)
+
+    def refresh_rates(self, timestamp=None):
+        '''Downloads the actual rates and replaces the current ones
+
+        Only one thread of one process downloads the rates at a time (single
+        flight): the refresh is guarded by a thread lock and by a lock file
+        next to the rates file (`<rates_file>.lock`). The others wait at most
+        `self.refresh_wait` seconds, then they get the rates written by the
+        lock holder, or keep the current ones. A failed attempt is noted in
+        the lock file, so the same update isn't tried again by every process.
+
+        The rates are downloaded without holding `self._lock`, so the
+        conversions can use the current rates in the meantime. The new rates
+        are written into the rates snapshot atomically and swapped in at
+        once.
+
+        Args:
+            timestamp (:obj:`datetime.datetime`, optional): If provided, the
+                rates are downloaded only if newer rates should be available
+                at `timestamp` (and no other thread or process has
+                downloaded them yet). None forces the download
+
+        Returns:
+            bool: True if newer rates are used after the call, False if the
+            current rates are kept
+
+        Raises:
+            ConnectionError: If fixer.io can't be reached
+        '''
+        wait = -1 if self.refresh_wait is None else self.refresh_wait
+        if not self._refresh_lock.acquire(timeout=wait):
+            return False
+        try:
+            file_lock = FileLock(self._rates_file + '.lock')
+            if not file_lock.acquire(timeout=self.refresh_wait):
+                return False
+            try:
+                return self._refresh_locked_rates(timestamp, file_lock)
+            finally:
+                file_lock.release()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_locked_rates(self, timestamp, file_lock):
+        '''The part of `refresh_rates` running while holding the locks
+
+        Args:
+            timestamp (:obj:`datetime.datetime`): time of the refresh, or
+                None to force the download
+            file_lock (:obj:`file_lock.FileLock`): the acquired lock file
+
+        Returns:
+            bool: True if newer rates are used after the call
+        '''
+        previous_rates = getattr(self, 'actual_rates', None)
+        self.reload_if_changed()
+        has_rates = bool(getattr(self, 'actual_rates', None))
+        if timestamp is not None and has_rates:
+            if timestamp <= self._get_next_update():
+                return self.actual_rates is not previous_rates
+            lease = self._get_next_update().isoformat()
+            last_attempt = file_lock.read_note().split('\n')
+            if last_attempt[0] == lease and len(last_attempt) > 1:
+                elapsed = time.time() - float(last_attempt[1])
+                if 0 <= elapsed < self.refresh_retry_interval:
+                    return self.actual_rates is not previous_rates
+            file_lock.write_note('{0}\n{1}'.format(lease, time.time()))
+        current_rates = getattr(self, 'actual_rates', None)
+        started = time.perf_counter()
+        try:
+            actual_rates = self._get_actual_rates()
+        except Exception:
+            self.metrics.observe_refresh(time.perf_counter() - started, False)
+            raise
+        if actual_rates is current_rates or \
+                actual_rates['last_update'] is None:
+            self.metrics.observe_refresh(time.perf_counter() - started, False)
+            return current_rates is not previous_rates
+        self.metrics.observe_refresh(time.perf_counter() - started, True)
+        with self._lock:
+            if not self._is_unmodified(actual_rates, current_rates):
+                self._store_rates(actual_rates)
+            self._set_actual_rates(actual_rates)
+        return True
+
+    def _is_unmodified(self, actual_rates, current_rates):
+        '''Checks whether the downloaded rates are the current ones
+
+        If fixer.io answers that the rates haven't been modified (HTTP 304),
+        the current rates dictionaries are reused. Such rates don't have to be
+        stored again, only their `last_update` is newer.
+
+        Args:
+            actual_rates (dict): the downloaded conversion rates
+            current_rates (dict): the current conversion rates (or None)
+
+        Returns:
+            bool: True if every base currency reuses the current rates
+        '''
+        if not current_rates:
+            return False
+        return all(rates is current_rates['rates'].get(base_currency)
+                   for base_currency, rates in actual_rates['rates'].items())
+
+    def _store_rates(self, actual_rates):
+        '''Stores the rates into the rates file (atomically, as snapshot)
+
+        Args:
+            actual_rates (dict): dictionary of conversion rates
+        '''
+        rates_snapshot.write_snapshot(self._rates_file, actual_rates)
+        self._rates_file_signature = self._get_file_signature(
+            self._rates_file)
+
+    def get_rates_status(self, timestamp=None):
+        '''returns information about the actuality of the rates
+
+        Args:
+            timestamp (:obj:`datetime.datetime`, optional): the time against
+                which the rates are compared. Defaults to now
+
+        Returns:
+            dict: `last_update` and `next_update` (datetimes or None, if no
+            rates are available), `age` of the rates in seconds and `stale`
+            (True if newer rates should be available already)
+        '''
+        if timestamp is None:
+            timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+        actual_rates = getattr(self, 'actual_rates', None)
+        if not actual_rates or actual_rates['last_update'] is None:
+            return {'last_update': None,
+                    'next_update': None,
+                    'age': None,
+                    'stale': True}
+        last_update = actual_rates['last_update']
+        next_update = self._get_next_update()
+        return {'last_update': last_update,
+                'next_update': next_update,
+                'age': (timestamp - last_update).total_seconds(),
+                'stale': timestamp > next_update}
+
+    def get_rates_version(self):
+        '''returns the version of the actual rates
+
+        The version changes with every change of the rates (it's the digest
+        of the cross-rate matrix, see `rates_matrix.CrossRateMatrix`), the
+        results of the conversions at the actual rates are the same as long
+        as the version is the same.
+
+        Returns:
+            str: the version, None if no rates are available
+        '''
+        actual_rates = getattr(self, 'actual_rates', None)
+        if not actual_rates or actual_rates['last_update'] is None:
+            return None
+        return self._get_rates_matrix().version
+
+    def stats(self):
+        '''returns the statistics of the conversions
+
+        The statistics can be rendered for Prometheus by
+        `converter_metrics.format_prometheus`.
+
+        Returns:
+            dict: the state of `self.metrics` (see
+            `converter_metrics.ConverterMetrics.stats`) extended with
+            `snapshot_age` (age of the actual rates in seconds, None without
+            rates) and `result_cache` (statistics of `self.result_cache`, None
+            without the cache)
+        '''
+        stats = self.metrics.stats()
+        stats['snapshot_age'] = self.get_rates_status()['age']
+        stats['result_cache'] = None
+        if self.result_cache is not None:
+            stats['result_cache'] = self.result_cache.stats()
+        return stats
+
+    def fetch_historical_rates(self, day):
+        '''Downloads the rates of a past day and stores them in the history
+
+        Args:
+            day (:obj:`datetime.date`): the day
+
+        Returns:
+            (dict of `str`: `float`): rates against the base currency
+
+        Raises:
+            exceptions.FixerError: If the connection limits on fixer.io are
+            exceeded
+            ConnectionError: If fixer.io can't be reached
+        '''
+        base_rates = self._get_rates_for_base(self._base_currency, day)
+        self._get_history().add_rates(day, base_rates)
+        return base_rates
+
+    def get_missing_days(self, first_day, last_day):
+        '''returns the days of a range missing from the history
+
+        Args:
+            first_day (:obj:`datetime.date`): first day of the range
+            last_day (:obj:`datetime.date`): last day of the range (included)
+
+        Returns:
+            (:obj:`list` of :obj:`datetime.date`): the missing days in
+            ascending order
+        '''
+        return self._get_history().missing_days(first_day, last_day)
+
+    def _get_next_update(self):
+        '''returns the time, when newer rates should be available on fixer.io
+
+        Returns:
+            :obj:`datetime.datetime`: the first 16:10 after the last update
+        '''
         last_update = self.actual_rates['last_update']
         next_update = last_update.replace(hour=16, minute=10)
         if last_update > next_update:
             next_update += dt.timedelta(days=1)
-        if timestamp > next_update:
-            self.actual_rates = self._get_actual_rates()
-            with open(self._rates_file, 'wb') as handle:
-                pickle.dump(self.actual_rates,
-                            handle,
-                            protocol=pickle.HIGHEST_PROTOCOL)
-            self.available_currencies = self._get_available_currencies()
+        return next_update
+
+    def _set_actual_rates(self, actual_rates):
+        '''Replaces the actual rates and everything derived from them
+
+        The symbols map is filtered against the available currencies, so it
+        is loaded again (on the next symbol lookup) only if the set of
+        available currencies has been changed. The currency resolution index
+        is rebuilt, if the available currencies have been changed.
+
+        Args:
+            actual_rates (dict): the new dictionary of conversion rates
+        '''
+        previous_currencies = self.available_currencies
+        self.actual_rates = actual_rates
+        self.available_currencies = self._get_available_currencies()
+        self.provider.validators = dict(actual_rates.get('validators', {}))
+        if previous_currencies == self.available_currencies:
+            return
+        if set(previous_currencies) != set(self.available_currencies):
+            self._symbols = None
+        self._currency_index = CurrencyIndex(self.available_currencies,
+                                             self._symbols or {})
 
     def _get_all_conversions(self,
                              input_amount,
                              input_currency,
-                             output_currencies):
+                             output_currencies,
+                             output_format=currency_units.FLOAT_FORMAT):
         '''converts `input_amount` into all currencies in the `output_currencies`
         list
 
-        Loops through every currency in `output_currencies` - and converts the
-        amount into each currency. The result is returned as a dictionary
+        Reads the row of `input_currency` from the cross-rate matrix, then
+        converts the amount into each currency in `output_currencies`. The
+        result is returned as a dictionary
 
         Args:
             input_amount (:obj:`numbers.Number`): The amount to be converted
@@ -283,19 +1220,142 @@ class CurrencyConverter(object):
             output_currencies (:obj:`list` of :obj:`str`): list of 3-letter
                 currency codes. The `input_amount` value will be converted to
                 all of these currencies
+            output_format (str): format of the output amounts (see
+                `currency_units.OUTPUT_FORMATS`)
 
         Returns:
             (dict of str: int): Maps the 3-letter currency codes to their
                 corresponding amounts
         '''
+        rates_matrix = self._get_rates_matrix()
+        rates_row = rates_matrix.row(input_currency)
+        index = rates_matrix.index
+        exponents = rates_matrix.exponents
         output_conversions = {}
         for currency in output_currencies:
-            output_amount = self._convert_single_currency(input_amount,
-                                                          input_currency,
-                                                          currency)
+            position = index[currency]
+            output_amount = self._calculate_formatted_amount(
+                input_amount, rates_row[position], exponents[position],
+                output_format)
             output_conversions[currency] = output_amount
         return output_conversions
 
+    def _get_portfolio_values(self,
+                              currencies,
+                              amounts,
+                              target_currency,
+                              output_format,
+                              rounding):
+        '''values the holdings in the target currency (the output node of
+        `value_portfolio`)
+
+        Args:
+            currencies (:obj:`list` of :obj:`str`): 3-letter currency of
+                every holding
+            amounts (list): held amounts
+            target_currency (str): 3-letter target currency
+            output_format (str): format of the values
+            rounding (str): rounding point
+
+        Returns:
+            dict: `lines` (values of the holdings) and `total`
+
+        Raises:
+            exceptions.ConversionError: If an amount isn't finite, or it's
+            out of the range of the decimal context
+        '''
+        rates_matrix = self._get_rates_matrix()
+        target_rates = rates_matrix.column(target_currency)
+        rates = [target_rates[rates_matrix.index[currency]]
+                 for currency in currencies]
+        exponent = currency_units.get_output_exponent(target_currency,
+                                                      output_format)
+        try:
+            line_units = [fixed_point.get_minor_units(amount, rate, exponent)
+                          for amount, rate in zip(amounts, rates)]
+            if rounding == currency_units.TOTAL_ROUNDING:
+                total_units = fixed_point.get_minor_units_of_sum(amounts,
+                                                                 rates,
+                                                                 exponent)
+            else:
+                total_units = sum(line_units)
+        except (ValueError, ArithmeticError):
+            raise exceptions.ConversionError
+        lines = {currency: currency_units.from_minor_units(units, exponent,
+                                                           output_format)
+                 for currency, units in zip(currencies, line_units)}
+        return {'lines': lines,
+                'total': currency_units.from_minor_units(total_units,
+                                                         exponent,
+                                                         output_format)}
+
+    def _get_all_conversions_many(self,
+                                  amounts,
+                                  input_dict,
+                                  input_currencies,
+                                  currency_rows,
+                                  raw_output_currency,
+                                  output_currencies):
+        '''converts arrays of amounts into all currencies in the
+        `output_currencies` list (the columnar part of `convert_many`)
+
+        Args:
+            amounts (:obj:`numpy.ndarray`): amounts to be converted
+            input_dict (dict): input node of the result, its currency array is
+                filled by this method
+            input_currencies (:obj:`list` of :obj:`str`): 3-letter code (or
+                an error message) for every distinct input currency
+            currency_rows (:obj:`numpy.ndarray`): position of the input
+                currency of every row in `input_currencies`
+            raw_output_currency (str): output currency as provided
+            output_currencies (:obj:`list` of :obj:`str`): list of 3-letter
+                currency codes. The amounts will be converted to all of these
+
+        Returns:
+            tuple: output node (dict of str: :obj:`numpy.ndarray`) and errors
+            node (dict of int: str) of the result
+        '''
+        import numpy as np
+        import vector_conversion
+        rates_matrix = self._get_rates_matrix()
+        size = len(rates_matrix)
+        matrix_rows = np.zeros(len(input_currencies), dtype=np.intp)
+        failed_currencies = np.zeros(len(input_currencies), dtype=bool)
+        omitted_outputs = []
+        for position, currency in enumerate(input_currencies):
+            if currency not in rates_matrix.index:
+                failed_currencies[position] = True
+                continue
+            matrix_rows[position] = rates_matrix.index[currency]
+            included = self._check_output_currency(currency,
+                                                   raw_output_currency)
+            omitted_outputs.append(
+                (position, set(output_currencies) - set(included)))
+        failed_rows = failed_currencies[currency_rows]
+        input_dict['currency'][:] = np.asarray(input_currencies,
+                                               dtype=object)[currency_rows]
+        input_dict['currency'][failed_rows] = None
+        errors = {int(row): input_currencies[currency_rows[row]]
+                  for row in np.nonzero(failed_rows)[0]}
+
+        rates = np.frombuffer(rates_matrix.rates, dtype=np.float64)
+        rates = rates.reshape(size, size)
+        row_rates = rates[matrix_rows[currency_rows]]
+        output_conversions = {}
+        for currency in output_currencies:
+            omitted_rows = failed_rows.copy()
+            for position, omitted in omitted_outputs:
+                if currency in omitted:
+                    omitted_rows |= currency_rows == position
+            if omitted_rows.all():
+                continue
+            column = rates_matrix.index[currency]
+            output_amounts = vector_conversion.round_amounts(
+                amounts, row_rates[:, column])
+            output_amounts[omitted_rows] = np.nan
+            output_conversions[currency] = output_amounts
+        return output_conversions, errors
+
     def _convert_single_currency(self,
                                  input_amount,
                                  input_currency,
@@ -321,28 +1381,182 @@ class CurrencyConverter(object):
                                                       actual_conversion_rate)
         return output_amount
 
+    def _get_historical_conversions(self,
+                                    input_amount,
+                                    input_currency,
+                                    output_currencies,
+                                    raw_output_currency,
+                                    day,
+                                    output_format=currency_units.FLOAT_FORMAT):
+        '''converts `input_amount` at the rates of a past day
+
+        The cross rates are calculated the same way as for the actual rates
+        (see `rates_matrix.calculate_cross_rate`). Currencies without a rate
+        on that day are left out.
+
+        Args:
+            input_amount (:obj:`numbers.Number`): The amount to be converted
+            input_currency (str): 3-letter input currency code
+            output_currencies (:obj:`list` of :obj:`str`): list of 3-letter
+                currency codes (output of `_check_output_currency`)
+            raw_output_currency (str): the requested output currency, None
+                means every currency
+            day (:obj:`datetime.date`): the day of the conversion rates
+            output_format (str): format of the output amounts (see
+                `currency_units.OUTPUT_FORMATS`)
+
+        Returns:
+            (dict of str: int): Maps the 3-letter currency codes to their
+                corresponding amounts
+
+        Raises:
+            exceptions.CurrencyError: If the input currency, or the requested
+            output currency had no rate on that day
+        '''
+        base_rates = dict(self._get_historical_rates(day))
+        base_rates[self._base_currency] = 1.0
+        if input_currency not in base_rates:
+            raise exceptions.CurrencyError
+        output_currencies = [currency for currency in output_currencies
+                             if currency in base_rates]
+        if raw_output_currency is not None and not output_currencies:
+            raise exceptions.CurrencyError
+        output_conversions = {}
+        for currency in output_currencies:
+            conversion_rate = calculate_cross_rate(base_rates,
+                                                   self._base_currency,
+                                                   input_currency,
+                                                   currency)
+            output_conversions[currency] = self._calculate_formatted_amount(
+                input_amount, conversion_rate,
+                currency_units.get_exponent(currency), output_format)
+        return output_conversions
+
+    def _get_historical_matrix(self, day):
+        '''returns the cross-rate matrix of a past day
+
+        Args:
+            day (:obj:`datetime.date`): the day
+
+        Returns:
+            :obj:`rates_matrix.CrossRateMatrix`: the matrix of the currencies
+            with a rate on that day
+        '''
+        rates_matrix = self._historical_matrices.get(day)
+        if rates_matrix is None:
+            rates_matrix = CrossRateMatrix(self._get_historical_rates(day),
+                                           self._base_currency)
+            self._historical_matrices.put(day, rates_matrix)
+        return rates_matrix
+
+    def _get_historical_rates(self, day):
+        '''returns the rates of the base currency on a past day
+
+        The rates are looked up in the history file. Days missing from it are
+        downloaded from fixer.io and appended to it.
+
+        Args:
+            day (:obj:`datetime.date`): the day
+
+        Returns:
+            (dict of `str`: `float`): rates against the base currency
+
+        Raises:
+            exceptions.FixerError: If the connection limits on fixer.io are
+            exceeded
+            ConnectionError: If fixer.io can't be reached
+        '''
+        base_rates = self._get_history().get_rates(day)
+        if base_rates is None:
+            base_rates = self.fetch_historical_rates(day)
+        return base_rates
+
+    def _get_history(self):
+        '''returns the store of the historical rates (opened on the first call)
+
+        Returns:
+            :obj:`rates_history.RatesHistory`: the history
+        '''
+        with self._lock:
+            if self._history is None:
+                self._history = RatesHistory(self._history_file)
+            return self._history
+
     def _check_rates_file(self, file_path):
-        '''Returns conversions rates (either from pickle or fixer.io)
+        '''Returns conversions rates (either from the rates file or fixer.io)
 
-        - Checks if a pickle file under `file_path` exists (the pickle file is
+        - Checks if a rates file under `file_path` exists (the rates file is
         an image of the last accessed conversion rates)
-        - If the pickle doesnt exist returns `self._get_actual_rates`,
+        - If the file doesnt exist returns `self._get_actual_rates`,
         conversion rates downloaded from fixer.io
 
         Args:
-            file_path (str): path of the pickle file
+            file_path (str): path of the rates file (snapshot or pickle)
 
         Returns:
             dict: Dictionary of the conversion rates
 
             Either downloaded from fixer.io (the most actual rates) or from
-            the pickle file (not always the most actual conversion rates)
+            the rates file (not always the most actual conversion rates)
         '''
         if not os.path.isfile(file_path):
-            return self._get_actual_rates()
+            actual_rates = self._get_actual_rates()
+        else:
+            actual_rates = self._load_rates_file(file_path)
+        if file_path == self._rates_file:
+            self._rates_file_signature = self._get_file_signature(file_path)
+        return actual_rates
+
+    def _get_initial_rates_file(self):
+        '''returns the rates file read by `__init__`
+
+        The rates pickled by older versions under the default name
+        (`LEGACY_RATES_FILE`) are read, if the snapshot with the default
+        name (`DEFAULT_RATES_FILE`) hasn't been written next to them yet.
+
+        Returns:
+            str: path of the rates file
+        '''
+        rates_file = self._rates_file
+        if os.path.basename(rates_file) != DEFAULT_RATES_FILE or \
+                os.path.isfile(rates_file):
+            return rates_file
+        legacy_file = os.path.join(os.path.dirname(rates_file),
+                                   LEGACY_RATES_FILE)
+        if os.path.isfile(legacy_file):
+            return legacy_file
+        return rates_file
+
+    def _load_rates_file(self, file_path):
+        '''Loads the rates dictionary from a rates file
+
+        Args:
+            file_path (str): path of the rates file. Either a snapshot (see
+                `rates_snapshot`), or a pickle written by older versions
+
+        Returns:
+            dict: Dictionary of the conversion rates
+        '''
+        if rates_snapshot.is_snapshot(file_path):
+            return rates_snapshot.load_rates(file_path)
         with open(file_path, 'rb') as handle:
-            actual_rates = pickle.load(handle)
-            return actual_rates
+            return pickle.load(handle)
+
+    def _get_file_signature(self, file_path):
+        '''returns a cheap fingerprint of a file (modification time and size)
+
+        Args:
+            file_path (str): path of the file
+
+        Returns:
+            tuple: (mtime in nanoseconds, size in bytes) or None if the file
+            doesn't exist
+        '''
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
 
     def _get_available_currencies(self):
         '''returns a list of available currencies based on
@@ -359,6 +1573,32 @@ class CurrencyConverter(object):
             return []
         return list(self.actual_rates['rates'][self._base_currency].keys())
 
+    def _load_symbols(self):
+        '''loads the symbols map and adds the symbols to the currency index
+
+        The symbols are needed only if a currency isn't a 3-letter code, so
+        they are loaded on the first such lookup. The map is loaded from its
+        compiled cache, if it is valid (see `symbols_cache`).
+
+        Returns:
+            bool: True if the symbols have been loaded by this call, False if
+            they were loaded already
+        '''
+        if self._symbols is not None:
+            return False
+        with self._lock:
+            if self._symbols is not None:
+                return False
+            symbols = {}
+            if self._symbols_file is not None:
+                symbols = symbols_cache.load_symbols_map(
+                    self._symbols_file, self._symbols_sep,
+                    self.available_currencies, self._get_symbols_map)
+            self._currency_index = CurrencyIndex(self.available_currencies,
+                                                 symbols)
+            self._symbols = symbols
+        return True
+
     def _get_symbols_map(self, file_name, separator):
         '''gets the dictionary for mapping symbols to 3-letter currencies
 
@@ -383,6 +1623,7 @@ class CurrencyConverter(object):
         '''
         if not os.path.isfile(file_name):
             return {}
+        available = set(self.available_currencies)
         symbol_map = defaultdict(list)
         with io.open(file_name, 'r', encoding='utf-8') as input_file:
             for line in input_file:
@@ -392,7 +1633,7 @@ class CurrencyConverter(object):
                 symbol_encoded = bytes(data[0], encoding='utf-8')
                 if len(data[1]) != 3:
                     raise exceptions.SymbolImportError
-                if data[1] not in self.available_currencies:
+                if data[1] not in available:
                     continue
                 currency = data[1]
                 symbol_map[symbol_encoded].append(currency)
@@ -403,7 +1644,10 @@ class CurrencyConverter(object):
 
         Retrieves the actual rates and packs it into a dictionary with
         additional info base_currency`. Normally EUR is used as base currency.
-        Saves the conversion rates into a pickle, if the file doesn't exist.
+        The rates of the extra base currencies are downloaded concurrently
+        (at most `self.max_parallel_fetches` at once). If the rates of an
+        extra base can't be retrieved, its current rates are kept.
+        Saves the conversion rates into the rates file, if it doesn't exist.
 
         Returns:
             dict: dictionary of currencies and their conversion rates against
@@ -415,16 +1659,34 @@ class CurrencyConverter(object):
         actual_rates['rates'] = {}
         act_currency = self._base_currency
         try:
-            act_rates = self._get_rates_for_base(act_currency)
-            act_rates[self._base_currency] = 1.0
+            if self._extra_bases:
+                all_rates = self._get_rates_for_bases(
+                    (act_currency,) + self._extra_bases)
+            else:
+                all_rates = {act_currency:
+                             self._get_rates_for_base(act_currency)}
+            act_rates = all_rates[act_currency]
+            if isinstance(act_rates, Exception):
+                raise act_rates
+            # The current rates (read-only, if they are read from the
+            # snapshot) have the rate of their base currency already
+            if act_rates.get(self._base_currency) != 1.0:
+                act_rates[self._base_currency] = 1.0
             actual_rates['rates'][act_currency] = act_rates
+            for base_currency in self._extra_bases:
+                base_rates = all_rates[base_currency]
+                if isinstance(base_rates, Exception):
+                    base_rates = self._get_current_base_rates(base_currency)
+                    if base_rates is None:
+                        continue
+                if base_rates.get(base_currency) != 1.0:
+                    base_rates[base_currency] = 1.0
+                actual_rates['rates'][base_currency] = base_rates
+            actual_rates['validators'] = dict(self.provider.validators)
             act_timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
             actual_rates['last_update'] = act_timestamp
             if not os.path.isfile(self._rates_file):
-                with open(self._rates_file, 'wb') as handle:
-                    pickle.dump(actual_rates,
-                                handle,
-                                protocol=pickle.HIGHEST_PROTOCOL)
+                self._store_rates(actual_rates)
             return actual_rates
         except exceptions.FixerError:
             pass
@@ -433,11 +1695,60 @@ class CurrencyConverter(object):
         if actual_rates['last_update'] is None:
             return self.actual_rates
 
-    def _get_rates_for_base(self, base_currency):
-        '''Gets the conversion rates for the base currency from fixer.io
+    def _get_rates_for_bases(self, base_currencies):
+        '''Gets the conversion rates for more base currencies concurrently
+
+        Args:
+            base_currencies (:obj:`tuple` of :obj:`str`): 3-letter codes of
+                the base currencies
+
+        Returns:
+            dict: maps every base currency to its rates (see
+            `_get_rates_for_base`), or to the exception raised during their
+            download
+        '''
+        def get_rates(base_currency):
+            '''
+            downloads the rates of one base currency, returns the exception
+            instead of raising it
+            '''
+            try:
+                return self._get_rates_for_base(base_currency)
+            except (exceptions.FixerError, exceptions.get_connection_error(),
+                    ValueError, KeyError) as error:
+                return error
+
+        from concurrent.futures import ThreadPoolExecutor
+        workers = max(1, min(self.max_parallel_fetches, len(base_currencies)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            all_rates = executor.map(get_rates, base_currencies)
+            return dict(zip(base_currencies, all_rates))
+
+    def _get_current_base_rates(self, base_currency):
+        '''returns the current rates of a base currency
+
+        Args:
+            base_currency (str): 3-letter code of the base currency
+
+        Returns:
+            (dict of `str`: `float`): the current rates, or None if there are
+            no rates for `base_currency`
+        '''
+        if not getattr(self, 'actual_rates', None):
+            return None
+        return self.actual_rates['rates'].get(base_currency)
+
+    def _get_rates_for_base(self, base_currency, day=None):
+        '''Gets the conversion rates for the base currency from the provider
+
+        The latest rates are requested together with the current rates of the
+        base currency. If the provider knows they haven't changed (e.g. HTTP
+        304), the current rates dictionary is returned.
 
         Args:
             base_currency(str): 3-letter currency code of the base_currency
+            day(:obj:`datetime.date`, optional): the day of the rates, None
+                means the latest rates
 
         Returns:
             (dict of `str`: `float`): Dictionary, mapping currencies to their
@@ -446,48 +1757,114 @@ class CurrencyConverter(object):
         Raises:
             exceptions.FixerError: If the connection limits on fixer.io are
             exceeded
+            ConnectionError: If fixer.io can't be reached (or doesn't answer
+            in time)
         '''
-        currency_url = '{0}/{1}?base={2}'.format(self._api_base_url,
-                                                 'latest',
-                                                 base_currency)
-        fixer_response = requests.get(currency_url)
-        if fixer_response.headers['content-type'] == 'text/html':
-            raise exceptions.FixerError
-        current_rates = fixer_response.json()['rates']
-        return current_rates
+        if day is not None:
+            return self.provider.fetch_historical(base_currency, day)
+        current_rates = self._get_current_base_rates(base_currency)
+        return self.provider.fetch_latest(base_currency, current_rates)
 
     def _calculate_current_rate(self, input_currency, output_currency):
-        '''calculates the conversion rate to convert from `input_currency` to
+        '''returns the conversion rate to convert from `input_currency` to
         `output_currency`
 
+        The rate is looked up in the cross-rate matrix of the actual rates
+        (see `rates_matrix.calculate_cross_rate` for the calculation)
+
         Args:
             input_currency (str): 3-letter input currency code
             output_currency (str): 3-letter output currency code
 
         Returns:
-            float: rounded output amount
+            float: rounded conversion rate
         '''
-        if input_currency == output_currency:
-            return 1.0
-        if input_currency == self._base_currency:
-            base_currency = self._base_currency
-            return self.actual_rates['rates'][base_currency][output_currency]
-        act_rates = self.actual_rates['rates'][self._base_currency]
-        input_val = decimal.Decimal(act_rates[input_currency])
-        output_val = decimal.Decimal(act_rates[output_currency])
+        return self._get_rates_matrix().rate(input_currency, output_currency)
 
-        rate = output_val / input_val
-        precision = decimal.Decimal('.00001')
-        rounding = decimal.ROUND_HALF_UP
-        rounded_rate = decimal.Decimal(rate.quantize(precision,
-                                                     rounding=rounding))
+    def _get_rates_matrix(self):
+        '''returns the cross-rate matrix of the actual rates
+
+        The matrix is built only once for every rates dictionary. A new
+        matrix is built, when `self.actual_rates` gets a new dictionary of
+        base rates (the rates dictionaries are never modified in place).
+
+        Returns:
+            :obj:`rates_matrix.CrossRateMatrix`: the matrix of the actual rates
+        '''
+        base_rates = self.actual_rates['rates'][self._base_currency]
+        rates_matrix = self._rates_matrix
+        if rates_matrix is None or rates_matrix.source is not base_rates:
+            rates_matrix = CrossRateMatrix(base_rates, self._base_currency)
+            self._rates_matrix = rates_matrix
+        return rates_matrix
+
+    def _get_result_cache_key(self,
+                              kind,
+                              input_amount,
+                              raw_input_currency,
+                              raw_output_currency,
+                              output_format):
+        '''returns the key of a conversion at the actual rates in the result
+        cache
+
+        The actuality of the rates is checked first (newer rates are
+        downloaded, if they are available), so the key has the version of the
+        rates used by the conversion. The amount is represented by its repr,
+        so 1, 1.0 and -0.0 (with different results) have different keys.
+
+        Args:
+            kind (str): 'dict' for `convert`, 'json' for `convert_json`
+            input_amount: amount to be converted
+            raw_input_currency: input currency as provided
+            raw_output_currency: output currency as provided
+            output_format (str): checked output format
+
+        Returns:
+            tuple: the key, None if there is no cache, or the result can't be
+            cached (amounts other than floats and integers, NaN, currencies
+            other than strings, no rates, failed refresh)
+        '''
+        if self.result_cache is None or \
+                type(input_amount) not in (float, int) or \
+                input_amount != input_amount:
+            return None
+        if not isinstance(raw_input_currency, str) or \
+                not isinstance(raw_output_currency, (str, type(None))):
+            return None
+        if self.get_rates_version() is None:
+            return None
+        try:
+            self._check_rates_actuality(
+                timestamp=dt.datetime.now(tz=pytz.timezone('CET')))
+        except get_conversion_errors():
+            return None
+        return (kind, self.get_rates_version(), repr(input_amount),
+                raw_input_currency, raw_output_currency, output_format)
 
-        return float(rounded_rate)
+    def _get_response_serializer(self):
+        '''returns the JSON serializer of the actual rates
+
+        The serializer (with the JSON keys of the currencies) is prepared
+        only once for every cross-rate matrix.
+
+        Returns:
+            :obj:`response_json.ResponseSerializer`: the serializer
+        '''
+        rates_matrix = self._get_rates_matrix()
+        serializer = self._response_serializer
+        if serializer is None or serializer.rates_matrix is not rates_matrix:
+            serializer = response_json.ResponseSerializer(rates_matrix)
+            self._response_serializer = serializer
+        return serializer
 
     def _calculate_output_amount(self, input_amount, conversion_rate):
         '''Calculates the output amount based on the `conversion_rate` and
         `input_amount`
 
+        The amount is rounded to 2 decimal places (ROUND_HALF_UP) with the
+        fixed-point arithmetic of `fixed_point`, which gives the same results
+        as the decimal calculation.
+
         Args:
             input_amount(:obj: `numbers.Number`): input amount to be
                 converted, number like object
@@ -496,14 +1873,50 @@ class CurrencyConverter(object):
         Returns:
             float: converted output amount
         '''
-        dec_input = decimal.Decimal(input_amount)
-        dec_conversion = decimal.Decimal(conversion_rate)
-        output_amount = dec_input * dec_conversion
-        precision = decimal.Decimal('.01')
-        rounding = decimal.ROUND_HALF_UP
-        rounded_output = decimal.Decimal(output_amount.quantize(precision,
-                                                                rounding=rounding))
-        return float(rounded_output)
+        return fixed_point.calculate_output_amount(input_amount,
+                                                   conversion_rate)
+
+    def _calculate_formatted_amount(self,
+                                    input_amount,
+                                    conversion_rate,
+                                    exponent,
+                                    output_format):
+        '''Calculates the output amount in the requested output format
+
+        The decimal string and the minor units are calculated from the exact
+        integer minor units (see `fixed_point.get_minor_units`), no Decimal
+        object is created.
+
+        Args:
+            input_amount(:obj: `numbers.Number`): input amount to be
+                converted, number like object
+            conversion_rate(float): conversion rate
+            exponent(int): number of decimal places of the output currency
+            output_format(str): 'float', 'decimal' or 'minor'
+
+        Returns:
+            float, str or int: converted output amount
+
+        Raises:
+            exceptions.ConversionError: If the amount isn't finite (only
+            floats can be NaN or infinite), or it's out of the range of the
+            decimal context
+        '''
+        if isinstance(input_amount, float) and \
+                not math.isfinite(input_amount):
+            raise exceptions.ConversionError
+        try:
+            if output_format == currency_units.FLOAT_FORMAT:
+                return self._calculate_output_amount(input_amount,
+                                                     conversion_rate)
+            minor_units = fixed_point.get_minor_units(input_amount,
+                                                      conversion_rate,
+                                                      exponent)
+        except (ValueError, ArithmeticError):
+            raise exceptions.ConversionError
+        if output_format == currency_units.MINOR_UNITS_FORMAT:
+            return minor_units
+        return currency_units.format_minor_units(minor_units, exponent)
 
     def _get_input_dict(self, amount, currency):
         '''returns the input node of `convert`s dictionary
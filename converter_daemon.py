@@ -0,0 +1,353 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the converter daemon and its client
+- ConverterDaemon keeps one CurrencyConverter loaded (rates, symbols, index)
+and serves conversions on a Unix domain socket, so a conversion doesn't pay
+for starting the converter
+- The rates of the daemon are refreshed in the background (see
+`rates_refresher`), changes of the rates file made by other processes are
+picked up before every conversion
+- The protocol is line based: every request is a JSON object (`amount`,
+`input_currency`, optional `output_currency`, `date` and `output_format`)
+on one line, the answer is the output of `CurrencyConverter.convert` as
+compact JSON (see `CurrencyConverter.convert_json`) on one line. A connection
+can carry any number of requests
+- `request_conversion` and `request_conversion_json` are the client side,
+they import nothing heavier than `socket` and `json` (the converter,
+`socketserver` and `threading` are imported by the daemon only), so the CLI
+stays a thin client
+- The client talks only to a socket owned by the same user, so another user
+can't answer forged conversions from a socket created under the predictable
+name in `/tmp` first
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import json
+import os
+import socket
+
+
+SOCKET_ENVIRONMENT_VARIABLE = 'CURRENCY_CONVERTER_SOCKET'
+CLIENT_TIMEOUT = 30.0
+LISTEN_BACKLOG = 128
+
+
+class DaemonError(Exception):
+    '''
+    Raised if the daemon can't be reached, or its answer can't be read
+    '''
+    pass
+
+
+def get_socket_path():
+    '''returns the default path of the daemon's socket
+
+    The path can be set by the `CURRENCY_CONVERTER_SOCKET` environment
+    variable. Otherwise the socket is created in `$XDG_RUNTIME_DIR` (or
+    `/tmp`), one per user.
+
+    Returns:
+        str: path of the socket, None if Unix domain sockets aren't supported
+    '''
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    if os.environ.get(SOCKET_ENVIRONMENT_VARIABLE):
+        return os.environ[SOCKET_ENVIRONMENT_VARIABLE]
+    directory = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(directory,
+                        'currency_converter-{0}.sock'.format(os.getuid()))
+
+
+def request_conversion(conversion, socket_path=None, timeout=CLIENT_TIMEOUT):
+    '''sends a conversion to the daemon and returns its result
+
+    See `request_conversion_json` for the arguments.
+
+    Returns:
+        dict: the output of `CurrencyConverter.convert`
+
+    Raises:
+        DaemonError: If no daemon is listening on the socket, or it doesn't
+        answer properly
+    '''
+    response = request_conversion_json(conversion, socket_path, timeout)
+    try:
+        return json.loads(response.decode('utf-8'))
+    except ValueError as error:
+        raise DaemonError(error)
+
+
+def request_conversion_json(conversion,
+                            socket_path=None,
+                            timeout=CLIENT_TIMEOUT):
+    '''sends a conversion to the daemon and returns its answer undecoded
+
+    Args:
+        conversion (dict): the conversion request (`amount`,
+            `input_currency`, optional `output_currency`, `date` and
+            `output_format`)
+        socket_path (str, optional): path of the daemon's socket, defaults
+            to `get_socket_path()`
+        timeout (float): seconds to wait for the answer
+
+    Returns:
+        bytes: the output of `CurrencyConverter.convert` as compact JSON
+        (without the line end)
+
+    Raises:
+        DaemonError: If no daemon is listening on the socket, the socket is
+        owned by another user, or the daemon doesn't answer properly
+    '''
+    if socket_path is None:
+        socket_path = get_socket_path()
+    if socket_path is None:
+        raise DaemonError('Unix domain sockets are not supported')
+    request = json.dumps(conversion).encode('utf-8') + b'\n'
+    try:
+        _check_owner(socket_path)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall(request)
+            client.shutdown(socket.SHUT_WR)
+            response = _read_line(client)
+        finally:
+            client.close()
+    except OSError as error:
+        raise DaemonError(error)
+    return response.rstrip(b'\n')
+
+
+def _check_owner(socket_path):
+    '''checks, that the socket is owned by the current user
+
+    The socket can't be replaced by another user afterwards: the directory
+    of the socket is either private, or it has the sticky bit (`/tmp`).
+
+    Raises:
+        DaemonError: If the socket is owned by another user
+        OSError: If the socket doesn't exist
+    '''
+    if not hasattr(os, 'getuid'):
+        return
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise DaemonError('The socket {0} is owned by another user'.format(
+            socket_path))
+
+
+def _read_line(client):
+    '''reads one line of the answer
+
+    Raises:
+        DaemonError: If the connection is closed before the end of the line
+    '''
+    chunks = []
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            raise DaemonError('Incomplete answer')
+        chunks.append(chunk)
+        if chunk.endswith(b'\n'):
+            return b''.join(chunks)
+
+
+class ConverterDaemon(object):
+    '''Server of the conversions on a Unix domain socket
+
+    The socket is created with permissions of the owner only. A stale socket
+    file (left by a killed daemon) is replaced, a socket with a running
+    daemon isn't.
+
+    Attributes:
+        converter (:obj:`converter_class.CurrencyConverter`): the resident
+            converter
+        socket_path (str): path of the socket
+    '''
+
+    def __init__(self,
+                 converter=None,
+                 socket_path=None,
+                 background_refresh=True):
+        '''ConverterDaemon's __init__ method
+
+        Args:
+            converter (:obj:`converter_class.CurrencyConverter`, optional):
+                the converter to be served. Defaults to a new
+                CurrencyConverter
+            socket_path (str, optional): path of the socket, defaults to
+                `get_socket_path()`
+            background_refresh (bool): If True (default), the rates are
+                refreshed by a `rates_refresher.RatesRefresher` thread, so
+                the conversions never wait for a download
+
+        Raises:
+            DaemonError: If Unix domain sockets aren't supported, or another
+            daemon is already listening on the socket
+        '''
+        if converter is None:
+            from converter_class import CurrencyConverter
+            converter = CurrencyConverter()
+        self.converter = converter
+        self.socket_path = socket_path or get_socket_path()
+        if self.socket_path is None:
+            raise DaemonError('Unix domain sockets are not supported')
+        self._refresher = None
+        if background_refresh:
+            from rates_refresher import RatesRefresher
+            self._refresher = RatesRefresher(converter)
+        self._server = self._bind()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def serve_forever(self):
+        '''serves the conversions until `shutdown` is called
+        '''
+        if self._refresher is not None and not self._refresher.is_alive():
+            self._refresher.start()
+        self._server.serve_forever()
+
+    def start(self):
+        '''serves the conversions in a background thread
+
+        Returns:
+            ConverterDaemon: the daemon itself
+        '''
+        import threading
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='ConverterDaemon')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        '''stops `serve_forever` (call it from another thread)
+        '''
+        self._server.shutdown()
+
+    def close(self):
+        '''stops serving, closes and removes the socket
+        '''
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        if self._refresher is not None:
+            self._refresher.stop()
+        self._server.server_close()
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def handle_request(self, line):
+        '''converts one request line
+
+        Args:
+            line (bytes): JSON object of the conversion
+
+        Returns:
+            bytes: the result of the conversion as a compact JSON line (see
+            `CurrencyConverter.convert_json`). An invalid
+            request gets the same error answer as an invalid row of a batch,
+            an unknown output format gets `{"error": "Wrong parameters"}`
+        '''
+        import batch_io
+        import response_json
+        try:
+            raw_item = json.loads(line.decode('utf-8'))
+        except ValueError:
+            raw_item = None
+        conversion = batch_io.get_conversion(raw_item)
+        if conversion is None:
+            result = next(batch_io.convert_stream(self.converter,
+                                                  [raw_item]))
+            return response_json.dumps(result) + b'\n'
+        self.converter.reload_if_changed()
+        try:
+            response = self.converter.convert_json(
+                *conversion,
+                on_date=raw_item.get('date'),
+                output_format=raw_item.get('output_format'))
+        except ValueError:
+            response = response_json.dumps({'error': 'Wrong parameters'})
+        return response + b'\n'
+
+    def _bind(self):
+        '''creates the server listening on the socket
+
+        Returns:
+            :obj:`socketserver.ThreadingUnixStreamServer`: the server
+
+        Raises:
+            DaemonError: If another daemon is listening on the socket
+        '''
+        import socketserver
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise DaemonError(
+                    'A daemon is already listening on {0}'.format(
+                        self.socket_path))
+            os.remove(self.socket_path)
+        server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _get_handler_class(), bind_and_activate=False)
+        server.daemon_threads = True
+        server.request_queue_size = LISTEN_BACKLOG
+        server.converter_daemon = self
+        old_umask = os.umask(0o077)
+        try:
+            server.server_bind()
+            server.server_activate()
+        except OSError:
+            server.server_close()
+            raise
+        finally:
+            os.umask(old_umask)
+        return server
+
+
+def _is_listening(socket_path):
+    '''
+    returns True if something accepts connections on the socket
+    '''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        client.close()
+    return True
+
+
+def _get_handler_class():
+    '''
+    returns the handler of the connections (socketserver is imported by the
+    daemon only)
+    '''
+    import socketserver
+
+    class ConversionHandler(socketserver.StreamRequestHandler):
+        '''
+        answers the request lines of one connection
+        '''
+        timeout = 60.0
+
+        def handle(self):
+            daemon = self.server.converter_daemon
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                self.wfile.write(daemon.handle_request(line))
+
+    return ConversionHandler
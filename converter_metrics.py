@@ -0,0 +1,384 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the instrumentation of the converter
+- ConverterMetrics collects latency histograms of the stages of a conversion
+(resolution of the currencies, check of the actuality of the rates, the
+calculation and the serialization), counters of the conversion errors and the
+latency, successes and failures of the refreshes of the rates (the upstream
+fetch)
+- A stage is timed by one clock read at its end (`observe_since` returns the
+time, which starts the next stage) and counted into fixed buckets of the
+calling thread (no lock is taken), so the metrics are cheap enough to be
+always on. The buckets of the threads are summed up by `stats`, the ones of
+finished threads are kept. Stages interrupted by an error aren't observed,
+the error is counted instead
+- `format_prometheus` renders the statistics of the converter (see
+`CurrencyConverter.stats`) in the Prometheus text exposition format
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from bisect import bisect_left
+import math
+import threading
+import weakref
+from time import perf_counter, time as wall_time
+
+
+RESOLUTION_STAGE = 'resolution'
+ACTUALITY_STAGE = 'actuality'
+CALCULATION_STAGE = 'calculation'
+SERIALIZATION_STAGE = 'serialization'
+STAGES = (RESOLUTION_STAGE, ACTUALITY_STAGE, CALCULATION_STAGE,
+          SERIALIZATION_STAGE)
+
+ERROR_NAMES = ('ConversionError', 'CurrencyError', 'TooManyCurrencies',
+               'DateError', 'ConnectionError')
+
+# Upper bounds of the buckets in seconds, from microseconds (a resolution of
+# a cached currency) to seconds (a stage waiting for the download of rates)
+STAGE_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+                 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                 0.5, 1.0, 2.5)
+REFRESH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PROMETHEUS_NAMESPACE = 'currency_converter'
+
+
+class LatencyHistogram(object):
+    '''Histogram of durations with fixed buckets
+
+    The histogram is thread-safe, the bucket of a duration is found before
+    taking the lock.
+
+    Attributes:
+        buckets (:obj:`tuple` of :obj:`float`): ascending upper bounds of
+            the buckets in seconds
+        counts (:obj:`list` of :obj:`int`): number of durations in every
+            bucket (not cumulative), the last item counts the durations over
+            the last bound
+        total (float): sum of the durations in seconds
+    '''
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        '''LatencyHistogram's __init__ method
+
+        Args:
+            buckets (:obj:`tuple` of :obj:`float`): ascending upper bounds of
+                the buckets in seconds
+        '''
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        '''counts a duration
+
+        Args:
+            seconds (float): the duration
+        '''
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+
+    def snapshot(self):
+        '''returns the state of the histogram
+
+        Returns:
+            dict: `count`, `sum` and `buckets` - list of (upper bound,
+            cumulative count) pairs, the last bound is infinity
+        '''
+        with self._lock:
+            return _get_snapshot(self.buckets, self.counts, self.total)
+
+
+class ConverterMetrics(object):
+    '''Latencies and counters of a converter
+
+    The metrics are thread-safe. Every thread counts the latencies of the
+    stages into its own buckets, so the conversions don't wait for each
+    other. The other counters are guarded by a lock.
+
+    Attributes:
+        stage_buckets (:obj:`tuple` of :obj:`float`): ascending upper bounds
+            of the buckets of the stage latencies in seconds
+        errors (dict): maps the names of the conversion errors (see
+            `ERROR_NAMES`) to their counts
+        refresh_latency (:obj:`LatencyHistogram`): durations of the
+            downloads of the actual rates
+        refreshes (int): number of refreshes, which brought newer rates
+        refresh_failures (int): number of refreshes, which failed (an error,
+            or no rates could be downloaded)
+        last_refresh (float): time (`time.time()`) of the last successful
+            refresh, None before the first one
+    '''
+
+    def __init__(self,
+                 stage_buckets=STAGE_BUCKETS,
+                 refresh_buckets=REFRESH_BUCKETS):
+        '''ConverterMetrics's __init__ method
+
+        Args:
+            stage_buckets (:obj:`tuple` of :obj:`float`): bounds of the
+                buckets of the stage latencies in seconds
+            refresh_buckets (:obj:`tuple` of :obj:`float`): bounds of the
+                buckets of the refresh latencies in seconds
+        '''
+        self.stage_buckets = tuple(stage_buckets)
+        self.errors = dict.fromkeys(ERROR_NAMES, 0)
+        self.refresh_latency = LatencyHistogram(refresh_buckets)
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = {}
+        self._retired_shard = self._create_counts()
+
+    def observe_since(self, stage, started):
+        '''counts the duration of a stage, which has just finished
+
+        Args:
+            stage (str): name of the stage (see `STAGES`)
+            started (float): start of the stage (`time.perf_counter()`)
+
+        Returns:
+            float: the end of the stage, i.e. the start of the next one
+        '''
+        finished = perf_counter()
+        seconds = finished - started
+        try:
+            counts, sums = self._local.counts
+        except AttributeError:
+            counts, sums = self._add_shard()
+        counts[stage][bisect_left(self.stage_buckets, seconds)] += 1
+        sums[stage] += seconds
+        return finished
+
+    def count_error(self, error_name):
+        '''counts a conversion error
+
+        Args:
+            error_name (str): name of the error (see `ERROR_NAMES`)
+        '''
+        with self._lock:
+            self.errors[error_name] = self.errors.get(error_name, 0) + 1
+
+    def observe_refresh(self, seconds, succeeded):
+        '''counts a download of the actual rates
+
+        Args:
+            seconds (float): duration of the download
+            succeeded (bool): True if newer rates have been downloaded
+        '''
+        self.refresh_latency.observe(seconds)
+        with self._lock:
+            if succeeded:
+                self.refreshes += 1
+                self.last_refresh = wall_time()
+            else:
+                self.refresh_failures += 1
+
+    def stats(self):
+        '''returns the state of the metrics
+
+        The buckets of the threads are read while the other threads may
+        still count, so the sums of the stages can be a little behind their
+        buckets.
+
+        Returns:
+            dict: `stages` (names of the stages mapped to the snapshots of
+            their histograms, see `LatencyHistogram.snapshot`), `errors`
+            (copy of `self.errors`) and `refresh` (`latency` histogram,
+            `refreshes`, `failures` and `last_refresh`)
+        '''
+        refresh_latency = self.refresh_latency.snapshot()
+        with self._lock:
+            stage_counts, stage_sums = self._create_counts()
+            for shard_counts in [self._retired_shard] + \
+                    list(self._shards.values()):
+                _add_counts((stage_counts, stage_sums), shard_counts)
+            return {'stages': {stage: _get_snapshot(self.stage_buckets,
+                                                    stage_counts[stage],
+                                                    stage_sums[stage])
+                               for stage in STAGES},
+                    'errors': dict(self.errors),
+                    'refresh': {'latency': refresh_latency,
+                                'refreshes': self.refreshes,
+                                'failures': self.refresh_failures,
+                                'last_refresh': self.last_refresh}}
+
+    def _create_counts(self):
+        '''
+        returns empty buckets (a list of counts per stage) and sums of the
+        stages
+        '''
+        return ({stage: [0] * (len(self.stage_buckets) + 1)
+                 for stage in STAGES},
+                dict.fromkeys(STAGES, 0.0))
+
+    def _add_shard(self):
+        '''
+        creates the buckets of the calling thread. They are added to the
+        retired buckets, once the thread has finished (its local data is
+        released)
+        '''
+        shard = _Shard(self._create_counts())
+        with self._lock:
+            self._shards[id(shard)] = shard.counts
+        weakref.finalize(shard, self._retire_shard, id(shard))
+        self._local.shard = shard
+        self._local.counts = shard.counts
+        return shard.counts
+
+    def _retire_shard(self, shard_id):
+        '''
+        moves the buckets of a finished thread into the retired buckets
+        '''
+        with self._lock:
+            _add_counts(self._retired_shard, self._shards.pop(shard_id))
+
+
+class _Shard(object):
+    '''
+    Holder of the buckets of one thread, the buckets are retired, when it's
+    released
+    '''
+    __slots__ = ('counts', '__weakref__')
+
+    def __init__(self, counts):
+        self.counts = counts
+
+
+def _get_snapshot(buckets, counts, total):
+    '''
+    returns the snapshot of a histogram (see `LatencyHistogram.snapshot`)
+    from its bounds, counts of the buckets and the sum of the durations
+    '''
+    cumulative_counts = []
+    cumulative_count = 0
+    for bound, bucket_count in zip(buckets + (math.inf,), counts):
+        cumulative_count += bucket_count
+        cumulative_counts.append((bound, cumulative_count))
+    return {'count': cumulative_count,
+            'sum': total,
+            'buckets': cumulative_counts}
+
+
+def _add_counts(target, source):
+    '''
+    adds the buckets and sums of the stages (output of
+    `ConverterMetrics._create_counts`) to other ones
+    '''
+    target_counts, target_sums = target
+    source_counts, source_sums = source
+    for stage in STAGES:
+        stage_counts = target_counts[stage]
+        for index, count in enumerate(source_counts[stage]):
+            stage_counts[index] += count
+        target_sums[stage] += source_sums[stage]
+
+
+def format_prometheus(stats, namespace=PROMETHEUS_NAMESPACE):
+    '''renders the statistics of a converter in the Prometheus text format
+
+    Args:
+        stats (dict): output of `CurrencyConverter.stats`
+        namespace (str): prefix of the names of the metrics
+
+    Returns:
+        str: the metrics (see `PROMETHEUS_CONTENT_TYPE`)
+    '''
+    lines = []
+
+    def add_metric(name, metric_type, description, samples):
+        '''
+        adds the header and the samples ((suffix, labels, value) triples) of
+        a metric
+        '''
+        full_name = '{0}_{1}'.format(namespace, name)
+        lines.append('# HELP {0} {1}'.format(full_name, description))
+        lines.append('# TYPE {0} {1}'.format(full_name, metric_type))
+        for suffix, labels, value in samples:
+            lines.append('{0}{1}{2} {3}'.format(full_name, suffix,
+                                                _format_labels(labels),
+                                                _format_value(value)))
+
+    add_metric('stage_seconds', 'histogram',
+               'Latency of the stages of the conversions.',
+               [sample
+                for stage, histogram in sorted(stats['stages'].items())
+                for sample in _get_histogram_samples(histogram,
+                                                     (('stage', stage),))])
+    add_metric('errors_total', 'counter',
+               'Conversions failed with an error.',
+               [('', (('error', error_name),), count)
+                for error_name, count in sorted(stats['errors'].items())])
+    refresh = stats['refresh']
+    add_metric('refresh_seconds', 'histogram',
+               'Latency of the downloads of the actual rates.',
+               _get_histogram_samples(refresh['latency'], ()))
+    add_metric('refreshes_total', 'counter',
+               'Refreshes, which brought newer rates.',
+               [('', (), refresh['refreshes'])])
+    add_metric('refresh_failures_total', 'counter',
+               'Refreshes, which failed.',
+               [('', (), refresh['failures'])])
+    snapshot_age = stats['snapshot_age']
+    add_metric('snapshot_age_seconds', 'gauge',
+               'Age of the actual rates (NaN without rates).',
+               [('', (), math.nan if snapshot_age is None else snapshot_age)])
+    result_cache = stats.get('result_cache')
+    if result_cache is not None:
+        add_metric('result_cache_hits_total', 'counter',
+                   'Conversions answered from the result cache.',
+                   [('', (), result_cache['hits'])])
+        add_metric('result_cache_misses_total', 'counter',
+                   'Conversions missing in the result cache.',
+                   [('', (), result_cache['misses'])])
+        add_metric('result_cache_size', 'gauge',
+                   'Entries of the result cache.',
+                   [('', (), result_cache['size'])])
+    return '\n'.join(lines) + '\n'
+
+
+def _get_histogram_samples(histogram, labels):
+    '''
+    returns the samples (bucket, sum and count) of a histogram snapshot
+    '''
+    samples = [('_bucket', labels + (('le', bound),), count)
+               for bound, count in histogram['buckets']]
+    samples.append(('_sum', labels, histogram['sum']))
+    samples.append(('_count', labels, histogram['count']))
+    return samples
+
+
+def _format_labels(labels):
+    '''
+    returns the labels of a sample, e.g. '{stage="resolution",le="0.001"}'
+    '''
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(name, _format_value(value))
+                          for name, value in labels) + '}'
+
+
+def _format_value(value):
+    '''
+    returns a value of a sample (or a label) in the Prometheus notation
+    '''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
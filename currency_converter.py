@@ -4,11 +4,25 @@ Created on 5. 12. 2017
 Command line interface for the converter class
 Can be used to convert money between different currencies
 
+A single conversion is sent to the converter daemon first (see
+`converter_daemon`, started by `--daemon`), the converter is loaded in this
+process only if no daemon is running. The converter modules are therefore
+imported only when they are needed.
+
 @author: patex1987
 '''
 import argparse
+import datetime as dt
+import io
+import json
+import os
 import sys
-from converter_class import CurrencyConverter
+import converter_daemon
+import currency_units
+import matrix_export
+
+
+BATCH_FORMATS = ('csv', 'ndjson')
 
 
 def main(arguments):
@@ -18,25 +32,251 @@ def main(arguments):
     Args:
         arguments: command line arguments returned by `get_parser`
     '''
+    if arguments.daemon:
+        return run_daemon(arguments)
+    if arguments.backfill is None and arguments.batch_file is None and \
+            arguments.matrix_format is None and arguments.use_daemon:
+        response = convert_via_daemon(arguments)
+        if response is not None:
+            if arguments.compact:
+                print(response.decode('utf-8'))
+            else:
+                print(json.dumps(json.loads(response.decode('utf-8')),
+                                 indent=4, sort_keys=True))
+            return
+    from converter_class import CurrencyConverter
     converter = CurrencyConverter()
+    if arguments.matrix_format is not None:
+        return export_matrix(converter, arguments)
+    if arguments.backfill is not None:
+        return backfill_history(converter, arguments)
+    if arguments.batch_file is not None:
+        return convert_batch(converter, arguments)
+    if arguments.compact:
+        response = converter.convert_json(
+            arguments.raw_input_amount,
+            arguments.raw_input_currency,
+            arguments.raw_output_currency,
+            on_date=arguments.on_date,
+            output_format=arguments.output_format)
+        print(response.decode('utf-8'))
+        return
     conv_result = converter.convert(arguments.raw_input_amount,
                                     arguments.raw_input_currency,
-                                    arguments.raw_output_currency)
+                                    arguments.raw_output_currency,
+                                    on_date=arguments.on_date,
+                                    output_format=arguments.output_format)
     output = converter.stringify_output(conv_result)
     print(output)
 
 
+def convert_via_daemon(arguments):
+    '''Sends the conversion to the converter daemon
+
+    Args:
+        arguments: command line arguments returned by `get_parser`
+
+    Returns:
+        bytes: output of `CurrencyConverter.convert` as compact JSON, None if
+        no daemon is running (or it doesn't answer)
+    '''
+    conversion = {'amount': arguments.raw_input_amount,
+                  'input_currency': arguments.raw_input_currency,
+                  'output_currency': arguments.raw_output_currency,
+                  'date': arguments.on_date,
+                  'output_format': arguments.output_format}
+    try:
+        return converter_daemon.request_conversion_json(conversion,
+                                                        arguments.socket_path)
+    except converter_daemon.DaemonError:
+        return None
+
+
+def export_matrix(converter, arguments):
+    '''Writes the whole cross-rate matrix (see `matrix_export`)
+
+    Args:
+        converter (CurrencyConverter): converter with the rates
+        arguments: command line arguments returned by `get_parser`
+
+    Returns:
+        int: 0 if the matrix has been written, 1 if the rates can't be
+        retrieved
+    '''
+    from converter_class import get_conversion_errors, get_error_message
+    try:
+        exported_matrix = converter.export_rates_matrix(
+            arguments.matrix_format, on_date=arguments.on_date)
+    except get_conversion_errors() as error:
+        sys.stderr.write('{0}\n'.format(get_error_message(error)))
+        return 1
+    if arguments.output_file in (None, '-'):
+        sys.stdout.flush()
+        sys.stdout.buffer.write(exported_matrix)
+        sys.stdout.buffer.flush()
+    else:
+        with open(arguments.output_file, 'wb') as output_file:
+            output_file.write(exported_matrix)
+    return 0
+
+
+def run_daemon(arguments):
+    '''Serves the conversions on the daemon's socket until it's interrupted
+    (Ctrl+C or SIGTERM)
+
+    Args:
+        arguments: command line arguments returned by `get_parser`
+
+    Returns:
+        int: 0 after a clean shutdown, 1 if the daemon couldn't be started
+    '''
+    import signal
+    converter = None
+    if arguments.cache_size:
+        from converter_class import CurrencyConverter
+        from result_cache import ResultCache
+        converter = CurrencyConverter()
+        converter.result_cache = ResultCache(arguments.cache_size)
+    try:
+        daemon = converter_daemon.ConverterDaemon(
+            converter, socket_path=arguments.socket_path)
+    except converter_daemon.DaemonError as error:
+        sys.stderr.write('{0}\n'.format(error))
+        return 1
+
+    def stop(signal_number, frame):
+        '''
+        turns SIGTERM into a clean exit
+        '''
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    sys.stderr.write('Listening on {0}\n'.format(daemon.socket_path))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+    return 0
+
+
+def convert_batch(converter, arguments):
+    '''Converts every row of the batch file and writes the results
+
+    The rows are read, converted and written one by one (generator
+    pipeline), the results are written to the output while the input is
+    still being read. The rates are loaded only once for the whole batch.
+
+    Args:
+        converter (CurrencyConverter): converter used for every row
+        arguments: command line arguments returned by `get_parser`
+    '''
+    import batch_io
+    readers = {'csv': batch_io.read_csv, 'ndjson': batch_io.read_ndjson}
+    writers = {'csv': batch_io.write_csv, 'ndjson': batch_io.write_ndjson}
+    batch_format = arguments.batch_format or \
+        get_batch_format(arguments.batch_file)
+    input_file = open_batch_file(arguments.batch_file, 'r', sys.stdin)
+    output_file = open_batch_file(arguments.output_file, 'w', sys.stdout)
+    try:
+        conversions = readers[batch_format](input_file)
+        results = batch_io.convert_stream(converter, conversions)
+        for line in writers[batch_format](results):
+            output_file.write(line)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+def backfill_history(converter, arguments):
+    '''Downloads the historical rates of the `--backfill` date range
+
+    The progress is written to the standard error output.
+
+    Args:
+        converter (CurrencyConverter): converter, whose history is filled
+        arguments: command line arguments returned by `get_parser`
+
+    Returns:
+        int: 0 if every day has been downloaded, otherwise 1
+    '''
+    import rates_backfill
+    first_day, last_day = arguments.backfill
+
+    def print_progress(report):
+        '''
+        prints the progress on a single line
+        '''
+        sys.stderr.write('\r' + str(report))
+        sys.stderr.flush()
+
+    report = rates_backfill.backfill(converter,
+                                     first_day,
+                                     last_day,
+                                     workers=arguments.workers,
+                                     progress=print_progress)
+    sys.stderr.write('\r{0} in {1:.1f} s\n'.format(report, report.elapsed))
+    for day in report.failed:
+        sys.stderr.write('failed: {0}\n'.format(day.isoformat()))
+    return 1 if report.failed else 0
+
+
+def get_date(raw_date):
+    '''converts a 'YYYY-MM-DD' argument to date
+
+    Raises:
+        argparse.ArgumentTypeError: if the date is not valid
+    '''
+    try:
+        return dt.datetime.strptime(raw_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'not a valid date (YYYY-MM-DD): {0}'.format(raw_date))
+
+
+def get_batch_format(file_name):
+    '''Guesses the batch format from the file extension
+
+    Args:
+        file_name (str): path of the batch file, `-` for standard input
+
+    Returns:
+        str: `csv` for .csv files, otherwise `ndjson`
+    '''
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    return 'ndjson'
+
+
+def open_batch_file(file_name, mode, standard_stream):
+    '''Opens a batch file (or returns the standard stream for `-`)
+
+    Args:
+        file_name (str): path of the file, `-` or None for the standard stream
+        mode (str): `r` or `w`
+        standard_stream: sys.stdin or sys.stdout
+
+    Returns:
+        file object opened in text mode
+    '''
+    if file_name in (None, '-'):
+        return standard_stream
+    return io.open(file_name, mode, encoding='utf-8', newline='')
+
+
 def get_parser():
     '''Gets the command line argument parser
     '''
     parser = argparse.ArgumentParser(description="Currency converter CLI")
     parser.add_argument("--amount",
-                        required=True,
                         type=float,
                         dest='raw_input_amount',
                         help="Input amount to be converted")
     parser.add_argument('--input_currency',
-                        required=True,
                         dest='raw_input_currency',
                         help='Input currency. 2 options: 3-letter currency ' +
                         'code; currency symbol')
@@ -46,9 +286,109 @@ def get_parser():
                         help='Output currency. 2 options: 3-letter currency ' +
                         'code; currency_symbol. Optional parameter, if ' +
                         'omitted, all available currencies will be used')
+    parser.add_argument('--date',
+                        default=None,
+                        dest='on_date',
+                        help='Day of the conversion rates (YYYY-MM-DD). ' +
+                        'Optional parameter, if omitted, the actual rates ' +
+                        'are used')
+    parser.add_argument('--output-format',
+                        default=currency_units.FLOAT_FORMAT,
+                        choices=currency_units.OUTPUT_FORMATS,
+                        dest='output_format',
+                        help='Format of the output amounts: float rounded ' +
+                        'to 2 decimal places (default), decimal string or ' +
+                        'integer minor units rounded to the decimal places ' +
+                        'of the output currency (e.g. 0 for JPY)')
+    parser.add_argument('--compact',
+                        action='store_true',
+                        help='Prints the result as compact JSON on one ' +
+                        'line instead of the indented JSON')
+    parser.add_argument('--batch',
+                        default=None,
+                        dest='batch_file',
+                        help='Batch mode. Converts every row of the file ' +
+                        '(- for standard input). Rows have amount, ' +
+                        'input_currency and output_currency fields')
+    parser.add_argument('--format',
+                        default=None,
+                        choices=BATCH_FORMATS,
+                        dest='batch_format',
+                        help='Format of the batch file and of the results. ' +
+                        'Optional parameter, if omitted, it is guessed from ' +
+                        'the file extension (ndjson for standard input)')
+    parser.add_argument('--output',
+                        default=None,
+                        dest='output_file',
+                        help='Output file of the batch mode. Optional ' +
+                        'parameter, if omitted, standard output is used')
+    parser.add_argument('--matrix',
+                        default=None,
+                        choices=matrix_export.EXPORT_FORMATS,
+                        dest='matrix_format',
+                        help='Writes the whole cross-rate matrix (rates ' +
+                        'between every pair of currencies) of the actual ' +
+                        'rates or of --date, to --output or standard output')
+    parser.add_argument('--backfill',
+                        default=None,
+                        nargs=2,
+                        type=get_date,
+                        metavar=('FIRST_DAY', 'LAST_DAY'),
+                        help='Downloads the historical rates of every day ' +
+                        'of the range (YYYY-MM-DD), which is not stored yet')
+    parser.add_argument('--workers',
+                        default=4,
+                        type=int,
+                        help='Maximal number of days downloaded at the same ' +
+                        'time by --backfill')
+    parser.add_argument('--daemon',
+                        action='store_true',
+                        help='Keeps the converter loaded and serves the ' +
+                        'conversions of other invocations on a Unix socket')
+    parser.add_argument('--socket',
+                        default=None,
+                        dest='socket_path',
+                        help='Path of the daemon socket. Optional ' +
+                        'parameter, defaults to $CURRENCY_CONVERTER_SOCKET ' +
+                        'or a per-user socket in $XDG_RUNTIME_DIR (/tmp)')
+    parser.add_argument('--no-daemon',
+                        action='store_false',
+                        dest='use_daemon',
+                        help='Converts in this process, even if a daemon ' +
+                        'is running')
+    parser.add_argument('--cache-size',
+                        default=0,
+                        type=int,
+                        dest='cache_size',
+                        help='Number of conversion results cached by the ' +
+                        'daemon (0 - no caching, default)')
     return parser
 
 
+def parse_arguments(parser, argv=None):
+    '''Parses the command line and checks the required arguments
+
+    `--amount` and `--input_currency` are required, unless the batch mode,
+    the backfill, the matrix export or the daemon is used.
+
+    Args:
+        parser: parser returned by `get_parser`
+        argv (:obj:`list` of :obj:`str`, optional): command line arguments,
+            defaults to sys.argv
+
+    Returns:
+        parsed command line arguments
+    '''
+    arguments = parser.parse_args(argv)
+    if arguments.batch_file is None and arguments.backfill is None and \
+            arguments.matrix_format is None and not arguments.daemon and (
+            arguments.raw_input_amount is None or
+            arguments.raw_input_currency is None):
+        parser.error('the following arguments are required: ' +
+                     '--amount, --input_currency (or --batch)')
+    return arguments
+
+
 if __name__ == '__main__':
-    ARGS = get_parser().parse_args()
+    ARGS = parse_arguments(get_parser())
     sys.exit(main(ARGS))
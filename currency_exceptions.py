@@ -5,6 +5,19 @@ Created on 28. 11. 2017
 '''
 
 
+def get_connection_error():
+    '''returns the ConnectionError raised if the rates can't be downloaded
+
+    It's the ConnectionError of requests, which is imported only on the
+    first call (requests is needed only for downloading the rates).
+
+    Returns:
+        type: `requests.exceptions.ConnectionError`
+    '''
+    from requests.exceptions import ConnectionError
+    return ConnectionError
+
+
 class FixerError(Exception):
     '''
     Exception for handling connectivity errors with fixer.io
@@ -40,3 +53,10 @@ class TooManyCurrencies(Exception):
     currency symbol
     '''
     pass
+
+
+class DateError(Exception):
+    '''
+    Exception thrown, if a wrong or not supported date is provided
+    '''
+    pass
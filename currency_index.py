@@ -0,0 +1,95 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the CurrencyIndex class
+- CurrencyIndex maps every accepted currency token (3-letter code, its lower
+and capitalized variants, currency symbol) to the tuple of the available
+currencies it represents
+- The output currencies are precomputed for every possible input currency
+(the input currency is left out of symbols and of "every currency"), so a
+currency is resolved by a single dictionary lookup
+- The index is built once for every set of available currencies
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+
+class CurrencyIndex(object):
+    '''Resolution index of the currency codes and symbols
+
+    Precedence of the tokens: the exact 3-letter codes, then the case
+    variants of the codes, then symbols. A symbol never hides a code, so
+    the codes resolve the same way with or without the symbols map.
+
+    Attributes:
+        currencies (:obj:`tuple` of :obj:`str`): the available currencies
+        inputs (dict): maps tokens to the tuple of currencies they represent
+        outputs (dict): maps tokens (None means every currency) to a
+            dictionary, which maps the input currency to the tuple of the
+            output currencies. The key None holds the output currencies
+            without excluding any input currency
+    '''
+
+    def __init__(self, available_currencies, symbols_map):
+        '''CurrencyIndex's __init__ method
+
+        Args:
+            available_currencies (:obj:`list` of :obj:`str`): 3-letter codes
+                of the available currencies
+            symbols_map (dict of bytes: list): maps utf-8 encoded symbols to
+                their 3-letter codes (see
+                `CurrencyConverter._get_symbols_map`)
+        '''
+        self.currencies = tuple(available_currencies)
+        available = set(self.currencies)
+        self.inputs = {}
+        self.outputs = {None: _get_variants(self.currencies)}
+        for currency in self.currencies:
+            for variant in (currency.lower(), currency.capitalize()):
+                self.inputs[variant] = (currency,)
+                self.outputs[variant] = {None: (currency,)}
+        for currency in self.currencies:
+            self.inputs[currency] = (currency,)
+            self.outputs[currency] = {None: (currency,)}
+        for b_symbol, symbol_currencies in symbols_map.items():
+            symbol_currencies = tuple(
+                currency for currency in _unique(symbol_currencies)
+                if currency in available)
+            if not symbol_currencies:
+                continue
+            symbol = b_symbol.decode('utf-8')
+            if symbol in self.inputs:
+                continue
+            self.inputs[symbol] = symbol_currencies
+            self.outputs[symbol] = _get_variants(symbol_currencies)
+
+
+def _get_variants(currencies):
+    '''returns the output currencies for every input currency
+
+    Args:
+        currencies (:obj:`tuple` of :obj:`str`): the output currencies
+
+    Returns:
+        dict: maps the input currencies to `currencies` without them, None
+        (and any other input currency) to `currencies`
+    '''
+    variants = {None: currencies}
+    for excluded in currencies:
+        variants[excluded] = tuple(currency for currency in currencies
+                                   if currency != excluded)
+    return variants
+
+
+def _unique(currencies):
+    '''
+    yields the currencies without duplicates (in the original order)
+    '''
+    seen = set()
+    for currency in currencies:
+        if currency not in seen:
+            seen.add(currency)
+            yield currency
@@ -0,0 +1,137 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the minor units of the currencies
+- The number of decimal places (exponent) of every currency according to
+ISO 4217, e.g. 0 for JPY, 2 for EUR, 3 for BHD
+- The output formats of the converted amounts: float (rounded to 2 decimal
+places, the original format), exact decimal string or integer minor units
+(both rounded to the exponent of the output currency)
+- Decimal strings are formatted from the integer minor units, without
+creating Decimal objects
+- The rounding points of sums of converted amounts: every line rounded (the
+total is the sum of the rounded lines) or only the total rounded
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+
+DEFAULT_EXPONENT = 2
+
+# ISO 4217 currencies, whose minor unit isn't 1/100
+EXPONENTS = {
+    'BIF': 0, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'ISK': 0, 'JPY': 0, 'KMF': 0,
+    'KRW': 0, 'PYG': 0, 'RWF': 0, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0,
+    'XAF': 0, 'XOF': 0, 'XPF': 0,
+    'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+    'CLF': 4, 'UYW': 4,
+}
+
+FLOAT_FORMAT = 'float'
+DECIMAL_FORMAT = 'decimal'
+MINOR_UNITS_FORMAT = 'minor'
+OUTPUT_FORMATS = (FLOAT_FORMAT, DECIMAL_FORMAT, MINOR_UNITS_FORMAT)
+
+LINES_ROUNDING = 'lines'
+TOTAL_ROUNDING = 'total'
+ROUNDING_POINTS = (LINES_ROUNDING, TOTAL_ROUNDING)
+
+
+def get_exponent(currency):
+    '''returns the number of decimal places of a currency
+
+    Args:
+        currency (str): 3-letter currency code
+
+    Returns:
+        int: the ISO 4217 exponent, 2 for unknown currencies
+    '''
+    return EXPONENTS.get(currency, DEFAULT_EXPONENT)
+
+
+def check_output_format(output_format):
+    '''checks the name of an output format
+
+    Args:
+        output_format (str): one of `OUTPUT_FORMATS`
+
+    Returns:
+        str: the output format
+
+    Raises:
+        ValueError: If the output format isn't known
+    '''
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError('Unknown output format: {0}'.format(output_format))
+    return output_format
+
+
+def check_rounding_point(rounding):
+    '''checks the name of a rounding point
+
+    Args:
+        rounding (str): one of `ROUNDING_POINTS`
+
+    Returns:
+        str: the rounding point
+
+    Raises:
+        ValueError: If the rounding point isn't known
+    '''
+    if rounding not in ROUNDING_POINTS:
+        raise ValueError('Unknown rounding point: {0}'.format(rounding))
+    return rounding
+
+
+def get_output_exponent(currency, output_format):
+    '''returns the number of decimal places of the amounts in an output format
+
+    Args:
+        currency (str): 3-letter currency code
+        output_format (str): one of `OUTPUT_FORMATS`
+
+    Returns:
+        int: 2 for floats, the exponent of the currency otherwise
+    '''
+    if output_format == FLOAT_FORMAT:
+        return DEFAULT_EXPONENT
+    return get_exponent(currency)
+
+
+def from_minor_units(minor_units, exponent, output_format):
+    '''returns an amount in minor units in an output format
+
+    Args:
+        minor_units (int): the amount in minor units
+        exponent (int): number of decimal places
+        output_format (str): one of `OUTPUT_FORMATS`
+
+    Returns:
+        float, str or int: the amount
+    '''
+    if output_format == FLOAT_FORMAT:
+        return minor_units / 10 ** exponent
+    if output_format == MINOR_UNITS_FORMAT:
+        return minor_units
+    return format_minor_units(minor_units, exponent)
+
+
+def format_minor_units(minor_units, exponent):
+    '''formats an amount in minor units as a decimal string
+
+    Args:
+        minor_units (int): the amount in minor units
+        exponent (int): number of decimal places
+
+    Returns:
+        str: the amount with exactly `exponent` decimal places, e.g.
+        '-12.30' for (-1230, 2)
+    '''
+    if exponent == 0:
+        return str(minor_units)
+    sign = '-' if minor_units < 0 else ''
+    digits = str(abs(minor_units)).rjust(exponent + 1, '0')
+    return '{0}{1}.{2}'.format(sign, digits[:-exponent], digits[-exponent:])
@@ -0,0 +1,210 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the FakeRateServer class
+- FakeRateServer is an in-process HTTP server imitating fixer.io, with
+adjustable latency and failures, so the whole download path (see
+`rate_providers.HttpJsonProvider`) can be tested and benchmarked without
+network
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import datetime as dt
+import decimal
+import email.utils
+import http.server
+import json
+import socketserver
+import threading
+import time
+
+
+class FakeRateServer(object):
+    '''In-process HTTP server imitating fixer.io
+
+    Serves `/latest?base=...` and `/YYYY-MM-DD?base=...` in a background
+    thread. The latest rates are versioned (ETag, Last-Modified) and the
+    conditional requests are answered with 304. Rates of other base
+    currencies are calculated from the EUR rates, the rates of a day are
+    derived from the latest rates, unless they are set explicitly.
+
+    Attributes:
+        url (str): URL of the server (use it as `HttpJsonProvider.base_url`)
+        latency (float): delay of every response in seconds
+        limited (int): number of next requests answered with the HTML page of
+            the exceeded request limit
+        failures (int): number of next requests answered with HTTP 500
+        requests (:obj:`list` of :obj:`str`): paths of the received requests
+        history (dict): maps days (:obj:`datetime.date`) to their EUR rates
+    '''
+
+    def __init__(self, rates=None, latency=0.0, host='127.0.0.1', port=0):
+        '''FakeRateServer's __init__ method
+
+        Args:
+            rates (dict, optional): the latest EUR rates
+            latency (float): delay of every response in seconds
+            host (str): address to listen on
+            port (int): port to listen on, 0 means any free port
+        '''
+        self.latency = latency
+        self.limited = 0
+        self.failures = 0
+        self.requests = []
+        self.history = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._published = None
+        self._rates = None
+        self.publish(rates or {'CZK': 25.5, 'GBP': 0.88, 'JPY': 133.7,
+                               'USD': 1.18})
+        self._server = _ThreadingHTTPServer((host, port), _FakeRatesHandler)
+        self._server.fake = self
+        self._thread = None
+        self.url = 'http://{0}:{1}'.format(*self._server.server_address[:2])
+
+    def publish(self, rates):
+        '''publishes new latest rates (new ETag)
+
+        Args:
+            rates (dict): the new EUR rates
+        '''
+        with self._lock:
+            self._rates = dict(rates)
+            self._version += 1
+            self._published = time.time()
+
+    def start(self):
+        '''starts serving in a background thread
+
+        Returns:
+            :obj:`FakeRateServer`: the server itself
+        '''
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='FakeRateServer')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''stops serving and closes the socket
+        '''
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def handle(self, path, headers):
+        '''creates the response of a request
+
+        Args:
+            path (str): path of the request (with the query)
+            headers: headers of the request
+
+        Returns:
+            tuple: status code, headers (dict) and body (bytes)
+        '''
+        with self._lock:
+            self.requests.append(path)
+            if self.limited:
+                self.limited -= 1
+                return 200, {'Content-Type': 'text/html'}, \
+                    b'<html>Request limit exceeded</html>'
+            if self.failures:
+                self.failures -= 1
+                return 500, {'Content-Type': 'text/plain'}, b'Server error'
+            endpoint, _, query = path.lstrip('/').partition('?')
+            base_currency = 'EUR'
+            if query.startswith('base='):
+                base_currency = query[len('base='):]
+            if endpoint == 'latest':
+                rates = self._rates
+                etag = '"{0}"'.format(self._version)
+                day = dt.date.fromtimestamp(self._published)
+            else:
+                try:
+                    day = dt.datetime.strptime(endpoint, '%Y-%m-%d').date()
+                except ValueError:
+                    return 404, {'Content-Type': 'text/plain'}, b'Not found'
+                rates = self.history.get(day) or \
+                    self._get_derived_rates(day)
+                etag = None
+        response_headers = {'Content-Type': 'application/json'}
+        if etag is not None:
+            response_headers['ETag'] = etag
+            response_headers['Last-Modified'] = email.utils.formatdate(
+                self._published, usegmt=True)
+            if headers.get('If-None-Match') == etag:
+                return 304, response_headers, b''
+        body = json.dumps({'base': base_currency,
+                           'date': day.isoformat(),
+                           'rates': _rebase(rates, base_currency)})
+        return 200, response_headers, body.encode('utf-8')
+
+    def _get_derived_rates(self, day):
+        '''returns deterministic rates of a day derived from the latest ones
+        '''
+        change = 1 + (day.toordinal() % 101 - 50) / 10000.0
+        return {currency: round(rate * change, 4)
+                for currency, rate in self._rates.items()}
+
+
+def _rebase(eur_rates, base_currency):
+    '''calculates the rates against another base currency (5 decimals)
+    '''
+    if base_currency == 'EUR':
+        return dict(eur_rates)
+    all_rates = dict(eur_rates)
+    all_rates['EUR'] = 1.0
+    base_rate = decimal.Decimal(all_rates[base_currency])
+    precision = decimal.Decimal('.00001')
+    return {currency: float((decimal.Decimal(rate) / base_rate).quantize(
+        precision, rounding=decimal.ROUND_HALF_UP))
+            for currency, rate in all_rates.items()
+            if currency != base_currency}
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    '''
+    HTTP server handling every request in its own thread
+    '''
+    daemon_threads = True
+
+
+class _FakeRatesHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    Request handler of FakeRateServer
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        '''
+        answers a GET request
+        '''
+        fake = self.server.fake
+        if fake.latency:
+            time.sleep(fake.latency)
+        status, headers, body = fake.handle(self.path, self.headers)
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        '''
+        doesn't log the requests
+        '''
+        pass
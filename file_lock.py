@@ -0,0 +1,176 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the FileLock class and the atomic file writing
+- FileLock is an exclusive lock shared by every process using the same lock
+file (e.g. the workers of a web server)
+- The lock file also works as a lease: the lock holder can leave a short note
+in it (e.g. which rates update was already tried), the next holder reads it
+- `write_atomic` replaces a file at once, the readers never see a partially
+written file
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import io
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# umask of the process, read once (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class FileLock(object):
+    '''Exclusive lock between processes based on a lock file
+
+    Attributes:
+        path (str): path of the lock file
+        poll_interval (float): seconds between two attempts to get the lock
+    '''
+
+    def __init__(self, path, poll_interval=0.05):
+        '''FileLock's __init__ method
+
+        Args:
+            path (str): path of the lock file (created, if it doesn't exist)
+            poll_interval (float): seconds between two attempts to get the
+                lock
+        '''
+        self.path = path
+        self.poll_interval = poll_interval
+        self._handle = None
+
+    def acquire(self, timeout=None):
+        '''Gets the lock
+
+        Args:
+            timeout (float, optional): maximal waiting time in seconds. None
+                means waiting until the lock is released
+
+        Returns:
+            bool: True if the lock has been acquired
+        '''
+        handle = io.open(self.path, 'a+b')
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            try:
+                _lock_handle(handle)
+                break
+            except (IOError, OSError):
+                if deadline is not None and time.time() >= deadline:
+                    handle.close()
+                    return False
+                time.sleep(self.poll_interval)
+        self._handle = handle
+        return True
+
+    def release(self):
+        '''Releases the lock
+        '''
+        handle = self._handle
+        self._handle = None
+        try:
+            _unlock_handle(handle)
+        finally:
+            handle.close()
+
+    def read_note(self):
+        '''returns the note left in the lock file by the last holder
+
+        Returns:
+            str: the note (empty string if there is none)
+        '''
+        self._handle.seek(0)
+        return self._handle.read().decode('utf-8', errors='replace')
+
+    def write_note(self, note):
+        '''leaves a note in the lock file for the next holder
+
+        Args:
+            note (str): the note
+        '''
+        self._handle.seek(0)
+        self._handle.truncate()
+        self._handle.write(note.encode('utf-8'))
+        self._handle.flush()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def _lock_handle(handle):
+    '''locks an open file without waiting
+
+    Raises:
+        IOError: if the file is locked by someone else
+    '''
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return
+    handle.seek(0)
+    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock_handle(handle):
+    '''unlocks a file locked by `_lock_handle`
+    '''
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        return
+    handle.seek(0)
+    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _get_file_mode(path):
+    '''returns the permissions of a file written by `write_atomic`
+    '''
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_atomic(path, data):
+    '''writes a file at once
+
+    The data is written into a temporary file in the same directory, which
+    then replaces the original file. A crash during writing leaves the
+    original file untouched. The new file keeps the permissions of the
+    replaced one, a new file gets the permissions of `open` (the temporary
+    file would be readable only by its owner, not by other processes
+    sharing the file).
+
+    Args:
+        path (str): path of the file
+        data (bytes): the new content of the file
+    '''
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory,
+                                         prefix='.' + os.path.basename(path),
+                                         suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.chmod(temp_path, _get_file_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,329 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the exact fixed-point arithmetic of the conversions
+- Amounts and rates (floats or integers) are represented exactly as scaled
+integers (`numerator / 2 ** shift`, which is what a float is), their product
+is rounded to minor units (ROUND_HALF_UP) with integer arithmetic only
+- The results are bit-for-bit the same as the results of the Decimal
+calculation (see `calculate_decimal_amount`), including the rounding of the
+product to the precision of the decimal context (28 significant digits),
+which matters for products closer to a half minor unit than 1e-27 of their
+value (e.g. large amounts)
+- Most products aren't close to a half minor unit at all, they are rounded
+directly in floats (the float product is off by a few ulps at most), only the
+remaining ones need the exact calculation
+- Amounts of other types (e.g. Decimal), non-finite amounts and amounts out
+of the range of the decimal context are calculated with decimals
+- Sums of products (e.g. the value of a portfolio) are calculated exactly and
+rounded only once (see `get_minor_units_of_sum`)
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import decimal
+import fractions
+import math
+
+
+DECIMAL_PRECISION = 28
+AMOUNT_EXPONENT = 2
+
+_PRECISION_LIMIT = 10 ** DECIMAL_PRECISION
+_ULP_FACTOR = 10 ** (DECIMAL_PRECISION - 1)
+_POWERS_OF_TEN = tuple(10 ** exponent for exponent in range(19))
+_FLOAT_POWERS_OF_TEN = tuple(float(power) for power in _POWERS_OF_TEN)
+_FAST_TYPES = (float, int)
+
+# The float product differs from the exact product by a few ulps at most.
+# Products closer to a half minor unit than this relative margin are
+# rounded by the exact calculation.
+TIE_MARGIN = 8 * 2.0 ** -52
+MAX_EXACT_FLOAT = 2.0 ** 52
+
+
+def to_fixed(value):
+    '''returns the exact scaled integer representation of a number
+
+    Args:
+        value (float or int): the number
+
+    Returns:
+        tuple: (numerator, shift, negative), where
+        `value == numerator / 2 ** shift`, numerator isn't negative and
+        negative is the sign of the value (also for -0.0). None if the value
+        isn't a finite float or an integer
+    '''
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        numerator, denominator = value.as_integer_ratio()
+        negative = numerator < 0 or math.copysign(1.0, value) < 0.0
+        return abs(numerator), denominator.bit_length() - 1, negative
+    if isinstance(value, int):
+        return abs(int(value)), 0, value < 0
+    return None
+
+
+def get_minor_units(input_amount, conversion_rate, exponent=AMOUNT_EXPONENT):
+    '''Converts the amount into minor units of the output currency
+
+    Args:
+        input_amount (float or int): amount to be converted
+        conversion_rate (float): conversion rate
+        exponent (int): number of decimal places of the output currency
+
+    Returns:
+        int: the converted amount rounded (ROUND_HALF_UP) to
+        `10 ** -exponent`, in these units (e.g. cents)
+
+    Raises:
+        ValueError: If the amount (or the rate) isn't finite
+        decimal.InvalidOperation: If the amount has more digits than the
+        decimal context
+    '''
+    rounded_units = _round_in_floats(input_amount, conversion_rate, exponent)
+    if rounded_units is not None:
+        return int(rounded_units)
+    fixed_amount = to_fixed(input_amount)
+    fixed_rate = to_fixed(conversion_rate)
+    minor_units = None
+    if fixed_amount is not None and fixed_rate is not None:
+        minor_units = _round_product(fixed_amount, fixed_rate, exponent)
+    if minor_units is None:
+        if not decimal.Decimal(input_amount).is_finite() or \
+                not decimal.Decimal(conversion_rate).is_finite():
+            raise ValueError('The amount is not finite')
+        rounded_output = _get_decimal_product(input_amount, conversion_rate,
+                                              exponent)
+        return int(rounded_output.scaleb(exponent))
+    if fixed_amount[2] != fixed_rate[2]:
+        return -minor_units
+    return minor_units
+
+
+def get_minor_units_of_sum(input_amounts,
+                           conversion_rates,
+                           exponent=AMOUNT_EXPONENT):
+    '''Converts the amounts at their rates and rounds only the sum
+
+    The products are summed exactly (as scaled integers, amounts of other
+    types than floats and integers as fractions), there is no rounding
+    except the final one.
+
+    Args:
+        input_amounts (iterable): amounts to be converted
+        conversion_rates (iterable): conversion rate of every amount
+        exponent (int): number of decimal places of the output currency
+
+    Returns:
+        int: the sum of the products rounded (ROUND_HALF_UP) to
+        `10 ** -exponent`, in these units
+
+    Raises:
+        ValueError: If an amount (or a rate) isn't finite
+    '''
+    terms = list(zip(input_amounts, conversion_rates))
+    numerator = 0
+    shift = 0
+    for input_amount, conversion_rate in terms:
+        fixed_amount = to_fixed(input_amount)
+        fixed_rate = to_fixed(conversion_rate)
+        if fixed_amount is None or fixed_rate is None:
+            return _round_fraction_sum(terms, exponent)
+        product = fixed_amount[0] * fixed_rate[0]
+        if fixed_amount[2] != fixed_rate[2]:
+            product = -product
+        product_shift = fixed_amount[1] + fixed_rate[1]
+        if product_shift > shift:
+            numerator <<= product_shift - shift
+            shift = product_shift
+        numerator += product << (shift - product_shift)
+    return _round_half_up(numerator * _POWERS_OF_TEN[exponent], 1 << shift)
+
+
+def calculate_output_amount(input_amount,
+                            conversion_rate,
+                            exponent=AMOUNT_EXPONENT):
+    '''Calculates the output amount (drop-in replacement of
+    `calculate_decimal_amount`)
+
+    Args:
+        input_amount (:obj:`numbers.Number`): amount to be converted
+        conversion_rate (float): conversion rate
+        exponent (int): number of decimal places of the output amount
+
+    Returns:
+        float: converted output amount
+    '''
+    rounded_units = _round_in_floats(input_amount, conversion_rate, exponent)
+    if rounded_units is not None:
+        return rounded_units / _FLOAT_POWERS_OF_TEN[exponent]
+    return calculate_exact_amount(input_amount, conversion_rate, exponent)
+
+
+def calculate_exact_amount(input_amount,
+                           conversion_rate,
+                           exponent=AMOUNT_EXPONENT):
+    '''Calculates the output amount with integer arithmetic only (no
+    rounding in floats)
+
+    Args:
+        input_amount (:obj:`numbers.Number`): amount to be converted
+        conversion_rate (float): conversion rate
+        exponent (int): number of decimal places of the output amount
+
+    Returns:
+        float: converted output amount
+    '''
+    fixed_amount = to_fixed(input_amount)
+    fixed_rate = to_fixed(conversion_rate)
+    if fixed_amount is None or fixed_rate is None:
+        return calculate_decimal_amount(input_amount, conversion_rate,
+                                        exponent)
+    minor_units = _round_product(fixed_amount, fixed_rate, exponent)
+    if minor_units is None:
+        return calculate_decimal_amount(input_amount, conversion_rate,
+                                        exponent)
+    output_amount = minor_units / _POWERS_OF_TEN[exponent]
+    if fixed_amount[2] != fixed_rate[2]:
+        return -output_amount
+    return output_amount
+
+
+def calculate_decimal_amount(input_amount,
+                             conversion_rate,
+                             exponent=AMOUNT_EXPONENT):
+    '''Calculates the output amount with decimals (the reference calculation)
+
+    Args:
+        input_amount (:obj:`numbers.Number`): amount to be converted
+        conversion_rate (float): conversion rate
+        exponent (int): number of decimal places of the output amount
+
+    Returns:
+        float: converted output amount
+    '''
+    return float(_get_decimal_product(input_amount, conversion_rate,
+                                      exponent))
+
+
+def _get_decimal_product(input_amount, conversion_rate, exponent):
+    '''returns the product of the amount and the rate as a decimal rounded
+    to `exponent` decimal places (ROUND_HALF_UP)
+    '''
+    output_amount = decimal.Decimal(input_amount) * \
+        decimal.Decimal(conversion_rate)
+    return output_amount.quantize(decimal.Decimal(1).scaleb(-exponent),
+                                  rounding=decimal.ROUND_HALF_UP)
+
+
+def _round_fraction_sum(terms, exponent):
+    '''rounds the sum of the products of (amount, rate) pairs of any
+    numeric types to minor units (ROUND_HALF_UP)
+
+    Raises:
+        ValueError: If an amount (or a rate) isn't finite
+    '''
+    try:
+        total = sum(fractions.Fraction(input_amount) *
+                    fractions.Fraction(conversion_rate)
+                    for input_amount, conversion_rate in terms)
+    except (OverflowError, decimal.InvalidOperation):
+        raise ValueError('The amount is not finite')
+    total *= _POWERS_OF_TEN[exponent]
+    return _round_half_up(total.numerator, total.denominator)
+
+
+def _round_half_up(numerator, denominator):
+    '''rounds `numerator / denominator` to an integer, halves away from zero
+    (ROUND_HALF_UP of decimals)
+    '''
+    rounded = (2 * abs(numerator) + denominator) // (2 * denominator)
+    if numerator < 0:
+        return -rounded
+    return rounded
+
+
+def _round_in_floats(input_amount, conversion_rate, exponent):
+    '''rounds the product in floats, if it's far enough from a half minor
+    unit
+
+    Returns:
+        float: the signed product rounded to whole minor units, None if the
+        exact calculation is needed
+    '''
+    if type(input_amount) not in _FAST_TYPES or \
+            type(conversion_rate) not in _FAST_TYPES:
+        return None
+    try:
+        scaled = float(input_amount) * float(conversion_rate) * \
+            _FLOAT_POWERS_OF_TEN[exponent]
+    except OverflowError:
+        return None
+    magnitude = abs(scaled)
+    if not magnitude < MAX_EXACT_FLOAT:
+        return None
+    whole = float(int(magnitude))
+    fraction = magnitude - whole
+    if abs(fraction - 0.5) <= TIE_MARGIN * magnitude:
+        return None
+    if fraction > 0.5:
+        whole += 1.0
+    return math.copysign(whole, scaled)
+
+
+def _round_product(fixed_amount, fixed_rate, exponent):
+    '''rounds the absolute value of the product to minor units
+
+    The exact product is rounded half up with a shift. If it lies so close to
+    a half minor unit, that the rounding of the decimal context could move it
+    across (or onto) the half, the rounding of the context is reproduced.
+
+    Args:
+        fixed_amount (tuple): amount returned by `to_fixed`
+        fixed_rate (tuple): rate returned by `to_fixed`
+        exponent (int): number of decimal places of the result
+
+    Returns:
+        int: absolute value of the rounded product in minor units, None if
+        it doesn't fit into the precision of the decimal context
+    '''
+    product = fixed_amount[0] * fixed_rate[0]
+    shift = fixed_amount[1] + fixed_rate[1]
+    doubled = ((product * _POWERS_OF_TEN[exponent]) << 1) + (1 << shift)
+    minor_units = doubled >> (shift + 1)
+    if minor_units >= _PRECISION_LIMIT // 10:
+        return None
+    remainder = doubled - (minor_units << (shift + 1))
+    distance = min(remainder, (2 << shift) - remainder)
+    if distance * _ULP_FACTOR <= (minor_units + 1) << shift:
+        return _round_in_context(product, shift, exponent)
+    return minor_units
+
+
+def _round_in_context(product, shift, exponent):
+    '''rounds `product / 2 ** shift` like the decimal calculation: to the
+    precision of the context (ROUND_HALF_EVEN) first, then to minor units
+    (ROUND_HALF_UP)
+
+    Returns:
+        int: absolute value of the rounded product in minor units
+    '''
+    digits = product * 5 ** shift
+    decimal_shift = shift
+    length = len(str(digits))
+    if length > DECIMAL_PRECISION:
+        dropped = length - DECIMAL_PRECISION
+        digits, rest = divmod(digits, 10 ** dropped)
+        half = 5 * 10 ** (dropped - 1)
+        if rest > half or (rest == half and digits & 1):
+            digits += 1
+        decimal_shift -= dropped
+    if decimal_shift <= exponent:
+        return digits * 10 ** (exponent - decimal_shift)
+    divisor = 10 ** (decimal_shift - exponent)
+    return (2 * digits + divisor) // (2 * divisor)
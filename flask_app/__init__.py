@@ -2,6 +2,11 @@ from flask import Flask
 
 
 app = Flask(__name__)
+app.config.setdefault('RATES_BACKGROUND_REFRESH', False)
+app.config.setdefault('RATES_PROVIDER_URL', None)
+app.config.setdefault('RESULT_CACHE_SIZE', 0)
+app.config.setdefault('RESULT_CACHE_TTL', None)
+app.config.setdefault('RESULT_CACHE_POLICY', 'lru')
 
 
 from flask_app import routes
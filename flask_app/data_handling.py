@@ -5,38 +5,265 @@ Created on 04. 12. 2017
 
 contains code for handling data from flask requests
 '''
+import os
+import threading
+import batch_io
+import converter_metrics
+import currency_units
+import http_caching
+import matrix_export
+import response_json
 from converter_class import CurrencyConverter
+from converter_class import get_conversion_errors, get_error_message
+from rate_providers import HttpJsonProvider
+from rates_refresher import RatesRefresher
+from result_cache import ResultCache
+from flask_app import app
 
 from flask import jsonify
+from flask import make_response
+from flask import Response
+
+
+_CONVERTER = None
+_CONVERTER_PID = None
+_CONVERTER_LOCK = threading.Lock()
+_REFRESHER = None
+
+
+def get_converter():
+    '''returns the converter shared by every request of the worker process
+
+    The converter is created on the first call (in every worker process, so
+    forked workers don't share the lock and file state of their parent).
+    Later calls only check whether the rates file has been changed on disk
+    (e.g. by another worker) and reload it in that case. Newer rates from
+    fixer.io are handled by the converter itself during the conversion, or
+    by a background `RatesRefresher`, if the `RATES_BACKGROUND_REFRESH`
+    option of the app is set. A converter, which couldn't retrieve any rates,
+    is created again (unless it is refreshed in the background). The rates
+    are downloaded from `RATES_PROVIDER_URL`, if it is set (a fixer.io-like
+    API, e.g. a `rate_providers.FakeRateServer`). If `RESULT_CACHE_SIZE` is
+    set, the results of the conversions are cached (see `result_cache`,
+    `RESULT_CACHE_TTL` and `RESULT_CACHE_POLICY` tune the cache).
+
+    Returns:
+        CurrencyConverter: the process-wide converter
+    '''
+    global _CONVERTER, _CONVERTER_PID, _REFRESHER
+    converter = _CONVERTER
+    if converter is not None and _CONVERTER_PID == os.getpid():
+        converter.reload_if_changed()
+        if converter.available_currencies or _REFRESHER is not None:
+            return converter
+    with _CONVERTER_LOCK:
+        if _CONVERTER is None or _CONVERTER_PID != os.getpid():
+            _REFRESHER = None
+        if _REFRESHER is None and (_CONVERTER is None or
+                                   _CONVERTER_PID != os.getpid() or
+                                   not _CONVERTER.available_currencies):
+            provider = None
+            if app.config['RATES_PROVIDER_URL']:
+                provider = HttpJsonProvider(app.config['RATES_PROVIDER_URL'])
+            _CONVERTER = CurrencyConverter(symbols_file=r'./txt/symbols.txt',
+                                           rates_file='./rates.snapshot',
+                                           history_file='./rates.history',
+                                           provider=provider)
+            _CONVERTER_PID = os.getpid()
+            if app.config['RESULT_CACHE_SIZE']:
+                _CONVERTER.result_cache = ResultCache(
+                    app.config['RESULT_CACHE_SIZE'],
+                    ttl=app.config['RESULT_CACHE_TTL'],
+                    policy=app.config['RESULT_CACHE_POLICY'])
+            if app.config['RATES_BACKGROUND_REFRESH']:
+                _REFRESHER = RatesRefresher(_CONVERTER)
+                _REFRESHER.start()
+        return _CONVERTER
+
+
+def handle_status():
+    '''returns the actuality of the rates and the state of the refreshing
+
+    Returns:
+        str: jsonified status (see `RatesRefresher.status`). Without
+        background refreshing only the status of the rates is returned
+    '''
+    converter = get_converter()
+    if _REFRESHER is not None:
+        status = _REFRESHER.status()
+    else:
+        status = converter.get_rates_status()
+    status['background_refresh'] = _REFRESHER is not None
+    for key, value in status.items():
+        if hasattr(value, 'isoformat'):
+            status[key] = value.isoformat()
+    return jsonify(status)
+
+
+def handle_metrics():
+    '''returns the statistics of the shared converter for Prometheus
+
+    Returns:
+        Response: the statistics (see `CurrencyConverter.stats`) in the
+        Prometheus text format
+    '''
+    stats = get_converter().stats()
+    return Response(converter_metrics.format_prometheus(stats),
+                    content_type=converter_metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+def handle_cache_validators(raw_date=None):
+    '''returns the cache validators of a conversion request
+
+    Args:
+        raw_date (str): day of the rates, None for the actual rates
+
+    Returns:
+        dict: output of `http_caching.get_validators`. None if the response
+        shouldn't be cached (historical rates, no rates or stale rates)
+    '''
+    if raw_date is not None:
+        return None
+    return http_caching.get_validators(get_converter())
 
 
 def handle_raw_data(raw_amount,
                     raw_input_currency,
-                    raw_output_currency):
+                    raw_output_currency,
+                    raw_date=None,
+                    raw_format=None):
     '''handles conversion from flask requests
 
     Checks if the `raw_amount` can be converted to float, then sends the
-    parameters into CurrencyConverter's convert method. Returns jsonified
-    dictionary
+    parameters into the shared CurrencyConverter's convert_json method. The
+    compact JSON is returned as it is, without decoding it into a dictionary
 
     Args:
         raw_amount (str):
         raw_input_currency (str):
         raw_output_currency (str):
+        raw_date (str): day of the rates ('YYYY-MM-DD'), None for the actual
+            rates
+        raw_format (str): format of the output amounts ('float', 'decimal'
+            or 'minor'), None for floats
 
     Returns:
-        str: jsonified output from `CurrencyConverter.convert`
+        Response: JSON output from `CurrencyConverter.convert_json`
+
+    Raises:
+        ValueError: if the output format isn't known
 
     '''
 
-    try:
-        amount = float(raw_amount)
-    except ValueError:
-        amount = raw_amount
-    converter = CurrencyConverter(symbols_file=r'./txt/symbols.txt',
-                                  rates_file='./rates.pickle')
-    response = converter.convert(amount,
-                                 raw_input_currency,
-                                 raw_output_currency)
-    json_response = jsonify(response)
+    amount = batch_io.get_amount(raw_amount)
+    converter = get_converter()
+    response = converter.convert_json(amount,
+                                      raw_input_currency,
+                                      raw_output_currency,
+                                      on_date=raw_date,
+                                      output_format=raw_format)
+    return Response(response, mimetype=response_json.CONTENT_TYPE)
+
+
+def handle_batch_data(raw_items):
+    '''handles batch conversion from flask requests (JSON array)
+
+    Args:
+        raw_items (list): decoded JSON array of conversion items - objects with
+            `amount`, `input_currency` and optional `output_currency` keys
+
+    Returns:
+        str: jsonified list of outputs from `CurrencyConverter.convert`, in
+        the order of the items
+
+    Raises:
+        TypeError: if the items are not a list of conversion items
+    '''
+    if not isinstance(raw_items, list):
+        raise TypeError
+    conversions = [batch_io.get_conversion(raw_item)
+                   for raw_item in raw_items]
+    if None in conversions:
+        raise TypeError
+    converter = get_converter()
+    json_response = jsonify(converter.convert_batch(conversions))
     return json_response
+
+
+def handle_matrix_data(raw_format=None, raw_date=None):
+    '''handles the export of the cross-rate matrix from flask requests
+
+    Args:
+        raw_format (str): export format ('json', 'csv' or 'binary'), None
+            for JSON
+        raw_date (str): day of the rates ('YYYY-MM-DD'), None for the actual
+            rates
+
+    Returns:
+        Response: the exported matrix (see `matrix_export`), or a JSON error
+        with status 400, if the rates of the day can't be retrieved
+
+    Raises:
+        ValueError: if the export format isn't known
+    '''
+    export_format = matrix_export.check_export_format(
+        raw_format or matrix_export.JSON_EXPORT)
+    converter = get_converter()
+    try:
+        exported_matrix = converter.export_rates_matrix(export_format,
+                                                        on_date=raw_date)
+    except get_conversion_errors() as error:
+        error_output = jsonify({'error': get_error_message(error)})
+        return make_response(error_output, 400)
+    return Response(exported_matrix,
+                    mimetype=matrix_export.CONTENT_TYPES[export_format])
+
+
+def handle_portfolio_data(raw_request):
+    '''handles portfolio valuation from flask requests (JSON object)
+
+    Args:
+        raw_request (dict): decoded JSON object with `holdings` (object
+            mapping currencies to amounts), `target_currency` and optional
+            `format` and `rounding` ('lines' or 'total') keys
+
+    Returns:
+        Response: JSON output from `CurrencyConverter.value_portfolio`
+
+    Raises:
+        TypeError: if the request isn't a portfolio object
+        ValueError: if the output format or the rounding point isn't known
+    '''
+    if not isinstance(raw_request, dict) or \
+            not isinstance(raw_request.get('holdings'), dict) or \
+            not isinstance(raw_request.get('target_currency'), str):
+        raise TypeError
+    holdings = {currency: batch_io.get_amount(amount)
+                for currency, amount in raw_request['holdings'].items()}
+    converter = get_converter()
+    valuation = converter.value_portfolio(
+        holdings,
+        raw_request['target_currency'],
+        output_format=raw_request.get('format'),
+        rounding=raw_request.get('rounding',
+                                 currency_units.LINES_ROUNDING))
+    return Response(response_json.dumps(valuation),
+                    mimetype=response_json.CONTENT_TYPE)
+
+
+def handle_ndjson_data(lines):
+    '''handles batch conversion of a NDJSON stream
+
+    Every line holds one conversion item. The lines are read and the results
+    are produced one by one, so the whole stream is never held in memory.
+    Lines, which aren't valid conversion items, get an error result.
+
+    Args:
+        lines (iterable): lines (bytes or str) of the NDJSON stream
+
+    Returns:
+        generator: NDJSON lines with the outputs of `CurrencyConverter.convert`
+    '''
+    conversions = batch_io.read_ndjson(lines)
+    results = batch_io.convert_stream(get_converter(), conversions)
+    return batch_io.write_ndjson(results)
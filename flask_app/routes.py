@@ -5,32 +5,144 @@ Created on 04. 12. 2017
 
 Flask routes
 '''
+import http_caching
 from flask_app import app
+from flask_app.data_handling import handle_cache_validators
 from flask_app.data_handling import handle_raw_data
+from flask_app.data_handling import handle_batch_data
+from flask_app.data_handling import handle_matrix_data
+from flask_app.data_handling import handle_metrics
+from flask_app.data_handling import handle_ndjson_data
+from flask_app.data_handling import handle_portfolio_data
+from flask_app.data_handling import handle_status
 from flask import request
 from flask import abort
 from flask import make_response
 from flask import jsonify
+from flask import Response
+from flask import stream_with_context
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
 
 @app.route('/currency_converter', methods=['GET'])
 def get_conversion():
     '''handles the conversion requests
+
+    Responses at the actual rates can be cached (see `get_cached_response`).
     '''
     arguments = request.args
-    if len(arguments) not in (2, 3):
+    if len(arguments) not in (2, 3, 4, 5) or 'amount' not in arguments:
         abort(400)
 
     try:
         raw_amount = request.args.get('amount')
         raw_input_currency = request.args.get('input_currency')
         raw_output_currency = request.args.get('output_currency')
-        output = handle_raw_data(raw_amount,
-                                 raw_input_currency,
-                                 raw_output_currency)
-        return output
+        raw_date = request.args.get('date')
+        raw_format = request.args.get('format')
+        return get_cached_response(raw_date,
+                                   handle_raw_data,
+                                   raw_amount,
+                                   raw_input_currency,
+                                   raw_output_currency,
+                                   raw_date,
+                                   raw_format)
+    except (TypeError, ValueError):
+        abort(400)
+
+
+@app.route('/currency_converter/matrix', methods=['GET'])
+def get_matrix():
+    '''returns the whole cross-rate matrix
+
+    Optional `format` (json, csv or binary) and `date` arguments.
+    '''
+    raw_format = request.args.get('format')
+    raw_date = request.args.get('date')
+    try:
+        return get_cached_response(raw_date,
+                                   handle_matrix_data,
+                                   raw_format,
+                                   raw_date)
+    except ValueError:
+        abort(400)
+
+
+def get_cached_response(raw_date, handler, *arguments):
+    '''returns the response of a handler with the HTTP caching of the rates
+
+    Responses at the actual rates carry the caching headers of the rates
+    snapshot (see `http_caching`). A conditional request, whose cached
+    response is still valid, gets 304 without calling the handler.
+
+    Args:
+        raw_date (str): day of the rates, None for the actual rates
+        handler (callable): creates the response from the arguments
+
+    Returns:
+        Response: the response of the handler, or 304
+    '''
+    validators = handle_cache_validators(raw_date)
+    if validators is not None and http_caching.is_not_modified(
+            validators,
+            request.headers.get('If-None-Match'),
+            request.headers.get('If-Modified-Since')):
+        not_modified = make_response('', 304)
+        not_modified.headers.update(http_caching.get_headers(validators))
+        return not_modified
+    output = handler(*arguments)
+    if validators is not None and output.status_code == 200:
+        actual_validators = handle_cache_validators(raw_date)
+        if actual_validators is not None and \
+                actual_validators['etag'] == validators['etag']:
+            output.headers.update(http_caching.get_headers(actual_validators))
+    return output
+
+
+@app.route('/currency_converter/batch', methods=['POST'])
+def post_batch_conversion():
+    '''handles the batch conversion requests
+
+    The body is either a JSON array or a NDJSON stream (one conversion per
+    line) of {amount, input_currency, output_currency} objects. The results
+    are returned in the same format and order.
+    '''
+    if request.mimetype in NDJSON_MIMETYPES:
+        lines = handle_ndjson_data(request.stream)
+        return Response(stream_with_context(lines),
+                        mimetype=request.mimetype)
+    raw_items = request.get_json(force=True, silent=True)
+    try:
+        return handle_batch_data(raw_items)
     except TypeError:
         abort(400)
 
+@app.route('/currency_converter/portfolio', methods=['POST'])
+def post_portfolio_valuation():
+    '''handles the portfolio valuation requests
+
+    The body is a JSON object with `holdings` (currencies mapped to
+    amounts), `target_currency` and optional `format` and `rounding`.
+    '''
+    raw_request = request.get_json(force=True, silent=True)
+    try:
+        return handle_portfolio_data(raw_request)
+    except (TypeError, ValueError):
+        abort(400)
+
+@app.route('/currency_converter/status', methods=['GET'])
+def get_status():
+    '''returns the actuality of the rates and the state of their refreshing
+    '''
+    return handle_status()
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    '''returns the latencies and counters of the conversions (Prometheus
+    text format)
+    '''
+    return handle_metrics()
+
 @app.errorhandler(400)
 def not_found(error):
     '''error 400 handling
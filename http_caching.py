@@ -0,0 +1,121 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the HTTP caching of the conversion responses
+- A conversion at the actual rates depends only on the query and on the rates
+snapshot, so the responses are tagged with the version of the snapshot
+(ETag, see `CurrencyConverter.get_rates_version`) and with the time of the
+last update (Last-Modified)
+- The responses can be cached until the next scheduled update of the rates
+(Cache-Control max-age), browsers and CDNs revalidate them afterwards
+- Conditional requests (If-None-Match, If-Modified-Since) are answered with
+304 (not modified) without converting anything
+- Stale rates (newer ones should be available already) aren't cached at all,
+the conversion may refresh them
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import datetime as dt
+import email.utils
+
+
+def get_validators(converter, timestamp=None):
+    '''returns the cache validators of the actual rates
+
+    Args:
+        converter (:obj:`converter_class.CurrencyConverter`): the converter
+            (or an `async_converter.AsyncCurrencyConverter`)
+        timestamp (:obj:`datetime.datetime`, optional): the time of the
+            request. Defaults to now
+
+    Returns:
+        dict: `etag` (quoted version of the rates), `last_modified` (time of
+        the last update) and `max_age` (seconds until the next update). None
+        if no rates are available, or they are stale
+    '''
+    if timestamp is None:
+        timestamp = dt.datetime.now(tz=dt.timezone.utc)
+    rates_status = converter.get_rates_status(timestamp)
+    if rates_status['last_update'] is None or rates_status['stale']:
+        return None
+    version = converter.get_rates_version()
+    if version is None:
+        return None
+    max_age = (rates_status['next_update'] - timestamp).total_seconds()
+    return {'etag': '"{0}"'.format(version),
+            'last_modified': rates_status['last_update'],
+            'max_age': max(int(max_age), 0)}
+
+
+def get_headers(validators):
+    '''returns the caching headers of a response
+
+    Args:
+        validators (dict): output of `get_validators`
+
+    Returns:
+        (dict of str: str): ETag, Last-Modified and Cache-Control headers
+    '''
+    return {'ETag': validators['etag'],
+            'Last-Modified': format_http_date(validators['last_modified']),
+            'Cache-Control': 'public, max-age={0}'.format(
+                validators['max_age'])}
+
+
+def is_not_modified(validators, if_none_match=None, if_modified_since=None):
+    '''evaluates the conditional headers of a request
+
+    If-Modified-Since is ignored, if the request has If-None-Match (RFC 7232).
+
+    Args:
+        validators (dict): output of `get_validators`
+        if_none_match (str, optional): value of the If-None-Match header
+        if_modified_since (str, optional): value of the If-Modified-Since
+            header
+
+    Returns:
+        bool: True if the cached response of the client is still valid (304)
+    '''
+    if if_none_match is not None:
+        etag = _strip_weak(validators['etag'])
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or _strip_weak(tag) == etag:
+                return True
+        return False
+    if if_modified_since is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError, IndexError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    last_modified = validators['last_modified'].replace(microsecond=0)
+    return last_modified <= since
+
+
+def format_http_date(timestamp):
+    '''formats a datetime as an HTTP date
+
+    Args:
+        timestamp (:obj:`datetime.datetime`): timezone aware time
+
+    Returns:
+        str: e.g. 'Sun, 18 Oct 2026 14:10:00 GMT'
+    '''
+    utc_timestamp = timestamp.astimezone(dt.timezone.utc)
+    return email.utils.format_datetime(utc_timestamp, usegmt=True)
+
+
+def _strip_weak(tag):
+    '''
+    returns the entity tag without the weak prefix (weak comparison)
+    '''
+    if tag.startswith('W/'):
+        return tag[2:]
+    return tag
@@ -0,0 +1,179 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the export of the cross-rate matrix
+- The whole N x N table of the conversion rates (see
+`rates_matrix.CrossRateMatrix`) is exported at once as JSON, CSV or a compact
+binary array
+- JSON: `{"currencies": [...], "rates": [[...], ...], "version": "..."}`,
+row `i` holds the rates from `currencies[i]` to every currency
+- CSV: header with an empty first cell and the currencies, then one row per
+input currency (the currency and its rates)
+- Binary: the magic bytes `CCRM`, the format version (unsigned byte) and the
+number of currencies N (little-endian unsigned short), then N 3-letter ASCII
+codes and the N x N rates as little-endian doubles, row by row. The rates
+can be loaded without parsing, e.g.
+`numpy.frombuffer(data, '<f8', offset=7 + 3 * N).reshape(N, N)`
+- The rates are written with all their digits (repr), so every format holds
+exactly the rates used by the conversions
+- The encoders (csv, JSON) are imported only when they are needed, so the
+CLI can use the export formats without slowing down its start
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from array import array
+import struct
+import sys
+
+
+JSON_EXPORT = 'json'
+CSV_EXPORT = 'csv'
+BINARY_EXPORT = 'binary'
+EXPORT_FORMATS = (JSON_EXPORT, CSV_EXPORT, BINARY_EXPORT)
+
+CONTENT_TYPES = {
+    JSON_EXPORT: 'application/json',
+    CSV_EXPORT: 'text/csv',
+    BINARY_EXPORT: 'application/octet-stream',
+}
+
+BINARY_MAGIC = b'CCRM'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<4sBH')
+
+
+def check_export_format(export_format):
+    '''checks the name of an export format
+
+    Args:
+        export_format (str): one of `EXPORT_FORMATS`
+
+    Returns:
+        str: the export format
+
+    Raises:
+        ValueError: If the export format isn't known
+    '''
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError('Unknown export format: {0}'.format(export_format))
+    return export_format
+
+
+def export_matrix(rates_matrix, export_format):
+    '''exports the whole matrix
+
+    Args:
+        rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix
+        export_format (str): one of `EXPORT_FORMATS`
+
+    Returns:
+        bytes: the exported matrix
+
+    Raises:
+        ValueError: If the export format isn't known
+    '''
+    exporters = {JSON_EXPORT: to_json,
+                 CSV_EXPORT: to_csv,
+                 BINARY_EXPORT: to_binary}
+    return exporters[check_export_format(export_format)](rates_matrix)
+
+
+def to_json(rates_matrix):
+    '''exports the matrix as JSON
+
+    Args:
+        rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    '''
+    import response_json
+    return response_json.dumps({'currencies': list(rates_matrix.currencies),
+                                'rates': _get_rows(rates_matrix),
+                                'version': rates_matrix.version})
+
+
+def to_csv(rates_matrix):
+    '''exports the matrix as CSV
+
+    Args:
+        rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix
+
+    Returns:
+        bytes: UTF-8 encoded CSV
+    '''
+    import csv
+    import io
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow([''] + list(rates_matrix.currencies))
+    for currency, row in zip(rates_matrix.currencies,
+                             _get_rows(rates_matrix)):
+        writer.writerow([currency] + [repr(rate) for rate in row])
+    return output.getvalue().encode('utf-8')
+
+
+def to_binary(rates_matrix):
+    '''exports the matrix as a binary array (see the module documentation)
+
+    Args:
+        rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix
+
+    Returns:
+        bytes: the binary matrix
+
+    Raises:
+        ValueError: If a currency code doesn't have 3 ASCII letters
+    '''
+    codes = ''.join(rates_matrix.currencies).encode('ascii')
+    if len(codes) != 3 * len(rates_matrix):
+        raise ValueError('The currency codes must have 3 letters')
+    rates = rates_matrix.rates
+    if sys.byteorder != 'little':
+        rates = array('d', rates)
+        rates.byteswap()
+    header = _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION,
+                                 len(rates_matrix))
+    return header + codes + rates.tobytes()
+
+
+def read_binary(data):
+    '''reads a binary matrix (the output of `to_binary`)
+
+    Args:
+        data (bytes): the binary matrix
+
+    Returns:
+        tuple: the currencies (tuple of str) and the rates (flat
+        :obj:`array.array` of doubles, row by row)
+
+    Raises:
+        ValueError: If the data isn't a binary matrix
+    '''
+    if len(data) < _BINARY_HEADER.size:
+        raise ValueError('Not a binary rates matrix')
+    magic, version, size = _BINARY_HEADER.unpack_from(data)
+    rates_offset = _BINARY_HEADER.size + 3 * size
+    if magic != BINARY_MAGIC or version != BINARY_VERSION or \
+            len(data) != rates_offset + 8 * size * size:
+        raise ValueError('Not a binary rates matrix')
+    codes = data[_BINARY_HEADER.size:rates_offset].decode('ascii')
+    currencies = tuple(codes[position:position + 3]
+                       for position in range(0, len(codes), 3))
+    rates = array('d')
+    rates.frombytes(data[rates_offset:])
+    if sys.byteorder != 'little':
+        rates.byteswap()
+    return currencies, rates
+
+
+def _get_rows(rates_matrix):
+    '''
+    returns the rows of the matrix as lists of floats
+    '''
+    return [rates_matrix.row(currency).tolist()
+            for currency in rates_matrix.currencies]
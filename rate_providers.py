@@ -0,0 +1,314 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the providers of the conversion rates
+- RateProvider is the interface used by CurrencyConverter: latest rates,
+historical rates and the list of currencies
+- HttpJsonProvider downloads the rates from a fixer.io-like JSON API (pooled
+session, timeouts, retries, conditional requests)
+- StaticFileProvider reads the rates from JSON files of a directory (offline
+use, tests)
+- An in-process imitation of fixer.io is in `fake_rate_server`
+- requests is imported only when the first download starts
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import json
+import os
+import threading
+import currency_exceptions as exceptions
+
+
+class RateProvider(object):
+    '''Interface of the providers of the conversion rates
+
+    Rates are dictionaries mapping 3-letter currency codes to their rates
+    against the base currency.
+
+    Attributes:
+        validators (dict): maps base currencies to the validators of their
+            latest rates (e.g. HTTP ETag), stored together with the rates, so
+            an unchanged version doesn't have to be downloaded again
+    '''
+
+    def __init__(self):
+        '''RateProvider's __init__ method
+        '''
+        self.validators = {}
+
+    def fetch_latest(self, base_currency, current_rates=None):
+        '''returns the latest rates of the base currency
+
+        Args:
+            base_currency (str): 3-letter code of the base currency
+            current_rates (dict, optional): the rates retrieved last time. If
+                the provider knows they are still the latest ones, it returns
+                this very dictionary
+
+        Returns:
+            (dict of `str`: `float`): the rates
+
+        Raises:
+            exceptions.FixerError: If the provider refuses the request (e.g.
+            request limit exceeded)
+            ConnectionError: If the provider can't be reached
+        '''
+        raise NotImplementedError
+
+    def fetch_historical(self, base_currency, day):
+        '''returns the rates of the base currency on a past day
+
+        Args:
+            base_currency (str): 3-letter code of the base currency
+            day (:obj:`datetime.date`): the day
+
+        Returns:
+            (dict of `str`: `float`): the rates
+
+        Raises:
+            exceptions.FixerError: If the provider refuses the request
+            ConnectionError: If the provider can't be reached
+        '''
+        raise NotImplementedError
+
+    def list_currencies(self, base_currency='EUR'):
+        '''returns the currencies of the latest rates
+
+        Args:
+            base_currency (str): 3-letter code of the base currency
+
+        Returns:
+            (:obj:`list` of :obj:`str`): sorted 3-letter currency codes
+        '''
+        rates = self.fetch_latest(base_currency)
+        return sorted(set(rates) | set([base_currency]))
+
+    def close(self):
+        '''releases the resources of the provider (connections, files)
+        '''
+        pass
+
+
+class HttpJsonProvider(RateProvider):
+    '''Provider downloading the rates from a fixer.io-like JSON API
+
+    The rates are requested from `<base_url>/latest?base=<currency>` and
+    `<base_url>/<YYYY-MM-DD>?base=<currency>`, the response is a JSON object
+    with a `rates` node. An HTML response means, the request limit has been
+    exceeded.
+
+    Attributes:
+        base_url (str): URL of the API
+        connect_timeout (float): Seconds to wait for the connection
+        read_timeout (float): Seconds to wait for the response
+        retries (int): How many times a failed connection (or a server
+            error) is retried
+        backoff (float): Backoff factor of the retries, the n-th retry
+            waits `backoff * 2 ** (n - 1)` seconds
+        pool_size (int): Maximal number of kept-alive connections
+    '''
+
+    def __init__(self,
+                 base_url='https://api.fixer.io',
+                 connect_timeout=3.05,
+                 read_timeout=10.0,
+                 retries=2,
+                 backoff=0.5,
+                 pool_size=4):
+        '''HttpJsonProvider's __init__ method
+
+        Args:
+            base_url (str): URL of the API
+            connect_timeout (float): connection timeout in seconds
+            read_timeout (float): timeout of the response in seconds
+            retries (int): number of retries of failed connections
+            backoff (float): backoff factor of the retries
+            pool_size (int): number of kept-alive connections
+        '''
+        super(HttpJsonProvider, self).__init__()
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def fetch_latest(self, base_currency, current_rates=None):
+        '''Downloads the latest rates of the base currency
+
+        The request is conditional: if the current rates were downloaded with
+        an ETag or Last-Modified header, the server can answer with 304 (not
+        modified). `current_rates` is returned in that case, without parsing
+        anything.
+
+        See `RateProvider.fetch_latest`
+        '''
+        headers = {}
+        validators = self.validators.get(base_currency, {})
+        if current_rates is not None:
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+        response = self._get('latest', base_currency, headers)
+        if response.status_code == 304 and current_rates is not None:
+            return current_rates
+        rates = self._get_rates(response)
+        self.validators[base_currency] = {
+            header: response.headers[header]
+            for header in ('ETag', 'Last-Modified')
+            if header in response.headers}
+        return rates
+
+    def fetch_historical(self, base_currency, day):
+        '''Downloads the rates of the base currency on a past day
+
+        See `RateProvider.fetch_historical`
+        '''
+        response = self._get(day.isoformat(), base_currency, {})
+        return self._get_rates(response)
+
+    def close(self):
+        '''closes the connections of the session
+        '''
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+    def _get(self, endpoint, base_currency, headers):
+        '''sends a GET request to an endpoint of the API
+
+        Raises:
+            ConnectionError: If the server can't be reached or doesn't answer
+            in time
+        '''
+        from requests.exceptions import ConnectionError, Timeout
+        url = '{0}/{1}?base={2}'.format(self.base_url, endpoint, base_currency)
+        try:
+            return self._get_session().get(
+                url,
+                headers=headers,
+                timeout=(self.connect_timeout, self.read_timeout))
+        except Timeout as error:
+            raise ConnectionError(error)
+
+    def _get_rates(self, response):
+        '''returns the rates node of a response
+
+        Raises:
+            exceptions.FixerError: If the response isn't the rates JSON
+        '''
+        if response.headers['content-type'] == 'text/html':
+            raise exceptions.FixerError
+        return response.json()['rates']
+
+    def _get_session(self):
+        '''returns the HTTP session used for downloading the rates
+
+        The session keeps the connections alive (connection pool), failed
+        connections and server errors are retried with an exponential
+        backoff.
+
+        Returns:
+            :obj:`requests.Session`: the session (created on the first call)
+        '''
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from requests.packages.urllib3.util.retry import Retry
+                retries = Retry(total=self.retries,
+                                backoff_factor=self.backoff,
+                                status_forcelist=(500, 502, 503, 504),
+                                raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=max(self.pool_size, 1),
+                                      max_retries=retries)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+
+class StaticFileProvider(RateProvider):
+    '''Provider reading the rates from JSON files of a directory
+
+    The files have the same structure as the responses of fixer.io
+    (`{"base": ..., "rates": {...}}`). The latest rates are read from
+    `latest.json`, the rates of a day from `YYYY-MM-DD.json`. Rates of other
+    base currencies are read from `latest.<BASE>.json` and
+    `YYYY-MM-DD.<BASE>.json`.
+
+    Attributes:
+        directory (str): path of the directory
+    '''
+
+    def __init__(self, directory):
+        '''StaticFileProvider's __init__ method
+
+        Args:
+            directory (str): path of the directory with the rates files
+        '''
+        super(StaticFileProvider, self).__init__()
+        self.directory = directory
+
+    def fetch_latest(self, base_currency, current_rates=None):
+        '''Reads the latest rates of the base currency
+
+        If the file hasn't changed since the last reading (same modification
+        time and size), `current_rates` is returned.
+
+        See `RateProvider.fetch_latest`
+        '''
+        file_path = self._get_file_path('latest', base_currency)
+        stat = os.stat(file_path)
+        version = '{0}-{1}'.format(stat.st_mtime_ns, stat.st_size)
+        validators = self.validators.get(base_currency, {})
+        if current_rates is not None and validators.get('ETag') == version:
+            return current_rates
+        rates = self._read_rates(file_path, base_currency)
+        self.validators[base_currency] = {'ETag': version}
+        return rates
+
+    def fetch_historical(self, base_currency, day):
+        '''Reads the rates of the base currency on a past day
+
+        See `RateProvider.fetch_historical`
+        '''
+        file_path = self._get_file_path(day.isoformat(), base_currency)
+        return self._read_rates(file_path, base_currency)
+
+    def _get_file_path(self, name, base_currency):
+        '''returns the path of the rates file of the base currency
+
+        Raises:
+            ConnectionError: If there is no such file
+        '''
+        for file_name in ('{0}.{1}.json'.format(name, base_currency),
+                          '{0}.json'.format(name)):
+            file_path = os.path.join(self.directory, file_name)
+            if os.path.isfile(file_path):
+                return file_path
+        raise exceptions.get_connection_error()(
+            'No rates file for {0} ({1})'.format(name, base_currency))
+
+    def _read_rates(self, file_path, base_currency):
+        '''reads the rates node of a rates file
+
+        Raises:
+            ConnectionError: If the file has rates of another base currency
+        '''
+        with open(file_path, encoding='utf-8') as handle:
+            content = json.load(handle)
+        if content.get('base', base_currency) != base_currency:
+            raise exceptions.get_connection_error()(
+                'No rates file for {0}'.format(base_currency))
+        return content['rates']
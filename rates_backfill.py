@@ -0,0 +1,193 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the bulk download of historical rates
+- Every missing day of a date range is downloaded by
+`CurrencyConverter.fetch_historical_rates` (the same fetch path as the
+conversions use) in a bounded pool of worker threads
+- Days already in the history are skipped, every downloaded day is stored at
+once, so an interrupted backfill continues where it stopped
+- FixerError (fixer.io's request limit) is treated as backpressure: every
+worker pauses, the pause doubles with every further FixerError
+- Any other download error (see `rates_refresher.get_refresh_errors`) fails
+only its day, the backfill goes on
+- The progress (done / failed days, throughput) is reported after every day
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+import currency_exceptions as exceptions
+from rates_refresher import get_refresh_errors
+
+
+class BackfillReport(object):
+    '''Progress of a backfill
+
+    Attributes:
+        total (int): number of days to be downloaded (missing days)
+        done (int): number of days downloaded and stored
+        failed (:obj:`list` of :obj:`datetime.date`): days, which couldn't be
+            downloaded (they stay missing, the next backfill retries them)
+        throttled (int): number of FixerErrors (request limit reached)
+        started (float): time of the start (`time.time`)
+        finished (float): time of the end, None while running
+    '''
+
+    def __init__(self, total):
+        '''BackfillReport's __init__ method
+
+        Args:
+            total (int): number of days to be downloaded
+        '''
+        self.total = total
+        self.done = 0
+        self.failed = []
+        self.throttled = 0
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        '''float: seconds since the start (until the end, if finished)
+        '''
+        end = time.time() if self.finished is None else self.finished
+        return end - self.started
+
+    @property
+    def throughput(self):
+        '''float: downloaded days per second
+        '''
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return '{0}/{1} days, {2} failed, {3:.1f} days/s'.format(
+            self.done, self.total, len(self.failed), self.throughput)
+
+
+class Backpressure(object):
+    '''Pause shared by the workers, while the request limit is exceeded
+
+    Attributes:
+        min_delay (float): pause after the first FixerError in seconds
+        max_delay (float): the longest pause in seconds
+    '''
+
+    def __init__(self, min_delay=1.0, max_delay=60.0):
+        '''Backpressure's __init__ method
+
+        Args:
+            min_delay (float): pause after the first FixerError in seconds
+            max_delay (float): the longest pause in seconds
+        '''
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._delay = 0.0
+        self._paused_until = 0.0
+
+    def wait(self, stop_event):
+        '''waits until the pause is over (or until `stop_event` is set)
+
+        Args:
+            stop_event (:obj:`threading.Event`): interrupts the waiting
+        '''
+        while not stop_event.is_set():
+            with self._lock:
+                remaining = self._paused_until - time.time()
+            if remaining <= 0:
+                return
+            stop_event.wait(remaining)
+
+    def slow_down(self):
+        '''pauses every worker, the pause doubles with every call
+        '''
+        with self._lock:
+            self._delay = min(max(self._delay * 2, self.min_delay),
+                              self.max_delay)
+            self._paused_until = max(self._paused_until,
+                                     time.time() + self._delay)
+
+    def relax(self):
+        '''resets the pause after a successful download
+        '''
+        with self._lock:
+            self._delay = 0.0
+
+
+def backfill(converter,
+             first_day,
+             last_day,
+             workers=4,
+             max_attempts=5,
+             backpressure=None,
+             progress=None):
+    '''Downloads the historical rates of a date range into the history
+
+    Args:
+        converter (:obj:`converter_class.CurrencyConverter`): converter, whose
+            history is filled
+        first_day (:obj:`datetime.date`): first day of the range
+        last_day (:obj:`datetime.date`): last day of the range (included)
+        workers (int): maximal number of days downloaded at the same time
+        max_attempts (int): attempts per day, if the request limit is
+            exceeded
+        backpressure (:obj:`Backpressure`, optional): pause of the workers
+            after a FixerError, defaults to `Backpressure()`
+        progress (callable, optional): called with the `BackfillReport`
+            after every finished day
+
+    Returns:
+        :obj:`BackfillReport`: the final report
+    '''
+    days = converter.get_missing_days(first_day, last_day)
+    report = BackfillReport(len(days))
+    if backpressure is None:
+        backpressure = Backpressure()
+    stop_event = threading.Event()
+    report_lock = threading.Lock()
+
+    def fetch_day(day):
+        '''
+        downloads and stores one day, returns False if it failed
+        '''
+        for _ in range(max_attempts):
+            backpressure.wait(stop_event)
+            if stop_event.is_set():
+                return False
+            try:
+                converter.fetch_historical_rates(day)
+            except exceptions.FixerError:
+                with report_lock:
+                    report.throttled += 1
+                backpressure.slow_down()
+                continue
+            except get_refresh_errors():
+                return False
+            backpressure.relax()
+            return True
+        return False
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = {executor.submit(fetch_day, day): day for day in days}
+        for future in as_completed(futures):
+            with report_lock:
+                if future.result():
+                    report.done += 1
+                else:
+                    report.failed.append(futures[future])
+            if progress is not None:
+                progress(report)
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=True)
+        report.failed.sort()
+        report.finished = time.time()
+    return report
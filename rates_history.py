@@ -0,0 +1,279 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the RatesHistory class, the store of historical rates
+- Every stored day is one fixed-size record: the day (proleptic Gregorian
+ordinal, int64) followed by the rates of every currency against the base
+currency (float64, NaN for a missing rate)
+- Records are only appended, the file is never rewritten (except when a new
+currency appears and the columns are extended)
+- The file is read through mmap, only the day column is indexed (sorted
+list), so a day is found by bisection and only its record is unpacked
+- Appends are serialized between processes by a FileLock
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import bisect
+import datetime as dt
+import math
+import mmap
+import os
+import struct
+import threading
+from file_lock import FileLock, write_atomic
+
+
+MAGIC = b'CCRH'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+ORDINAL = struct.Struct('<q')
+
+
+class HistoryError(Exception):
+    '''
+    Exception thrown, if a file is not a valid rates history
+    '''
+    pass
+
+
+class RatesHistory(object):
+    '''Append-only, date-indexed store of the daily conversion rates
+
+    The rates of a day are stored against a single base currency, cross rates
+    are calculated from them (see `rates_matrix.calculate_cross_rate`).
+
+    Attributes:
+        path (str): path of the history file
+        currencies (:obj:`tuple` of :obj:`str`): 3-letter codes of the
+            currencies (columns of the records)
+    '''
+
+    def __init__(self, path):
+        '''RatesHistory's __init__ method
+
+        Args:
+            path (str): path of the history file (created with the first
+                stored day, if it doesn't exist)
+
+        Raises:
+            HistoryError: if the file is not a valid history file
+        '''
+        self.path = path
+        self.currencies = ()
+        self._record = None
+        self._data_start = 0
+        self._map = None
+        self._mapped_size = 0
+        self._file_size = 0
+        self._inode = None
+        self._ordinals = []
+        self._offsets = []
+        self._lock = threading.RLock()
+        self._sync()
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._ordinals)
+
+    def __contains__(self, day):
+        with self._lock:
+            self._sync()
+            return self._find(day.toordinal()) is not None
+
+    def days(self):
+        '''returns every stored day
+
+        Returns:
+            (:obj:`list` of :obj:`datetime.date`): the days in ascending order
+        '''
+        with self._lock:
+            self._sync()
+            return [dt.date.fromordinal(ordinal)
+                    for ordinal in self._ordinals]
+
+    def missing_days(self, first_day, last_day):
+        '''returns the days of a range, which are not stored yet
+
+        Args:
+            first_day (:obj:`datetime.date`): first day of the range
+            last_day (:obj:`datetime.date`): last day of the range (included)
+
+        Returns:
+            (:obj:`list` of :obj:`datetime.date`): the missing days in
+            ascending order
+        '''
+        first_ordinal = first_day.toordinal()
+        last_ordinal = last_day.toordinal()
+        with self._lock:
+            self._sync()
+            start = bisect.bisect_left(self._ordinals, first_ordinal)
+            end = bisect.bisect_right(self._ordinals, last_ordinal)
+            stored = set(self._ordinals[start:end])
+        return [dt.date.fromordinal(ordinal)
+                for ordinal in range(first_ordinal, last_ordinal + 1)
+                if ordinal not in stored]
+
+    def get_rates(self, day):
+        '''returns the rates of a day
+
+        Args:
+            day (:obj:`datetime.date`): the day
+
+        Returns:
+            (dict of `str`: `float`): rates of the currencies against the base
+            currency (missing rates are left out), None if the day isn't
+            stored
+        '''
+        with self._lock:
+            self._sync()
+            offset = self._find(day.toordinal())
+            if offset is None:
+                return None
+            record = self._record.unpack_from(self._map, offset)
+        return {currency: rate for currency, rate
+                in zip(self.currencies, record[1:]) if not math.isnan(rate)}
+
+    def add_rates(self, day, rates):
+        '''stores the rates of a day
+
+        Days already stored are left untouched (the first stored rates win).
+
+        Args:
+            day (:obj:`datetime.date`): the day
+            rates (dict of `str`: `float`): rates of the currencies against
+                the base currency
+
+        Returns:
+            bool: True if the day has been stored, False if it was stored
+            already
+        '''
+        with self._lock, FileLock(self.path + '.lock'):
+            self._sync()
+            if self._find(day.toordinal()) is not None:
+                return False
+            if self._record is None or \
+                    not set(rates).issubset(self.currencies):
+                self._extend_currencies(rates)
+            values = [float(rates.get(currency, math.nan))
+                      for currency in self.currencies]
+            with open(self.path, 'ab') as handle:
+                handle.write(self._record.pack(day.toordinal(), *values))
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._sync()
+        return True
+
+    def close(self):
+        '''unmaps the history file
+        '''
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            self._map = None
+            self._mapped_size = 0
+            self._ordinals = []
+            self._offsets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _find(self, ordinal):
+        '''returns the offset of the record of a day, None if it's missing
+        '''
+        position = bisect.bisect_left(self._ordinals, ordinal)
+        if position < len(self._ordinals) and \
+                self._ordinals[position] == ordinal:
+            return self._offsets[position]
+        return None
+
+    def _sync(self):
+        '''maps the records appended since the last call (by any process)
+
+        Only the new records are indexed. If the file has been rewritten
+        (e.g. new columns), the whole index is rebuilt.
+
+        Raises:
+            HistoryError: if the file is not a valid history file
+        '''
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if self._map is not None and stat.st_size == self._file_size and \
+                stat.st_ino == self._inode:
+            return
+        if self._map is not None and stat.st_ino != self._inode:
+            self.close()
+        with open(self.path, 'rb') as handle:
+            new_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map is None:
+            self._parse_header(new_map)
+            start = self._data_start
+        else:
+            self._map.close()
+            start = self._mapped_size
+        self._map = new_map
+        self._file_size = len(new_map)
+        self._inode = stat.st_ino
+        record_size = self._record.size
+        end = len(new_map) - (len(new_map) - self._data_start) % record_size
+        for offset in range(start, end, record_size):
+            ordinal = ORDINAL.unpack_from(new_map, offset)[0]
+            position = bisect.bisect_left(self._ordinals, ordinal)
+            self._ordinals.insert(position, ordinal)
+            self._offsets.insert(position, offset)
+        self._mapped_size = end
+
+    def _parse_header(self, history_map):
+        '''reads the currencies of the history file
+
+        Raises:
+            HistoryError: if the file is not a valid history file
+        '''
+        if len(history_map) < HEADER.size:
+            history_map.close()
+            raise HistoryError('The history file is truncated')
+        magic, version, _, currency_count = HEADER.unpack_from(history_map, 0)
+        if magic != MAGIC or version != VERSION:
+            history_map.close()
+            raise HistoryError('Unknown history format')
+        codes_end = HEADER.size + 3 * currency_count
+        codes = bytes(history_map[HEADER.size:codes_end]).decode('ascii')
+        self.currencies = tuple(codes[start:start + 3]
+                                for start in range(0, len(codes), 3))
+        self._record = struct.Struct('<q{0}d'.format(currency_count))
+        self._data_start = codes_end + (-codes_end % 8)
+
+    def _extend_currencies(self, rates):
+        '''rewrites the history file with the currencies of `rates` added
+
+        Every stored record gets NaN for the new currencies. The file is
+        replaced atomically.
+        '''
+        currencies = tuple(sorted(set(self.currencies).union(rates)))
+        old_records = []
+        if self._map is not None:
+            old_records = [self._record.unpack_from(self._map, offset)
+                           for offset in self._offsets]
+        header = HEADER.pack(MAGIC, VERSION, 0, len(currencies))
+        codes = ''.join(currencies).encode('ascii')
+        if len(codes) != 3 * len(currencies):
+            raise ValueError('Currency codes have to be 3 letters long')
+        parts = [header, codes, b'\0' * (-(len(header) + len(codes)) % 8)]
+        record = struct.Struct('<q{0}d'.format(len(currencies)))
+        for old_record in old_records:
+            old_rates = dict(zip(self.currencies, old_record[1:]))
+            parts.append(record.pack(old_record[0],
+                                     *[old_rates.get(currency, math.nan)
+                                       for currency in currencies]))
+        write_atomic(self.path, b''.join(parts))
+        self.close()
+        self._sync()
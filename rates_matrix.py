@@ -0,0 +1,194 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the CrossRateMatrix class
+- CrossRateMatrix holds the conversion rates between every pair of the
+available currencies
+- The rates are calculated only once per rates snapshot, a conversion rate is
+then a simple table lookup
+- The version of the matrix is a digest of its content, so every process
+with the same rates has the same version (e.g. the ETag of the HTTP
+responses, see `http_caching`)
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from array import array
+import decimal
+import hashlib
+from currency_units import get_exponent
+
+
+RATE_PRECISION = decimal.Decimal('.00001')
+
+
+def calculate_cross_rate(base_rates, base_currency, input_currency,
+                         output_currency):
+    '''calculates the conversion rate from `input_currency` to
+    `output_currency` using rates against the `base_currency`
+
+    The rate is rounded to 5 decimal places (ROUND_HALF_UP). Rates from the
+    base currency are returned unrounded, as they were retrieved.
+
+    Args:
+        base_rates (dict of str: float): rates against the `base_currency`
+        base_currency (str): 3-letter code of the base currency
+        input_currency (str): 3-letter input currency code
+        output_currency (str): 3-letter output currency code
+
+    Returns:
+        float: conversion rate
+    '''
+    if input_currency == output_currency:
+        return 1.0
+    if input_currency == base_currency:
+        return float(base_rates[output_currency])
+    input_val = decimal.Decimal(base_rates[input_currency])
+    output_val = decimal.Decimal(base_rates[output_currency])
+    return _divide_rates(output_val, input_val)
+
+
+def _divide_rates(output_val, input_val):
+    '''divides two decimal rates and rounds the result to 5 decimal places
+
+    Args:
+        output_val (:obj:`decimal.Decimal`): rate of the output currency
+        input_val (:obj:`decimal.Decimal`): rate of the input currency
+
+    Returns:
+        float: rounded conversion rate
+    '''
+    rate = output_val / input_val
+    rounded_rate = rate.quantize(RATE_PRECISION,
+                                 rounding=decimal.ROUND_HALF_UP)
+    return float(rounded_rate)
+
+
+class CrossRateMatrix(object):
+    '''Table of conversion rates between every pair of currencies
+
+    The N x N rates are stored row by row in a flat `array.array` of doubles.
+    Row `i` holds the rates for converting from `currencies[i]` to every
+    currency. The rates are exactly the same as the ones calculated by
+    `calculate_cross_rate`.
+
+    Attributes:
+        currencies (:obj:`tuple` of :obj:`str`): sorted 3-letter currency
+            codes, the order of the rows and columns
+        index (dict of str: int): maps currency codes to their row/column
+        rates (:obj:`array.array`): flat array of the N x N rates (doubles)
+        exponents (:obj:`tuple` of int): number of decimal places of every
+            currency (see `currency_units.get_exponent`)
+        source (dict): the base rates dictionary the matrix was built from
+        version (str): hexadecimal digest of the currencies and the rates
+    '''
+
+    def __init__(self, base_rates, base_currency):
+        '''CrossRateMatrix's __init__ method
+
+        Args:
+            base_rates (dict of str: float): rates against the
+                `base_currency`. The base currency is added with rate 1.0,
+                if it is missing
+            base_currency (str): 3-letter code of the base currency
+        '''
+        self.source = base_rates
+        self.currencies = tuple(sorted(set(base_rates) | {base_currency}))
+        self.index = {currency: position for position, currency
+                      in enumerate(self.currencies)}
+        self._size = len(self.currencies)
+        self.exponents = tuple(get_exponent(currency)
+                               for currency in self.currencies)
+        self.rates = self._build_rates(base_rates, base_currency)
+        self.version = self._get_version()
+
+    def __len__(self):
+        return self._size
+
+    def rate(self, input_currency, output_currency):
+        '''returns the conversion rate between two currencies
+
+        Args:
+            input_currency (str): 3-letter input currency code
+            output_currency (str): 3-letter output currency code
+
+        Returns:
+            float: conversion rate
+
+        Raises:
+            KeyError: if any of the currencies isn't in the matrix
+        '''
+        position = self.index[input_currency] * self._size
+        return self.rates[position + self.index[output_currency]]
+
+    def row(self, input_currency):
+        '''returns the conversion rates from `input_currency` to every currency
+
+        Args:
+            input_currency (str): 3-letter input currency code
+
+        Returns:
+            :obj:`array.array`: rates in the order of `currencies`
+
+        Raises:
+            KeyError: if the currency isn't in the matrix
+        '''
+        start = self.index[input_currency] * self._size
+        return self.rates[start:start + self._size]
+
+    def column(self, output_currency):
+        '''returns the conversion rates from every currency to
+        `output_currency`
+
+        Args:
+            output_currency (str): 3-letter output currency code
+
+        Returns:
+            :obj:`array.array`: rates in the order of `currencies`
+
+        Raises:
+            KeyError: if the currency isn't in the matrix
+        '''
+        return self.rates[self.index[output_currency]::self._size]
+
+    def _get_version(self):
+        '''returns the digest of the currencies and the rates of the matrix
+
+        Returns:
+            str: 16 hexadecimal digits
+        '''
+        digest = hashlib.sha1(','.join(self.currencies).encode('ascii'))
+        digest.update(self.rates.tobytes())
+        return digest.hexdigest()[:16]
+
+    def _build_rates(self, base_rates, base_currency):
+        '''calculates the rates for every pair of currencies
+
+        Every base rate is converted to Decimal only once, the rates are then
+        calculated the same way as in `calculate_cross_rate`.
+
+        Args:
+            base_rates (dict of str: float): rates against the base currency
+            base_currency (str): 3-letter code of the base currency
+
+        Returns:
+            :obj:`array.array`: flat array of N x N rates
+        '''
+        decimal_rates = [decimal.Decimal(base_rates.get(currency, 1.0))
+                         for currency in self.currencies]
+        rates = array('d', [1.0]) * (self._size * self._size)
+        for row, input_currency in enumerate(self.currencies):
+            offset = row * self._size
+            input_val = decimal_rates[row]
+            for column, output_currency in enumerate(self.currencies):
+                if column == row:
+                    continue
+                if input_currency == base_currency:
+                    rate = float(base_rates[output_currency])
+                else:
+                    rate = _divide_rates(decimal_rates[column], input_val)
+                rates[offset + column] = rate
+        return rates
@@ -0,0 +1,186 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the RatesRefresher class
+- RatesRefresher is a background thread, which downloads the new conversion
+rates as soon as they are published (every day after 4PM CET)
+- The new rates are swapped into the converter at once, so the conversions
+never wait for the download
+- Failed downloads are retried with an increasing delay
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import datetime as dt
+import sys
+import threading
+import currency_exceptions as exceptions
+import pytz
+
+REFRESH_ERRORS = (exceptions.FixerError, ValueError, KeyError)
+
+
+def get_refresh_errors():
+    '''returns the exceptions recorded as a failed refresh
+
+    These are the `REFRESH_ERRORS` and the RequestException of requests. The
+    latter can't be raised before requests is imported (by the download of the
+    rates), so requests isn't imported here. The function is called in the
+    except clause, i.e. only if an exception has been raised.
+
+    Returns:
+        tuple: the exception types
+    '''
+    requests_exceptions = sys.modules.get('requests.exceptions')
+    if requests_exceptions is None:
+        return REFRESH_ERRORS
+    return REFRESH_ERRORS + (requests_exceptions.RequestException,)
+
+
+class RatesRefresher(threading.Thread):
+    '''Background thread refreshing the rates of a CurrencyConverter
+
+    While the refresher runs, the converter doesn't download the rates during
+    the conversions (`auto_refresh` is switched off).
+
+    Attributes:
+        converter (:obj:`converter_class.CurrencyConverter`): the converter
+            whose rates are refreshed
+        retry_interval (float): delay (in seconds) before the first retry of
+            a failed refresh. The delay doubles after every failure
+        max_retry_interval (float): the longest delay between two retries
+    '''
+
+    def __init__(self,
+                 converter,
+                 retry_interval=60.0,
+                 max_retry_interval=3600.0):
+        '''RatesRefresher's __init__ method
+
+        Args:
+            converter (:obj:`converter_class.CurrencyConverter`): the
+                converter to be refreshed
+            retry_interval (float): delay before the first retry in seconds
+            max_retry_interval (float): maximal delay between retries in
+                seconds
+        '''
+        super(RatesRefresher, self).__init__(name='RatesRefresher')
+        self.daemon = True
+        self.converter = converter
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._stop_event = threading.Event()
+        self._status_lock = threading.Lock()
+        self._last_attempt = None
+        self._last_success = None
+        self._last_error = None
+        self._last_duration = None
+        self._refreshes = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+
+    def start(self):
+        '''Switches off the refreshing of the converter and starts the thread
+        '''
+        self.converter.auto_refresh = False
+        super(RatesRefresher, self).start()
+
+    def stop(self, timeout=None):
+        '''Stops the thread and switches the converter's refreshing back on
+
+        Args:
+            timeout (float, optional): how long to wait for the thread
+        '''
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.converter.auto_refresh = True
+
+    def run(self):
+        '''Waits for the next publication of the rates and refreshes them
+        '''
+        while not self._stop_event.wait(self.get_delay()):
+            self.refresh()
+
+    def get_delay(self, timestamp=None):
+        '''returns the number of seconds until the next refresh
+
+        Args:
+            timestamp (:obj:`datetime.datetime`, optional): current time,
+                defaults to now
+
+        Returns:
+            float: 0 if the rates are missing or outdated, the retry delay
+            after a failure, otherwise the time until the next publication
+        '''
+        if timestamp is None:
+            timestamp = dt.datetime.now(tz=pytz.timezone('CET'))
+        with self._status_lock:
+            failures = self._consecutive_failures
+        if failures:
+            delay = self.retry_interval * 2 ** (failures - 1)
+            return min(delay, self.max_retry_interval)
+        rates_status = self.converter.get_rates_status(timestamp)
+        next_update = rates_status['next_update']
+        if next_update is None:
+            return 0.0
+        return max((next_update - timestamp).total_seconds(), 0.0)
+
+    def refresh(self):
+        '''Refreshes the converter's rates once and records the outcome
+
+        If another process has refreshed the rates in the meantime, its rates
+        are used (see `CurrencyConverter.refresh_rates`).
+
+        Returns:
+            bool: True if newer rates have been retrieved
+        '''
+        started = dt.datetime.now(tz=pytz.timezone('CET'))
+        error = None
+        try:
+            refreshed = self.converter.refresh_rates(started)
+            if not refreshed:
+                error = 'The rates could not be retrieved'
+        except get_refresh_errors() as refresh_error:
+            refreshed = False
+            error = '{0}: {1}'.format(type(refresh_error).__name__,
+                                      refresh_error)
+        finished = dt.datetime.now(tz=pytz.timezone('CET'))
+        with self._status_lock:
+            self._last_attempt = finished
+            self._last_duration = (finished - started).total_seconds()
+            if refreshed:
+                self._last_success = finished
+                self._last_error = None
+                self._refreshes += 1
+                self._consecutive_failures = 0
+            else:
+                self._last_error = error
+                self._failures += 1
+                self._consecutive_failures += 1
+        return refreshed
+
+    def status(self):
+        '''returns the state of the refresher and the actuality of the rates
+
+        Returns:
+            dict: the rates status of the converter (see
+            `CurrencyConverter.get_rates_status`) extended with `running`,
+            `last_attempt`, `last_success`, `last_error`, `last_duration` (in
+            seconds), `refreshes`, `failures` and `consecutive_failures`
+        '''
+        rates_status = self.converter.get_rates_status()
+        with self._status_lock:
+            rates_status.update({
+                'running': self.is_alive(),
+                'last_attempt': self._last_attempt,
+                'last_success': self._last_success,
+                'last_error': self._last_error,
+                'last_duration': self._last_duration,
+                'refreshes': self._refreshes,
+                'failures': self._failures,
+                'consecutive_failures': self._consecutive_failures})
+        return rates_status
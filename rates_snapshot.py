@@ -0,0 +1,328 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the binary snapshot format of the conversion rates
+- The snapshot replaces the pickle of the rates dictionary
+- Layout (little-endian): header (magic, version, number of base currencies,
+number of currencies, length of the metadata, time of the last update),
+3-letter codes of the currencies and of the base currencies, JSON metadata
+(e.g. HTTP validators), padding to 8 bytes and a float64 array of the rates
+(one row per base currency, NaN for a missing rate)
+- Snapshots are written atomically (temporary file + rename)
+- RatesSnapshot reads the snapshot through mmap, the array of rates is not
+copied, so the processes reading the same snapshot share its pages
+- `load_rates` returns the rates of every base currency as a read-only
+mapping (BaseRates), which reads them in place from the mapped snapshot. On
+Windows the rates are copied into dictionaries and the snapshot is unmapped
+at once, because a mapped file can't be replaced by the next snapshot there
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from array import array
+from collections.abc import Mapping
+import datetime as dt
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from file_lock import write_atomic
+import pytz
+
+
+MAGIC = b'CCRS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIq')
+NO_UPDATE = -2 ** 63
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+# Snapshots stay mapped while their rates are used, except on Windows, where
+# a mapped file can't be replaced
+READ_IN_PLACE = os.name != 'nt'
+
+
+class SnapshotError(Exception):
+    '''
+    Exception thrown, if a file is not a valid rates snapshot
+    '''
+    pass
+
+
+def is_snapshot(file_path):
+    '''Checks whether the file is a rates snapshot (not a legacy pickle)
+
+    Args:
+        file_path (str): path of the rates file
+
+    Returns:
+        bool: True if the file starts with the snapshot magic bytes
+    '''
+    with open(file_path, 'rb') as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+def dumps(actual_rates):
+    '''Serializes the rates dictionary into the snapshot format
+
+    Args:
+        actual_rates (dict): dictionary of the conversion rates (see
+            `CurrencyConverter._get_actual_rates`)
+
+    Returns:
+        bytes: the snapshot
+    '''
+    all_rates = actual_rates['rates']
+    bases = sorted(all_rates)
+    currencies = sorted(set(currency for base in bases
+                            for currency in all_rates[base]))
+    metadata = json.dumps({'validators': actual_rates.get('validators', {})},
+                          sort_keys=True).encode('utf-8')
+    last_update = actual_rates['last_update']
+    if last_update is None:
+        update_micros = NO_UPDATE
+    else:
+        update_micros = (last_update - EPOCH) // dt.timedelta(microseconds=1)
+    parts = [HEADER.pack(MAGIC, VERSION, len(bases), len(currencies),
+                         len(metadata), update_micros),
+             _encode_codes(currencies),
+             _encode_codes(bases),
+             metadata]
+    size = sum(len(part) for part in parts)
+    parts.append(b'\0' * (-size % 8))
+    rates = array('d', [float(all_rates[base].get(currency, math.nan))
+                        for base in bases for currency in currencies])
+    if sys.byteorder != 'little':
+        rates.byteswap()
+    parts.append(rates.tobytes())
+    return b''.join(parts)
+
+
+def write_snapshot(file_path, actual_rates):
+    '''Writes the rates dictionary into a snapshot file (atomically)
+
+    Args:
+        file_path (str): path of the snapshot
+        actual_rates (dict): dictionary of the conversion rates
+    '''
+    write_atomic(file_path, dumps(actual_rates))
+
+
+def load_rates(file_path):
+    '''Reads the rates dictionary from a snapshot file
+
+    The rates are read in place from the mapped snapshot (see `BaseRates`),
+    the snapshot is unmapped, when none of them is used anymore. If
+    `READ_IN_PLACE` is False, the rates are copied into dictionaries.
+
+    Args:
+        file_path (str): path of the snapshot
+
+    Returns:
+        dict: dictionary of the conversion rates
+    '''
+    snapshot = RatesSnapshot(file_path)
+    if not READ_IN_PLACE:
+        with snapshot:
+            return snapshot.to_rates_dict()
+    return {'last_update': snapshot.last_update,
+            'rates': {base: BaseRates(snapshot, base)
+                      for base in snapshot.bases},
+            'validators': snapshot.metadata.get('validators', {})}
+
+
+class RatesSnapshot(object):
+    '''Rates snapshot mapped into memory
+
+    Attributes:
+        last_update (:obj:`datetime.datetime`): time of the last update (CET)
+            or None
+        currencies (:obj:`tuple` of :obj:`str`): sorted 3-letter codes of the
+            currencies (columns of the rates)
+        bases (:obj:`tuple` of :obj:`str`): sorted 3-letter codes of the base
+            currencies (rows of the rates)
+        index (dict of str: int): maps the currencies to their columns
+        metadata (dict): additional data stored with the rates
+        rates (:obj:`memoryview`): flat view of the float64 rates array
+            (len(bases) x len(currencies)), backed directly by the file
+    '''
+
+    def __init__(self, file_path):
+        '''RatesSnapshot's __init__ method, maps the snapshot into memory
+
+        Args:
+            file_path (str): path of the snapshot
+
+        Raises:
+            SnapshotError: if the file is not a valid snapshot
+        '''
+        with open(file_path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._view = memoryview(self._map)
+            self._parse()
+        except (SnapshotError, struct.error, ValueError):
+            self.close()
+            raise
+
+    def _parse(self):
+        '''parses the header and maps the array of rates
+
+        Raises:
+            SnapshotError: if the file is not a valid snapshot
+        '''
+        if len(self._map) < HEADER.size:
+            raise SnapshotError('The snapshot is truncated')
+        (magic, version, base_count, currency_count,
+         metadata_size, update_micros) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError('Unknown snapshot format')
+        position = HEADER.size
+        self.currencies, position = _decode_codes(self._map, position,
+                                                  currency_count)
+        self.bases, position = _decode_codes(self._map, position, base_count)
+        self.index = {currency: column for column, currency
+                      in enumerate(self.currencies)}
+        metadata = bytes(self._map[position:position + metadata_size])
+        self.metadata = json.loads(metadata.decode('utf-8'))
+        position += metadata_size
+        position += -position % 8
+        rates_size = 8 * base_count * currency_count
+        if len(self._map) != position + rates_size:
+            raise SnapshotError('The snapshot is truncated')
+        if update_micros == NO_UPDATE:
+            self.last_update = None
+        else:
+            timestamp = EPOCH + dt.timedelta(microseconds=update_micros)
+            self.last_update = timestamp.astimezone(pytz.timezone('CET'))
+        rates = self._view[position:position + rates_size]
+        if sys.byteorder == 'little':
+            self.rates = rates.cast('d')
+        else:
+            swapped = array('d', rates.tobytes())
+            swapped.byteswap()
+            self.rates = memoryview(swapped)
+
+    def base_rates(self, base_currency):
+        '''returns the rates of a base currency as dictionary
+
+        Args:
+            base_currency (str): 3-letter code of the base currency
+
+        Returns:
+            (dict of `str`: `float`): rates of the currencies against the
+            `base_currency` (missing rates are left out)
+        '''
+        row = self.bases.index(base_currency) * len(self.currencies)
+        row_rates = self.rates[row:row + len(self.currencies)]
+        return {currency: rate for currency, rate
+                in zip(self.currencies, row_rates) if not math.isnan(rate)}
+
+    def to_rates_dict(self):
+        '''returns the snapshot as rates dictionary
+
+        Returns:
+            dict: dictionary of the conversion rates, the same structure as
+            `CurrencyConverter.actual_rates`
+        '''
+        return {'last_update': self.last_update,
+                'rates': {base: self.base_rates(base) for base in self.bases},
+                'validators': self.metadata.get('validators', {})}
+
+    def close(self):
+        '''releases the views and unmaps the snapshot
+        '''
+        for view_name in ('rates', '_view'):
+            view = getattr(self, view_name, None)
+            if view is not None:
+                view.release()
+                setattr(self, view_name, None)
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BaseRates(Mapping):
+    '''Read-only rates of one base currency read in place from a snapshot
+
+    The mapping behaves like the rates dictionary of the base currency
+    (currencies without a rate are left out). It keeps the snapshot mapped.
+    Copies and pickles of the mapping are plain dictionaries.
+
+    Attributes:
+        snapshot (:obj:`RatesSnapshot`): the mapped snapshot
+        base_currency (str): 3-letter code of the base currency
+    '''
+
+    def __init__(self, snapshot, base_currency):
+        '''BaseRates's __init__ method
+
+        Args:
+            snapshot (:obj:`RatesSnapshot`): the mapped snapshot
+            base_currency (str): 3-letter code of the base currency
+        '''
+        self.snapshot = snapshot
+        self.base_currency = base_currency
+        self._row = snapshot.bases.index(base_currency) * \
+            len(snapshot.currencies)
+        self._size = None
+
+    def __getitem__(self, currency):
+        column = self.snapshot.index.get(currency)
+        if column is None:
+            raise KeyError(currency)
+        rate = self.snapshot.rates[self._row + column]
+        if math.isnan(rate):
+            raise KeyError(currency)
+        return rate
+
+    def __iter__(self):
+        rates = self.snapshot.rates
+        row = self._row
+        return (currency for column, currency
+                in enumerate(self.snapshot.currencies)
+                if not math.isnan(rates[row + column]))
+
+    def __len__(self):
+        if self._size is None:
+            self._size = sum(1 for _ in self)
+        return self._size
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _encode_codes(codes):
+    '''encodes 3-letter currency codes into bytes
+
+    Raises:
+        ValueError: if a code isn't a 3-letter ASCII code
+    '''
+    encoded = b''.join(code.encode('ascii') for code in codes)
+    if len(encoded) != 3 * len(codes):
+        raise ValueError('Currency codes have to be 3 letters long')
+    return encoded
+
+
+def _decode_codes(buffer, position, count):
+    '''decodes `count` 3-letter currency codes starting at `position`
+
+    Returns:
+        tuple: the codes and the position after them
+    '''
+    end = position + 3 * count
+    encoded = bytes(buffer[position:end]).decode('ascii')
+    codes = tuple(encoded[start:start + 3]
+                  for start in range(0, len(encoded), 3))
+    return codes, end
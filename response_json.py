@@ -0,0 +1,133 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the serialization of the conversion results
+- ResponseSerializer writes the compact JSON of a conversion straight from
+the row of the cross-rate matrix, without the nested dictionaries of
+`CurrencyConverter.convert` and without sorting any keys (the currencies of
+the matrix are sorted, the JSON keys are prepared once per rates snapshot)
+- `dumps` serializes any other result (errors, historical conversions,
+status) as compact JSON with sorted keys
+- orjson is used if it's installed (it's much faster at formatting floats),
+the standard json module otherwise. Integers out of the 64-bit range, which
+orjson refuses, are serialized by the json module
+- The output is the same as `json.dumps(result, sort_keys=True,
+separators=(',', ':'))`, except that orjson writes non-ASCII characters
+(e.g. currency symbols in error messages) as UTF-8 instead of escapes and
+NaN as null
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import json
+import currency_units
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+CONTENT_TYPE = 'application/json'
+
+_VALUE_ENCODERS = {
+    currency_units.FLOAT_FORMAT: repr,
+    currency_units.MINOR_UNITS_FORMAT: repr,
+    currency_units.DECIMAL_FORMAT: '"{0}"'.format,
+}
+
+
+def dumps(result, use_orjson=True):
+    '''serializes a result as compact JSON with sorted keys
+
+    Args:
+        result: JSON serializable object (e.g. the output of `convert`)
+        use_orjson (bool): If True (default), orjson is used, if it's
+            installed
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    '''
+    if use_orjson and orjson is not None:
+        try:
+            return orjson.dumps(result, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(result, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+class ResponseSerializer(object):
+    '''Compact JSON encoder of the conversions of one rates snapshot
+
+    Attributes:
+        rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix of
+            the snapshot
+        use_orjson (bool): If True, the JSON is encoded by orjson
+    '''
+
+    def __init__(self, rates_matrix, use_orjson=True):
+        '''ResponseSerializer's __init__ method
+
+        Args:
+            rates_matrix (:obj:`rates_matrix.CrossRateMatrix`): the matrix
+                of the rates snapshot
+            use_orjson (bool): If True (default), orjson is used, if it's
+                installed
+        '''
+        self.rates_matrix = rates_matrix
+        self.use_orjson = use_orjson and orjson is not None
+        self._keys = tuple('"{0}":'.format(currency)
+                           for currency in rates_matrix.currencies)
+
+    def serialize(self,
+                  input_amount,
+                  input_currency,
+                  output_currencies,
+                  output_format,
+                  calculate):
+        '''returns the JSON of a successful conversion
+
+        Args:
+            input_amount (float or int): the amount (finite)
+            input_currency (str): 3-letter input currency code
+            output_currencies (:obj:`tuple` of :obj:`str`): 3-letter output
+                currency codes (output of `_check_output_currency`)
+            output_format (str): format of the output amounts (see
+                `currency_units.OUTPUT_FORMATS`)
+            calculate (callable): calculates an output amount, called as
+                `calculate(amount, rate, exponent, output_format)` (see
+                `CurrencyConverter._calculate_formatted_amount`)
+
+        Returns:
+            bytes: the same JSON as `dumps(convert(...))` returns
+        '''
+        rates_matrix = self.rates_matrix
+        rates_row = rates_matrix.row(input_currency)
+        index = rates_matrix.index
+        exponents = rates_matrix.exponents
+        positions = sorted([index[currency] for currency in output_currencies])
+        amounts = [calculate(input_amount, rates_row[position],
+                             exponents[position], output_format)
+                   for position in positions]
+        if self.use_orjson:
+            currencies = rates_matrix.currencies
+            result = {
+                'input': {'amount': input_amount, 'currency': input_currency},
+                'output': dict(zip([currencies[position]
+                                    for position in positions], amounts))}
+            try:
+                return orjson.dumps(result)
+            except TypeError:
+                pass
+        keys = self._keys
+        encode_value = _VALUE_ENCODERS[output_format]
+        output = ','.join([keys[position] + encode_value(amount)
+                           for position, amount in zip(positions, amounts)])
+        response = '{{"input":{{"amount":{0},"currency":"{1}"}},' \
+            '"output":{{{2}}}}}'.format(repr(input_amount), input_currency,
+                                        output)
+        return response.encode('ascii')
@@ -0,0 +1,141 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the ResultCache class
+- ResultCache keeps the finished results of the most frequent conversions
+(dictionaries of `CurrencyConverter.convert` and JSON responses of
+`CurrencyConverter.convert_json`) in memory
+- The keys contain the version of the rates snapshot (see
+`CurrencyConverter.get_rates_version`), so the results of old rates are never
+returned. They aren't removed either, they are evicted like any other
+unused entry
+- The size of the cache is limited, the entries can expire after a while
+(TTL) and the eviction policy can be chosen: 'lru' evicts the least recently
+used entry, 'fifo' the oldest one (cheaper, hits don't reorder the entries)
+- Hits, misses, evictions and expirations are counted
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+from collections import OrderedDict
+import threading
+import time
+
+
+LRU_POLICY = 'lru'
+FIFO_POLICY = 'fifo'
+EVICTION_POLICIES = (LRU_POLICY, FIFO_POLICY)
+
+
+class ResultCache(object):
+    '''Bounded in-memory cache of conversion results
+
+    The cache is thread-safe. Values are stored as they are, callers must
+    not modify them (use immutable values or copies).
+
+    Attributes:
+        max_size (int): maximal number of entries
+        ttl (float): seconds, after which an entry expires. None means the
+            entries never expire (they are only evicted)
+        policy (str): eviction policy, 'lru' or 'fifo'
+        hits (int): number of found entries
+        misses (int): number of missing (or expired) entries
+        evictions (int): number of entries evicted because of the size limit
+        expirations (int): number of entries expired because of the TTL
+    '''
+
+    def __init__(self, max_size=1024, ttl=None, policy=LRU_POLICY):
+        '''ResultCache's __init__ method
+
+        Args:
+            max_size (int): maximal number of entries (at least 1)
+            ttl (float, optional): lifetime of the entries in seconds
+            policy (str): eviction policy, 'lru' (default) or 'fifo'
+
+        Raises:
+            ValueError: If the size or the policy isn't valid
+        '''
+        if max_size < 1:
+            raise ValueError('The size of the cache must be at least 1')
+        if policy not in EVICTION_POLICIES:
+            raise ValueError('Unknown eviction policy: {0}'.format(policy))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        '''returns the cached value of the key
+
+        Args:
+            key: hashable key
+
+        Returns:
+            the value, None if the key isn't cached (or it has expired)
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expiry = entry
+            if expiry is not None and time.monotonic() >= expiry:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if self.policy == LRU_POLICY:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        '''stores a value, evicts the entries over the size limit
+
+        Args:
+            key: hashable key
+            value: the value (not None)
+        '''
+        expiry = None
+        if self.ttl is not None:
+            expiry = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expiry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        '''removes every entry (the counters are kept)
+        '''
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        '''returns the counters of the cache
+
+        Returns:
+            dict: `size`, `max_size`, `hits`, `misses`, `hit_ratio` (None
+            before the first lookup), `evictions` and `expirations`
+        '''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else None,
+                    'evictions': self.evictions,
+                    'expirations': self.expirations}
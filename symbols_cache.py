@@ -0,0 +1,85 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the compiled cache of the symbols map
+- Parsing and validating the symbols file on every start of the converter is
+replaced by loading the compiled map (marshal format) from a cache file next
+to the symbols file (`.<symbols file name>.cache`)
+- The cache is valid only for the same symbols file (modification time and
+size), separator and set of available currencies, otherwise the map is
+parsed again and the cache is rewritten
+- A cache, which can't be read or written (e.g. read-only directory), is
+simply ignored
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import marshal
+import os
+from file_lock import write_atomic
+
+
+CACHE_VERSION = 1
+
+
+def get_cache_path(file_name):
+    '''returns the path of the cache of a symbols file
+
+    Args:
+        file_name (str): path of the symbols file
+
+    Returns:
+        str: path of the cache file
+    '''
+    directory, base_name = os.path.split(file_name)
+    return os.path.join(directory, '.{0}.cache'.format(base_name))
+
+
+def load_symbols_map(file_name, separator, available_currencies, parse):
+    '''returns the symbols map, from the cache if it is valid
+
+    Args:
+        file_name (str): path of the symbols file
+        separator (str): separator used in the symbols file
+        available_currencies (iterable): 3-letter codes of the available
+            currencies (the map is filtered against them)
+        parse (callable): parses the symbols file, called as
+            `parse(file_name, separator)` if the cache is not valid (see
+            `CurrencyConverter._get_symbols_map`)
+
+    Returns:
+        (dict of bytes: list): maps the utf-8 encoded symbols to their
+        3-letter currency codes
+    '''
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return {}
+    key = (CACHE_VERSION, marshal.version, stat.st_mtime_ns, stat.st_size,
+           separator, tuple(sorted(available_currencies)))
+    cache_path = get_cache_path(file_name)
+    symbols_map = _read_cache(cache_path, key)
+    if symbols_map is not None:
+        return symbols_map
+    symbols_map = dict(parse(file_name, separator))
+    try:
+        write_atomic(cache_path, marshal.dumps((key, symbols_map)))
+    except OSError:
+        pass
+    return symbols_map
+
+
+def _read_cache(cache_path, key):
+    '''returns the cached symbols map, None if the cache isn't valid
+    '''
+    try:
+        with open(cache_path, 'rb') as handle:
+            cached_key, symbols_map = marshal.loads(handle.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached_key != key:
+        return None
+    return symbols_map
@@ -0,0 +1,187 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import asyncio
+import copy
+import datetime as dt
+import json
+import threading
+import time
+import pytest
+import pytz
+from asgi_app import ConverterApp
+from async_converter import AsyncCurrencyConverter
+from converter_class import CurrencyConverter
+import requests
+from pytest_mock import mocker
+
+
+@pytest.fixture
+def loop():
+    '''
+    Returns a new event loop (closed after the test)
+    '''
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def stale_converter():
+    '''
+    Returns a CurrencyConverter, whose rates are one week old
+    '''
+    converter = CurrencyConverter()
+    actual_rates = copy.copy(converter.actual_rates)
+    actual_rates['last_update'] -= dt.timedelta(days=7)
+    converter.actual_rates = actual_rates
+    return converter
+
+
+def call_app(loop, app, path, query_string=b'', headers=()):
+    '''
+    Sends a GET request to the ASGI app, returns the status and JSON body
+    (None for an empty body)
+    '''
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path,
+             'query_string': query_string, 'headers': list(headers)}
+    loop.run_until_complete(app(scope, receive, send))
+    if not messages[1]['body']:
+        return messages[0]['status'], None
+    return messages[0]['status'], json.loads(messages[1]['body'].decode())
+
+
+def test_single_refresh(loop, stale_converter, mocker):
+    '''
+    Tests if concurrent conversions share one refresh of the rates
+    '''
+    refreshes = []
+
+    def slow_refresh(self, timestamp=None):
+        '''
+        Imitates a slow refresh
+        '''
+        refreshes.append(timestamp)
+        time.sleep(0.2)
+        return False
+
+    mocker.patch.object(CurrencyConverter, 'refresh_rates', autospec=True,
+                        side_effect=slow_refresh)
+    async_converter = AsyncCurrencyConverter(stale_converter)
+    expected = stale_converter.convert(100, 'EUR', 'CZK')
+
+    async def convert_all():
+        return await asyncio.gather(*[async_converter.convert(100, 'EUR',
+                                                              'CZK')
+                                      for _ in range(200)])
+
+    results = loop.run_until_complete(convert_all())
+    assert len(refreshes) == 1
+    assert all(result == expected for result in results)
+    async_converter.close()
+
+
+def test_refresh_timeout(loop, stale_converter, mocker):
+    '''
+    Tests if the conversions don't wait longer than refresh_wait and report
+    a failed refresh
+    '''
+    def failed_refresh(self, timestamp=None):
+        '''
+        Imitates a slow failing refresh
+        '''
+        time.sleep(0.2)
+        raise requests.exceptions.ConnectionError
+
+    mocker.patch.object(CurrencyConverter, 'refresh_rates', autospec=True,
+                        side_effect=failed_refresh)
+    async_converter = AsyncCurrencyConverter(stale_converter)
+    async_converter.refresh_wait = 0.01
+    result = loop.run_until_complete(
+        async_converter.convert(100, 'EUR', 'CZK'))
+    assert 'CZK' in result['output']
+    assert async_converter.get_rates_status()['refreshing']
+    async_converter.refresh_wait = None
+    result = loop.run_until_complete(
+        async_converter.convert(100, 'EUR', 'CZK'))
+    assert result['output'] == {'error': 'Connection error!'}
+    async_converter.close()
+
+
+def test_symbols_in_executor(loop, mocker):
+    '''
+    Tests, that the symbols map is loaded outside of the loop's thread
+    '''
+    converter = CurrencyConverter()
+    load_symbols = converter._load_symbols
+    loading_threads = []
+
+    def record_thread():
+        '''
+        Records the thread loading the symbols
+        '''
+        loading_threads.append(threading.current_thread())
+        return load_symbols()
+
+    mocker.patch.object(converter, '_load_symbols', side_effect=record_thread)
+    async_converter = AsyncCurrencyConverter(converter)
+    result = loop.run_until_complete(
+        async_converter.convert(100, '€', 'CZK'))
+    assert result == converter.convert(100, 'EUR', 'CZK')
+    assert loading_threads
+    assert threading.main_thread() not in loading_threads
+    async_converter.close()
+
+
+def test_asgi_app(loop):
+    '''
+    Tests the endpoints of the ASGI app
+    '''
+    app = ConverterApp()
+    status, body = call_app(loop, app, '/currency_converter',
+                            b'amount=10&input_currency=EUR&output_currency=CZK')
+    assert status == 200
+    assert body == CurrencyConverter().convert(10.0, 'EUR', 'CZK')
+    status, body = call_app(loop, app, '/currency_converter',
+                            b'amount=10')
+    assert (status, body) == (400, {'error': 'Wrong parameters'})
+    status, body = call_app(loop, app, '/currency_converter',
+                            b'input_currency=EUR&output_currency=CZK')
+    assert (status, body) == (400, {'error': 'Wrong parameters'})
+    status, body = call_app(loop, app, '/currency_converter/status')
+    assert status == 200
+    assert body['refreshing'] is False
+    status, _ = call_app(loop, app, '/unknown')
+    assert status == 404
+
+
+def test_asgi_http_caching(loop):
+    '''
+    Tests the conditional requests of the ASGI app
+    '''
+    converter = CurrencyConverter()
+    converter.auto_refresh = False
+    actual_rates = copy.copy(converter.actual_rates)
+    actual_rates['last_update'] = dt.datetime.now(tz=pytz.timezone('CET'))
+    converter.actual_rates = actual_rates
+    app = ConverterApp(lambda: converter)
+    etag = '"{0}"'.format(converter.get_rates_version()).encode('ascii')
+    status, body = call_app(loop, app, '/currency_converter',
+                            b'amount=10&input_currency=EUR',
+                            [(b'if-none-match', etag)])
+    assert (status, body) == (304, None)
+    status, body = call_app(loop, app, '/currency_converter',
+                            b'amount=10&input_currency=EUR',
+                            [(b'if-none-match', b'"other"')])
+    assert status == 200
+    assert body == converter.convert(10.0, 'EUR')
@@ -0,0 +1,77 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import json
+import pytest
+import batch_io
+from converter_class import CurrencyConverter
+
+
+@pytest.fixture
+def converter():
+    '''
+    Returns a CurrencyConverter object
+    '''
+    return CurrencyConverter()
+
+
+def test_read_csv():
+    '''
+    Tests reading conversions from CSV lines
+    '''
+    lines = ['amount,input_currency,output_currency',
+             '100,EUR,USD',
+             'text,€,',
+             ',EUR,USD']
+    conversions = list(batch_io.read_csv(lines))
+    assert conversions == [(100.0, 'EUR', 'USD'),
+                           ('text', '€', None),
+                           {'amount': '', 'input_currency': 'EUR',
+                            'output_currency': 'USD'}]
+
+
+def test_read_ndjson():
+    '''
+    Tests reading conversions from NDJSON lines
+    '''
+    lines = [b'{"amount": 100, "input_currency": "EUR"}\n',
+             b'\n',
+             b'blahblah\n',
+             b'{"amount": 1, "input_currency": 5}\n']
+    conversions = list(batch_io.read_ndjson(lines))
+    assert conversions == [(100.0, 'EUR', None), None,
+                           {'amount': 1, 'input_currency': 5}]
+
+
+def test_convert_stream(converter):
+    '''
+    Tests if the stream keeps the order and reports unreadable items
+    '''
+    conversions = [(100.0, 'EUR', 'USD'), None, (5.0, '€', 'GBP'),
+                   {'amount': 1, 'input_currency': 5}]
+    results = list(batch_io.convert_stream(converter, iter(conversions)))
+    assert results[0] == converter.convert(100.0, 'EUR', 'USD')
+    assert results[1]['input'] == {'amount': None, 'currency': None}
+    assert results[1]['output']['error'] == \
+        'Conversion error, check the input parameters'
+    assert results[2] == converter.convert(5.0, '€', 'GBP')
+    assert results[3] == {'input': {'amount': 1, 'currency': 5},
+                          'output': results[1]['output']}
+
+
+def test_write_results(converter):
+    '''
+    Tests the NDJSON and CSV output of the results
+    '''
+    results = [converter.convert(100.0, 'EUR', 'USD'),
+               converter.convert('text', 'EUR', 'USD')]
+    ndjson_lines = list(batch_io.write_ndjson(results))
+    assert [json.loads(line) for line in ndjson_lines] == results
+    csv_lines = list(batch_io.write_csv(results))
+    assert csv_lines[0] == \
+        'amount,input_currency,output_currency,output_amount,error\n'
+    assert csv_lines[1].startswith('100.0,EUR,USD,')
+    assert csv_lines[2].startswith('text,EUR,,,')
+    assert len(csv_lines) == 3
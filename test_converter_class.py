@@ -3,8 +3,16 @@ Created on 28. 11. 2017
 
 @author: patex1987
 '''
+import copy
 import datetime as dt
+import json
+import os
+import pickle
 import random
+import shutil
+import threading
+import time
+import numpy as np
 import pytest
 from converter_class import CurrencyConverter
 import currency_exceptions
@@ -98,6 +106,8 @@ def test_input_currency_wrong_inputs(converter):
         assert converter._check_input_currency(raw_input_currency='blahblah')
     with pytest.raises(currency_exceptions.CurrencyError):
         assert converter._check_input_currency(raw_input_currency='££')
+    with pytest.raises(TypeError):
+        converter._check_input_currency(raw_input_currency=None)
 
 
 def test_input_currency_right_outputs(converter):
@@ -117,7 +127,7 @@ def test_output_currencies_with_none(converter):
     tests if _check_output_currency returns the right list if None is provided
     as output currency
     '''
-    output_currencies = [currency for currency in converter.available_currencies if currency != 'EUR']
+    output_currencies = tuple(currency for currency in converter.available_currencies if currency != 'EUR')
     assert converter._check_output_currency('EUR', raw_output_currency=None) == output_currencies
 
 
@@ -137,8 +147,8 @@ def test_output_currency_right_outputs(converter):
     '''
     dollar_currencies = converter._check_output_currency('EUR', raw_output_currency='$')
     assert 'USD' in dollar_currencies
-    assert converter._check_output_currency('EUR', raw_output_currency='CZK') == ['CZK']
-    assert converter._check_output_currency('CZK', raw_output_currency='EUR') == ['EUR']
+    assert converter._check_output_currency('EUR', raw_output_currency='CZK') == ('CZK',)
+    assert converter._check_output_currency('CZK', raw_output_currency='EUR') == ('EUR',)
 
 
 def test_input_amount_number(converter):
@@ -493,3 +503,464 @@ def test_conversion_on_na_symbols(converter_with_na_symbols):
     test_str = 'Conversion error, the currency can\'t be' + \
                ' recognized'
     assert err_str == test_str
+
+
+def test_reload_if_changed(converter, tmpdir):
+    '''
+    Tests if the rates are reloaded only after the rates file changes
+    '''
+    rates_file = str(tmpdir.join('rates.snapshot'))
+    shutil.copy(converter._rates_file, rates_file)
+    file_converter = CurrencyConverter(rates_file=rates_file)
+    assert not file_converter.reload_if_changed()
+
+    changed_rates = copy.deepcopy(file_converter.actual_rates)
+    changed_rates['rates']['EUR']['XYZ'] = 2.0
+    with open(rates_file, 'wb') as handle:
+        pickle.dump(changed_rates, handle)
+    os.utime(rates_file, ns=(0, 0))
+    assert file_converter.reload_if_changed()
+    assert 'XYZ' in file_converter.available_currencies
+    assert not file_converter.reload_if_changed()
+
+
+def test_rates_matrix_reuse(converter):
+    '''
+    Tests if the cross-rate matrix is built only once per rates dictionary
+    '''
+    rates_matrix = converter._get_rates_matrix()
+    assert converter._get_rates_matrix() is rates_matrix
+    converter.actual_rates['rates']['EUR'] = {'USD': 1.1885, 'EUR': 1.0}
+    assert converter._get_rates_matrix() is not rates_matrix
+    assert converter._calculate_current_rate('USD', 'EUR') == 0.8414
+
+
+def test_convert_many_matches_convert(converter):
+    '''
+    Tests if the bulk conversion returns the same amounts as convert
+    '''
+    input_amounts = [155.5, 14.85, 0.125, 2.675, -10.0, 1e6]
+    input_currencies = ['EUR', 'GBP', 'CZK', '€', 'USD', 'JPY']
+    conversion_result = converter.convert_many(input_amounts,
+                                               input_currencies,
+                                               '$')
+    assert not conversion_result['errors']
+    for row, input_amount in enumerate(input_amounts):
+        single_result = converter.convert(input_amount,
+                                          input_currencies[row],
+                                          '$')
+        for currency, output_amounts in conversion_result['output'].items():
+            if currency in single_result['output']:
+                assert output_amounts[row] == single_result['output'][currency]
+            else:
+                assert np.isnan(output_amounts[row])
+
+
+def test_convert_many_row_errors(converter):
+    '''
+    Tests if wrong input currencies are reported per row
+    '''
+    conversion_result = converter.convert_many(np.array([1.0, 2.0, 3.0]),
+                                               ['EUR', '££', '$'],
+                                               'CZK')
+    errors = conversion_result['errors']
+    assert sorted(errors.keys()) == [1, 2]
+    assert errors[1] == 'Conversion error, the currency can\'t be recognized'
+    assert errors[2].startswith('Conversion error, the input symbol')
+    assert list(conversion_result['input']['currency']) == ['EUR', None, None]
+    output_amounts = conversion_result['output']['CZK']
+    assert not np.isnan(output_amounts[0])
+    assert np.isnan(output_amounts[1:]).all()
+
+
+def test_convert_many_wrong_amounts(converter):
+    '''
+    Tests the bulk conversion if a wrong amount is provided
+    '''
+    conversion_result = converter.convert_many([1.0, 'text'], 'EUR', 'USD')
+    err_str = conversion_result['output']['error']
+    assert err_str == 'Conversion error, check the input parameters'
+    conversion_result = converter.convert_many([1.0, 2.0], ['EUR'], 'USD')
+    err_str = conversion_result['output']['error']
+    assert err_str == 'Conversion error, check the input parameters'
+
+
+def test_convert_batch(converter):
+    '''
+    Tests if the batch conversion returns the results of convert
+    '''
+    conversions = [(155.5, 'EUR', 'GBP'),
+                   ('text', 'EUR', 'GBP'),
+                   (155.5, '££', 'GBP'),
+                   (10, '€', '$'),
+                   (155.5, 'EUR', 'GBP')]
+    batch_results = converter.convert_batch(conversions)
+    expected_results = [converter.convert(*conversion)
+                        for conversion in conversions]
+    assert batch_results == expected_results
+
+
+def test_single_flight_refresh(tmpdir, mocker):
+    '''
+    Tests if only one of many threads and converters (processes) sharing the
+    rates file downloads the new rates
+    '''
+    rates_file = str(tmpdir.join('rates.snapshot'))
+    shutil.copy('rates.snapshot', rates_file)
+    converters = [CurrencyConverter(rates_file=rates_file) for _ in range(2)]
+    timestamp = converters[0]._get_next_update() + dt.timedelta(minutes=1)
+    new_rates = copy.deepcopy(converters[0].actual_rates)
+    new_rates['last_update'] = timestamp
+    downloads = []
+
+    def slow_download(self):
+        '''
+        Imitates a slow download of the rates
+        '''
+        downloads.append(self)
+        time.sleep(0.2)
+        return copy.deepcopy(new_rates)
+
+    mocked_converter = mocker.patch.object(CurrencyConverter,
+                                           '_get_actual_rates',
+                                           autospec=True)
+    mocked_converter.side_effect = slow_download
+    for file_converter in converters:
+        file_converter.refresh_wait = None
+    threads = [threading.Thread(target=converters[number % 2]
+                                ._check_rates_actuality,
+                                args=(timestamp,))
+               for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(downloads) == 1
+    for file_converter in converters:
+        assert file_converter.actual_rates['last_update'] == timestamp
+
+
+def test_failed_refresh_lease(tmpdir, mocker):
+    '''
+    Tests if a failed refresh isn't repeated by other converters (processes)
+    during the retry interval
+    '''
+    rates_file = str(tmpdir.join('rates.snapshot'))
+    shutil.copy('rates.snapshot', rates_file)
+    converters = [CurrencyConverter(rates_file=rates_file) for _ in range(2)]
+    timestamp = converters[0]._get_next_update() + dt.timedelta(minutes=1)
+    mocked_converter = mocker.patch.object(CurrencyConverter,
+                                           '_get_actual_rates',
+                                           autospec=True)
+    mocked_converter.side_effect = lambda self: self.actual_rates
+    assert not converters[0].refresh_rates(timestamp)
+    assert not converters[1].refresh_rates(timestamp)
+    assert mocked_converter.call_count == 1
+    converters[1].refresh_retry_interval = 0
+    assert not converters[1].refresh_rates(timestamp)
+    assert mocked_converter.call_count == 2
+
+
+def test_conditional_download(converter, mocker):
+    '''
+    Tests if unmodified rates (HTTP 304) reuse the current rates
+    '''
+    modified_response = mocker.Mock(status_code=200,
+                                    headers={'content-type': 'application/json',
+                                             'ETag': '"v1"'})
+    modified_response.json.return_value = {'rates': {'USD': 1.2}}
+    unmodified_response = mocker.Mock(status_code=304, headers={})
+    session = mocker.Mock()
+    session.get.side_effect = [modified_response, unmodified_response]
+    converter.provider._session = session
+
+    downloaded_rates = converter._get_actual_rates()
+    assert downloaded_rates['rates']['EUR'] == {'USD': 1.2, 'EUR': 1.0}
+    assert downloaded_rates['validators'] == {'EUR': {'ETag': '"v1"'}}
+    converter._set_actual_rates(downloaded_rates)
+
+    unmodified_rates = converter._get_actual_rates()
+    request_headers = session.get.call_args[1]['headers']
+    assert request_headers == {'If-None-Match': '"v1"'}
+    assert unmodified_rates['rates']['EUR'] is downloaded_rates['rates']['EUR']
+    assert converter._is_unmodified(unmodified_rates, downloaded_rates)
+    provider = converter.provider
+    assert session.get.call_args[1]['timeout'] == (provider.connect_timeout,
+                                                   provider.read_timeout)
+
+
+def test_concurrent_bases(mocker):
+    '''
+    Tests if the rates of more base currencies are downloaded concurrently
+    '''
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def slow_rates(self, base_currency):
+        '''
+        Imitates a slow download, records the number of parallel downloads
+        '''
+        with lock:
+            in_flight.append(base_currency)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.1)
+        with lock:
+            in_flight.remove(base_currency)
+        if base_currency == 'CHF':
+            raise currency_exceptions.FixerError
+        return {'CZK': 25.0}
+
+    mocked_converter = mocker.patch.object(CurrencyConverter,
+                                           '_get_rates_for_base',
+                                           autospec=True)
+    mocked_converter.side_effect = slow_rates
+    multi_converter = CurrencyConverter(
+        extra_bases=('USD', 'GBP', 'CHF', 'JPY'))
+    multi_converter.max_parallel_fetches = 3
+    actual_rates = multi_converter._get_actual_rates()
+    assert sorted(actual_rates['rates']) == ['EUR', 'GBP', 'JPY', 'USD']
+    assert actual_rates['rates']['USD'] == {'CZK': 25.0, 'USD': 1.0}
+    assert max(max_in_flight) == 3
+
+
+def test_historical_conversion(mocker, tmpdir):
+    '''
+    Tests converting at the rates of a past day (downloaded only once)
+    '''
+    historical_rates = {'CZK': 25.5, 'USD': 1.2}
+    mocked_fetch = mocker.patch.object(CurrencyConverter,
+                                       '_get_rates_for_base',
+                                       return_value=historical_rates)
+    history_converter = CurrencyConverter(
+        history_file=str(tmpdir.join('rates.history')))
+    conversion = history_converter.convert(10, 'USD', 'CZK',
+                                           on_date='2017-11-28')
+    assert conversion['output'] == {'CZK': 212.5}
+    conversion = history_converter.convert(10, 'EUR', None,
+                                           on_date=dt.date(2017, 11, 28))
+    assert conversion['output'] == {'CZK': 255.0, 'USD': 12.0}
+    mocked_fetch.assert_called_once_with('EUR', dt.date(2017, 11, 28))
+    conversion = history_converter.convert(10, 'EUR', 'GBP',
+                                           on_date='2017-11-28')
+    assert conversion['output']['error'] == \
+        'Conversion error, the currency can\'t be recognized'
+    for wrong_date in ('2017-13-01', '1998-12-31', '2999-01-01'):
+        conversion = history_converter.convert(10, 'EUR', 'CZK',
+                                               on_date=wrong_date)
+        assert conversion['output']['error'] == \
+            'Conversion error, the date is not valid or out of range'
+
+
+def test_historical_conversion_stages(mocker, tmpdir):
+    '''
+    Tests, that the calculation of a historical conversion is timed
+    '''
+    mocker.patch.object(CurrencyConverter, '_get_rates_for_base',
+                        return_value={'CZK': 25.5, 'USD': 1.2})
+    history_converter = CurrencyConverter(
+        history_file=str(tmpdir.join('rates.history')))
+    history_converter.convert(10, 'USD', 'CZK', on_date='2017-11-28')
+    stages = history_converter.metrics.stats()['stages']
+    assert stages['resolution']['count'] == 1
+    assert stages['actuality']['count'] == 0
+    assert stages['calculation']['count'] == 1
+
+
+def test_currency_index(converter):
+    '''
+    Tests the case variants and the precomputed output currencies of the
+    currency resolution index
+    '''
+    assert converter._check_input_currency('eur') == 'EUR'
+    assert converter._check_input_currency('Czk') == 'CZK'
+    assert converter._check_output_currency('EUR', 'usd') == ('USD',)
+    dollar_currencies = converter._check_output_currency(None, '$')
+    aud_dollar_currencies = converter._check_output_currency('AUD', '$')
+    assert 'AUD' in dollar_currencies
+    assert aud_dollar_currencies == tuple(currency for currency
+                                          in dollar_currencies
+                                          if currency != 'AUD')
+    assert converter._check_output_currency('AUD', '$') is \
+        aud_dollar_currencies
+    with pytest.raises(currency_exceptions.CurrencyError):
+        converter._check_input_currency('eUR')
+
+
+def test_output_formats(converter):
+    '''
+    Tests the decimal string and minor units output formats, rounded to the
+    decimal places of the output currency
+    '''
+    float_result = converter.convert(1234.567, 'EUR')
+    decimal_result = converter.convert(1234.567, 'EUR',
+                                       output_format='decimal')
+    minor_result = converter.convert(1234.567, 'EUR', output_format='minor')
+    for currency, amount in float_result['output'].items():
+        decimal_amount = decimal_result['output'][currency]
+        minor_units = minor_result['output'][currency]
+        assert isinstance(decimal_amount, str)
+        assert isinstance(minor_units, int)
+        if currency in ('JPY', 'KRW'):
+            assert '.' not in decimal_amount
+            assert minor_units == int(decimal_amount)
+            assert abs(minor_units - amount) <= 0.5
+        else:
+            assert float(decimal_amount) == amount
+            assert minor_units == int(decimal_amount.replace('.', ''))
+    converter.output_format = 'minor'
+    batch_result = converter.convert_batch([(1234.567, 'EUR', 'CZK')])
+    assert batch_result[0]['output'] == \
+        {'CZK': minor_result['output']['CZK']}
+    with pytest.raises(ValueError):
+        converter.convert(1, 'EUR', 'CZK', output_format='binary')
+
+
+def test_huge_amount_formats(converter):
+    '''
+    Tests, that an amount out of the range of the decimal context is a
+    conversion error in every output format
+    '''
+    expected_output = {'error': 'Conversion error, check the input parameters'}
+    for output_format in ('float', 'decimal', 'minor'):
+        result = converter.convert(1e30, 'EUR', 'USD',
+                                   output_format=output_format)
+        assert result['output'] == expected_output
+        response = converter.convert_json(1e30, 'EUR', 'USD',
+                                          output_format=output_format)
+        assert json.loads(response.decode('utf-8')) == result
+
+
+def test_nan_amount_formats(converter):
+    '''
+    Tests, that a NaN amount is a conversion error in every output format
+    '''
+    expected_output = {'error': 'Conversion error, check the input parameters'}
+    for output_format in ('float', 'decimal', 'minor'):
+        for output_currency in ('USD', None):
+            result = converter.convert(float('nan'), 'EUR', output_currency,
+                                       output_format=output_format)
+            assert result['output'] == expected_output
+        response = converter.convert_json(float('nan'), 'EUR', 'USD',
+                                          output_format=output_format)
+        assert json.loads(response.decode('utf-8'))['output'] == \
+            expected_output
+
+
+def test_huge_integer_json(converter):
+    '''
+    Tests, that an integer too large for a float is a conversion error in the
+    JSON output
+    '''
+    response = converter.convert_json(10 ** 400, 'EUR', 'USD')
+    result = json.loads(response.decode('utf-8'))
+    assert result['input'] == {'amount': 10 ** 400, 'currency': 'EUR'}
+    assert result['output'] == {
+        'error': 'Conversion error, check the input parameters'}
+
+
+def test_value_portfolio(converter):
+    '''
+    Tests the valuation of a portfolio with both rounding points
+    '''
+    holdings = {'USD': 100.005, '€': 20, 'Kč': 1000, 'JPY': 12345}
+    valuation = converter.value_portfolio(holdings, 'CZK',
+                                          output_format='minor')
+    lines = valuation['output']['lines']
+    assert valuation['input'] == {'holdings': holdings, 'currency': 'CZK'}
+    for raw_currency, amount in holdings.items():
+        result = converter.convert(amount, raw_currency, 'CZK',
+                                   output_format='minor')
+        currency = converter._check_input_currency(raw_currency)
+        assert lines[currency] == result['output']['CZK']
+    assert valuation['output']['total'] == sum(lines.values())
+    valuation = converter.value_portfolio(holdings, 'CZK',
+                                          output_format='minor',
+                                          rounding='total')
+    assert valuation['output']['lines'] == lines
+    assert abs(valuation['output']['total'] - sum(lines.values())) <= 2
+    duplicates = converter.value_portfolio({'EUR': 1, '€': 2}, 'USD')
+    assert 'error' in duplicates['output']
+    with pytest.raises(ValueError):
+        converter.value_portfolio(holdings, 'CZK', rounding='none')
+
+
+def test_value_huge_portfolio(converter):
+    '''
+    Tests, that a holding out of the range of the decimal context is a
+    conversion error
+    '''
+    expected_output = {'error': 'Conversion error, check the input parameters'}
+    for rounding in ('lines', 'total'):
+        valuation = converter.value_portfolio({'USD': 1e308, 'CZK': 1}, 'EUR',
+                                              rounding=rounding)
+        assert valuation['output'] == expected_output
+
+
+def test_export_rates_matrix(mocker, tmpdir):
+    '''
+    Tests the export of the actual and of a historical matrix (made only
+    once)
+    '''
+    mocked_fetch = mocker.patch.object(CurrencyConverter,
+                                       '_get_rates_for_base',
+                                       return_value={'CZK': 25.5,
+                                                     'USD': 1.2})
+    history_converter = CurrencyConverter(
+        history_file=str(tmpdir.join('rates.history')))
+    history_converter.auto_refresh = False
+    exported = history_converter.export_rates_matrix('json')
+    assert history_converter.export_rates_matrix('json') is exported
+    actual_matrix = json.loads(exported.decode('utf-8'))
+    assert actual_matrix['currencies'] == \
+        sorted(history_converter.available_currencies)
+    historical = history_converter.export_rates_matrix(
+        'json', on_date='2017-11-28')
+    assert history_converter.export_rates_matrix(
+        'json', on_date=dt.date(2017, 11, 28)) is historical
+    historical_matrix = json.loads(historical.decode('utf-8'))
+    assert historical_matrix['currencies'] == ['CZK', 'EUR', 'USD']
+    assert historical_matrix['rates'][2] == [21.25, 0.83333, 1.0]
+    mocked_fetch.assert_called_once_with('EUR', dt.date(2017, 11, 28))
+    with pytest.raises(currency_exceptions.DateError):
+        history_converter.export_rates_matrix('csv', on_date='2999-01-01')
+    with pytest.raises(ValueError):
+        history_converter.export_rates_matrix('xml')
+
+
+def test_stats(tmpdir, mocker):
+    '''
+    Tests the statistics of the conversions and of the refreshes
+    '''
+    rates_file = str(tmpdir.join('rates.snapshot'))
+    shutil.copy('rates.snapshot', rates_file)
+    stats_converter = CurrencyConverter(rates_file=rates_file)
+    stats_converter.auto_refresh = False
+    stats_converter.convert(10, 'EUR', 'USD')
+    stats_converter.convert_json(10, 'EUR', 'USD')
+    stats_converter.convert(10, 'XYZ')
+    stats_converter.convert('ten', 'EUR')
+    stats = stats_converter.stats()
+    assert stats['stages']['resolution']['count'] == 2
+    assert stats['stages']['actuality']['count'] == 2
+    assert stats['stages']['calculation']['count'] == 1
+    assert stats['stages']['serialization']['count'] == 1
+    assert stats['errors']['CurrencyError'] == 1
+    assert stats['errors']['ConversionError'] == 1
+    assert stats['snapshot_age'] > 0
+    assert stats['result_cache'] is None
+    timestamp = stats_converter._get_next_update() + dt.timedelta(minutes=1)
+    new_rates = copy.deepcopy(stats_converter.actual_rates)
+    new_rates['last_update'] = timestamp
+    mocked_converter = mocker.patch.object(CurrencyConverter,
+                                           '_get_actual_rates',
+                                           autospec=True)
+    mocked_converter.side_effect = lambda self: self.actual_rates
+    assert not stats_converter.refresh_rates()
+    mocked_converter.side_effect = lambda self: new_rates
+    assert stats_converter.refresh_rates()
+    refresh = stats_converter.stats()['refresh']
+    assert refresh['failures'] == 1
+    assert refresh['refreshes'] == 1
+    assert refresh['latency']['count'] == 2
+    assert refresh['last_refresh'] is not None
@@ -0,0 +1,171 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import pytest
+from converter_class import CurrencyConverter
+import converter_daemon
+import currency_converter
+
+
+@pytest.fixture
+def daemon(tmpdir):
+    '''
+    Returns a running converter daemon (without the background refresh)
+    '''
+    converter = CurrencyConverter()
+    converter.auto_refresh = False
+    with converter_daemon.ConverterDaemon(
+            converter,
+            str(tmpdir.join('cc.sock')),
+            background_refresh=False) as running_daemon:
+        yield running_daemon
+
+
+def test_daemon_conversion(daemon):
+    '''
+    Tests, that the daemon returns the same result as the converter
+    '''
+    for conversion in ({'amount': 10, 'input_currency': 'EUR',
+                        'output_currency': 'CZK'},
+                       {'amount': 2.5, 'input_currency': '$'},
+                       {'amount': 1, 'input_currency': 'XXX'}):
+        expected = daemon.converter.convert(
+            conversion['amount'],
+            conversion['input_currency'],
+            conversion.get('output_currency'))
+        result = converter_daemon.request_conversion(conversion,
+                                                     daemon.socket_path)
+        assert result == expected
+
+
+def test_daemon_wrong_request(daemon):
+    '''
+    Tests the answers of invalid requests and of more requests sent over one
+    connection
+    '''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(daemon.socket_path)
+    client.sendall(b'not json\n{"amount": 1, "input_currency": "EUR", ' +
+                   b'"output_currency": "EUR"}\n{"amount": 2}\n')
+    client.shutdown(socket.SHUT_WR)
+    response = b''
+    while True:
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+    client.close()
+    lines = response.splitlines()
+    assert len(lines) == 3
+    assert b'error' in lines[0]
+    assert b'"EUR":1.0' in lines[1]
+    assert json.loads(lines[2].decode('utf-8'))['input'] == \
+        {'amount': 2, 'currency': None}
+
+
+def test_concurrent_clients(daemon):
+    '''
+    Tests the daemon with more clients at the same time
+    '''
+    results = []
+
+    def convert():
+        results.append(converter_daemon.request_conversion(
+            {'amount': 100, 'input_currency': 'EUR',
+             'output_currency': 'USD'},
+            daemon.socket_path))
+
+    threads = [threading.Thread(target=convert) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8
+    assert all(result == results[0] for result in results)
+
+
+def test_socket_ownership(daemon, tmpdir):
+    '''
+    Tests, that a running daemon isn't replaced, but a stale socket is
+    '''
+    with pytest.raises(converter_daemon.DaemonError):
+        converter_daemon.ConverterDaemon(daemon.converter,
+                                         daemon.socket_path,
+                                         background_refresh=False)
+    stale_path = str(tmpdir.join('stale.sock'))
+    stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale_socket.bind(stale_path)
+    stale_socket.close()
+    new_daemon = converter_daemon.ConverterDaemon(daemon.converter,
+                                                  stale_path,
+                                                  background_refresh=False)
+    with new_daemon:
+        result = converter_daemon.request_conversion(
+            {'amount': 1, 'input_currency': 'EUR'}, stale_path)
+    assert result['input'] == {'amount': 1, 'currency': 'EUR'}
+
+
+def test_foreign_socket(daemon, mocker):
+    '''
+    Tests, that the client refuses a socket owned by another user
+    '''
+    mocker.patch('converter_daemon.os.getuid',
+                 return_value=os.getuid() + 1)
+    with pytest.raises(converter_daemon.DaemonError):
+        converter_daemon.request_conversion(
+            {'amount': 1, 'input_currency': 'EUR'}, daemon.socket_path)
+
+
+def test_client_imports():
+    '''
+    Tests, that the client side doesn't import the daemon's modules
+    '''
+    script = 'import sys; loaded = set(sys.modules); ' + \
+        'import converter_daemon; ' + \
+        'print(sorted({"socketserver", "threading"} & ' + \
+        '(set(sys.modules) - loaded)))'
+    output = subprocess.check_output([sys.executable, '-c', script])
+    assert output.strip() == b'[]'
+
+
+def test_cli_fallback(tmpdir, capsys):
+    '''
+    Tests, that the CLI converts in-process if no daemon is running
+    '''
+    with pytest.raises(converter_daemon.DaemonError):
+        converter_daemon.request_conversion(
+            {'amount': 1, 'input_currency': 'EUR'},
+            str(tmpdir.join('none.sock')))
+    parser = currency_converter.get_parser()
+    arguments = currency_converter.parse_arguments(
+        parser, ['--amount', '10', '--input_currency', 'EUR',
+                 '--output_currency', 'EUR',
+                 '--socket', str(tmpdir.join('none.sock'))])
+    currency_converter.main(arguments)
+    assert '"EUR": 10.0' in capsys.readouterr()[0]
+
+
+def test_cli_client(daemon, capsys):
+    '''
+    Tests, that the CLI prints the daemon's result
+    '''
+    parser = currency_converter.get_parser()
+    arguments = currency_converter.parse_arguments(
+        parser, ['--amount', '10', '--input_currency', 'EUR',
+                 '--output_currency', 'CZK', '--socket', daemon.socket_path])
+    currency_converter.main(arguments)
+    expected = daemon.converter.stringify_output(
+        daemon.converter.convert(10.0, 'EUR', 'CZK'))
+    assert capsys.readouterr()[0] == expected + '\n'
+    arguments.compact = True
+    currency_converter.main(arguments)
+    expected = daemon.converter.convert_json(10.0, 'EUR', 'CZK')
+    assert capsys.readouterr()[0] == expected.decode('utf-8') + '\n'
@@ -0,0 +1,86 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import math
+import threading
+import converter_metrics
+from converter_metrics import ConverterMetrics, LatencyHistogram
+
+
+def test_histogram_buckets():
+    '''
+    Tests, that the durations are counted into cumulative buckets
+    '''
+    histogram = LatencyHistogram(buckets=(0.001, 0.01))
+    for seconds in (0.0005, 0.001, 0.005, 0.5):
+        histogram.observe(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 4
+    assert math.isclose(snapshot['sum'], 0.5065)
+    assert snapshot['buckets'] == [(0.001, 2), (0.01, 3), (math.inf, 4)]
+
+
+def test_observe_since(mocker):
+    '''
+    Tests, that the end of a stage starts the next one
+    '''
+    mocker.patch('converter_metrics.perf_counter', return_value=2.5)
+    metrics = ConverterMetrics()
+    assert metrics.observe_since(converter_metrics.RESOLUTION_STAGE,
+                                 2.4995) == 2.5
+    resolution = metrics.stats()['stages']['resolution']
+    assert resolution['count'] == 1
+    assert resolution['buckets'][0] == (0.000005, 0)
+    assert resolution['buckets'][7] == (0.001, 1)
+
+
+def test_thread_buckets():
+    '''
+    Tests, that the stages of finished threads are kept
+    '''
+    metrics = ConverterMetrics()
+
+    def observe():
+        '''
+        Observes one stage in a new thread
+        '''
+        metrics.observe_since(converter_metrics.CALCULATION_STAGE,
+                              converter_metrics.perf_counter())
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    observe()
+    calculation = metrics.stats()['stages']['calculation']
+    assert calculation['count'] == 5
+    assert calculation['buckets'][-1] == (math.inf, 5)
+    assert len(metrics._shards) == 1
+
+
+def test_format_prometheus():
+    '''
+    Tests the Prometheus text format of the statistics
+    '''
+    metrics = ConverterMetrics(stage_buckets=(0.001,),
+                               refresh_buckets=(1.0,))
+    metrics.count_error('CurrencyError')
+    metrics.observe_refresh(0.5, False)
+    stats = metrics.stats()
+    stats['snapshot_age'] = None
+    stats['result_cache'] = {'size': 3, 'hits': 5, 'misses': 2}
+    lines = converter_metrics.format_prometheus(stats).splitlines()
+    assert '# TYPE currency_converter_stage_seconds histogram' in lines
+    assert 'currency_converter_stage_seconds_bucket' \
+        '{stage="actuality",le="0.001"} 0' in lines
+    assert 'currency_converter_stage_seconds_bucket' \
+        '{stage="actuality",le="+Inf"} 0' in lines
+    assert 'currency_converter_errors_total{error="CurrencyError"} 1' in lines
+    assert 'currency_converter_refresh_seconds_bucket{le="1.0"} 1' in lines
+    assert 'currency_converter_refresh_seconds_sum 0.5' in lines
+    assert 'currency_converter_refresh_failures_total 1' in lines
+    assert 'currency_converter_snapshot_age_seconds NaN' in lines
+    assert 'currency_converter_result_cache_hits_total 5' in lines
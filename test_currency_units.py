@@ -0,0 +1,40 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import pytest
+import currency_units
+
+
+def test_exponents():
+    '''
+    Tests the decimal places of the currencies
+    '''
+    assert currency_units.get_exponent('EUR') == 2
+    assert currency_units.get_exponent('JPY') == 0
+    assert currency_units.get_exponent('BHD') == 3
+    assert currency_units.get_exponent('XYZ') == 2
+
+
+def test_format_minor_units():
+    '''
+    Tests the formatting of minor units as decimal strings
+    '''
+    assert currency_units.format_minor_units(123456, 2) == '1234.56'
+    assert currency_units.format_minor_units(-1230, 2) == '-12.30'
+    assert currency_units.format_minor_units(5, 3) == '0.005'
+    assert currency_units.format_minor_units(-5, 2) == '-0.05'
+    assert currency_units.format_minor_units(0, 2) == '0.00'
+    assert currency_units.format_minor_units(-1500, 0) == '-1500'
+
+
+def test_check_output_format():
+    '''
+    Tests the check of the output formats
+    '''
+    for output_format in currency_units.OUTPUT_FORMATS:
+        assert currency_units.check_output_format(output_format) == \
+            output_format
+    with pytest.raises(ValueError):
+        currency_units.check_output_format('binary')
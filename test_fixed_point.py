@@ -0,0 +1,175 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import decimal
+import math
+import random
+import struct
+import numpy as np
+import pytest
+import fixed_point
+import vector_conversion
+
+
+def _get_float(generator):
+    '''
+    Returns a random amount: rounded and unrounded amounts, integers,
+    half-cents, any bit pattern and special values
+    '''
+    choice = generator.random()
+    if choice < 0.3:
+        return round(generator.uniform(-1e6, 1e6), generator.randint(0, 4))
+    if choice < 0.5:
+        return generator.uniform(-1e3, 1e3)
+    if choice < 0.6:
+        return struct.unpack('d', struct.pack(
+            'Q', generator.getrandbits(64)))[0]
+    if choice < 0.7:
+        return generator.randint(-10 ** 6, 10 ** 6) / 200.0
+    if choice < 0.8:
+        return generator.randint(-10 ** 7, 10 ** 7)
+    return generator.choice([0.0, -0.0, 0.005, 1.005, 2.675, 0.125, 0.5,
+                             1e-300, 5e-324, 1e25, 1e27, 1e30,
+                             float('inf'), float('nan')])
+
+
+def _get_rate(generator):
+    '''
+    Returns a random rate: 5 decimal places (cross rates), unrounded or any
+    float
+    '''
+    choice = generator.random()
+    if choice < 0.5:
+        return generator.randint(1, 10 ** 9) / 100000.0
+    if choice < 0.8:
+        return generator.uniform(0, 200000)
+    return _get_float(generator)
+
+
+def _get_near_ties(generator, count):
+    '''
+    Yields amounts and rates, whose products are the closest floats to a
+    half-cent (the hardest cases of the rounding)
+    '''
+    for _ in range(count):
+        rate = generator.uniform(0.5, 2.0)
+        amount = (generator.randint(1, 10 ** 6) + 0.5) / 100.0 / rate
+        for near_amount in (amount, math.nextafter(amount, 0.0),
+                            math.nextafter(amount, 10.0 ** 7)):
+            yield near_amount, rate
+
+
+def _calculate(function, *args):
+    '''
+    Returns the result of the calculation, or the name of its exception
+    '''
+    try:
+        return function(*args)
+    except decimal.InvalidOperation as error:
+        return type(error).__name__
+
+
+def _are_same(first, second):
+    '''
+    Compares the results bit for bit (NaNs are the same, 0.0 and -0.0 aren't)
+    '''
+    if isinstance(first, str) or isinstance(second, str):
+        return first == second
+    if math.isnan(first) and math.isnan(second):
+        return True
+    return struct.pack('d', first) == struct.pack('d', second)
+
+
+def test_decimal_equivalence():
+    '''
+    Tests, that the fixed-point results are bit for bit the same as the
+    decimal ones on a random corpus
+    '''
+    generator = random.Random(20261018)
+    corpus = [(_get_float(generator), _get_rate(generator))
+              for _ in range(50000)]
+    corpus.extend(_get_near_ties(generator, 5000))
+    for amount, rate in corpus:
+        for exponent in (0, 2, 3):
+            expected = _calculate(fixed_point.calculate_decimal_amount,
+                                  amount, rate, exponent)
+            for function in (fixed_point.calculate_output_amount,
+                             fixed_point.calculate_exact_amount):
+                result = _calculate(function, amount, rate, exponent)
+                assert _are_same(result, expected), (amount, rate, exponent)
+
+
+def test_context_rounding():
+    '''
+    Tests a product just below a half-cent, which is rounded onto the
+    half-cent by the precision of the decimal context (and then up)
+    '''
+    amount = 22517998136852
+    rate = 1 + 2.0 ** -52
+    product = decimal.Decimal(amount) * decimal.Decimal(rate)
+    assert product == decimal.Decimal('22517998136852.005')
+    assert fixed_point.get_minor_units(amount, rate) == 2251799813685201
+    assert fixed_point.calculate_output_amount(amount, rate) == \
+        fixed_point.calculate_decimal_amount(amount, rate)
+
+
+def test_minor_units():
+    '''
+    Tests the amounts in minor units
+    '''
+    assert fixed_point.get_minor_units(10, 25.636) == 25636
+    assert fixed_point.get_minor_units(-1.005, 1.0) == -100
+    assert fixed_point.get_minor_units(0.5, 1.0, 0) == 1
+    assert fixed_point.get_minor_units(1.0, 0.0005, 3) == 1
+    with pytest.raises(ValueError):
+        fixed_point.get_minor_units(float('inf'), 1.0)
+    with pytest.raises(ValueError):
+        fixed_point.get_minor_units(float('nan'), 1.0)
+
+
+def test_other_number_types():
+    '''
+    Tests, that other number types are calculated with decimals
+    '''
+    assert fixed_point.calculate_output_amount(
+        decimal.Decimal('1.005'), 1.0) == 1.01
+    assert fixed_point.calculate_output_amount(True, 2.675) == 2.67
+
+
+def test_vector_equivalence():
+    '''
+    Tests, that the vectorized results are the same as the decimal ones
+    '''
+    generator = random.Random(18102026)
+    pairs = [(generator.uniform(-1e6, 1e6),
+              generator.randint(1, 10 ** 9) / 100000.0)
+             for _ in range(20000)]
+    pairs.extend(_get_near_ties(generator, 2000))
+    amounts = np.array([amount for amount, _ in pairs])
+    rates = np.array([rate for _, rate in pairs])
+    for exponent in (0, 2):
+        results = vector_conversion.round_amounts(amounts, rates, exponent)
+        for amount, rate, result in zip(amounts, rates, results):
+            expected = fixed_point.calculate_decimal_amount(
+                float(amount), float(rate), exponent)
+            assert _are_same(float(result), expected), (amount, rate)
+
+
+def test_sum_rounding():
+    '''
+    Tests, that only the exact sum of the products is rounded
+    '''
+    amounts = [0.1, 0.2, -0.005, decimal.Decimal('0.0049')]
+    rates = [1.0, 1.0, 1.0, 1.0]
+    expected = sum(decimal.Decimal(amount) for amount in amounts)
+    expected = expected.quantize(decimal.Decimal('.01'),
+                                 rounding=decimal.ROUND_HALF_UP)
+    assert fixed_point.get_minor_units_of_sum(amounts, rates) == \
+        int(expected.scaleb(2))
+    assert fixed_point.get_minor_units_of_sum([0.125, -0.25], [1.0, 1.0]) == \
+        -13
+    assert fixed_point.get_minor_units_of_sum([], []) == 0
+    with pytest.raises(ValueError):
+        fixed_point.get_minor_units_of_sum([float('nan')], [1.0])
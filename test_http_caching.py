@@ -0,0 +1,69 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import datetime as dt
+import pytest
+from converter_class import CurrencyConverter
+import http_caching
+
+
+@pytest.fixture(scope='module')
+def converter():
+    '''
+    Returns a converter with the rates of the snapshot file
+    '''
+    currency_converter = CurrencyConverter()
+    currency_converter.auto_refresh = False
+    return currency_converter
+
+
+def test_validators(converter):
+    '''
+    Tests the validators of fresh and stale rates
+    '''
+    status = converter.get_rates_status()
+    timestamp = status['next_update'] - dt.timedelta(seconds=90)
+    validators = http_caching.get_validators(converter, timestamp)
+    assert validators == {
+        'etag': '"{0}"'.format(converter.get_rates_version()),
+        'last_modified': status['last_update'],
+        'max_age': 90}
+    timestamp = status['next_update'] + dt.timedelta(seconds=1)
+    assert http_caching.get_validators(converter, timestamp) is None
+
+
+def test_headers():
+    '''
+    Tests the caching headers of a response
+    '''
+    last_update = dt.datetime(2026, 10, 16, 16, 10, 30, 500,
+                              tzinfo=dt.timezone(dt.timedelta(hours=2)))
+    validators = {'etag': '"abc"', 'last_modified': last_update,
+                  'max_age': 60}
+    assert http_caching.get_headers(validators) == {
+        'ETag': '"abc"',
+        'Last-Modified': 'Fri, 16 Oct 2026 14:10:30 GMT',
+        'Cache-Control': 'public, max-age=60'}
+
+
+def test_not_modified():
+    '''
+    Tests the evaluation of the conditional headers
+    '''
+    last_update = dt.datetime(2026, 10, 16, 14, 10, 30, 500,
+                              tzinfo=dt.timezone.utc)
+    validators = {'etag': '"abc"', 'last_modified': last_update,
+                  'max_age': 60}
+    assert http_caching.is_not_modified(validators, '"abc"')
+    assert http_caching.is_not_modified(validators, '"x", W/"abc"')
+    assert http_caching.is_not_modified(validators, '*')
+    assert not http_caching.is_not_modified(validators, '"x"')
+    assert not http_caching.is_not_modified(validators)
+    since = 'Fri, 16 Oct 2026 14:10:30 GMT'
+    assert http_caching.is_not_modified(validators, None, since)
+    assert not http_caching.is_not_modified(validators, '"x"', since)
+    assert not http_caching.is_not_modified(
+        validators, None, 'Fri, 16 Oct 2026 14:10:29 GMT')
+    assert not http_caching.is_not_modified(validators, None, 'yesterday')
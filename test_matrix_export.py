@@ -0,0 +1,64 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import csv
+import io
+import json
+import pytest
+import matrix_export
+from rates_matrix import CrossRateMatrix
+
+
+TEST_RATES = {'CZK': 25.524, 'JPY': 133.7, 'USD': 1.1885}
+
+
+@pytest.fixture
+def rates_matrix():
+    '''
+    Returns a CrossRateMatrix built from the test rates
+    '''
+    return CrossRateMatrix(TEST_RATES, 'EUR')
+
+
+def test_json_export(rates_matrix):
+    '''
+    Tests the JSON export of the matrix
+    '''
+    exported = json.loads(matrix_export.export_matrix(rates_matrix, 'json'))
+    assert exported['currencies'] == ['CZK', 'EUR', 'JPY', 'USD']
+    assert exported['version'] == rates_matrix.version
+    for row, input_currency in enumerate(exported['currencies']):
+        for column, output_currency in enumerate(exported['currencies']):
+            assert exported['rates'][row][column] == \
+                rates_matrix.rate(input_currency, output_currency)
+
+
+def test_csv_export(rates_matrix):
+    '''
+    Tests the CSV export of the matrix
+    '''
+    exported = matrix_export.export_matrix(rates_matrix, 'csv')
+    rows = list(csv.reader(io.StringIO(exported.decode('utf-8'))))
+    assert rows[0] == ['', 'CZK', 'EUR', 'JPY', 'USD']
+    assert rows[2][0] == 'EUR'
+    assert [float(rate) for rate in rows[2][1:]] == \
+        list(rates_matrix.row('EUR'))
+    assert len(rows) == 5
+
+
+def test_binary_export(rates_matrix):
+    '''
+    Tests, that the binary export is read back unchanged
+    '''
+    exported = matrix_export.export_matrix(rates_matrix, 'binary')
+    assert exported[:4] == b'CCRM'
+    assert len(exported) == 7 + 3 * 4 + 8 * 16
+    currencies, rates = matrix_export.read_binary(exported)
+    assert currencies == rates_matrix.currencies
+    assert rates == rates_matrix.rates
+    with pytest.raises(ValueError):
+        matrix_export.read_binary(exported[:-1])
+    with pytest.raises(ValueError):
+        matrix_export.export_matrix(rates_matrix, 'xml')
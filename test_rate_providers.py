@@ -0,0 +1,109 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import datetime as dt
+import json
+import os
+import pytest
+from converter_class import CurrencyConverter
+import currency_exceptions
+from fake_rate_server import FakeRateServer
+from rate_providers import HttpJsonProvider, StaticFileProvider
+from requests.exceptions import ConnectionError
+
+
+@pytest.fixture
+def rates_server():
+    '''
+    Runs the fake fixer.io server in a background thread
+    '''
+    with FakeRateServer({'CZK': 25.5, 'USD': 1.25}) as server:
+        yield server
+
+
+@pytest.fixture
+def rates_directory(tmpdir):
+    '''
+    Returns a directory with static rates files
+    '''
+    tmpdir.join('latest.json').write(json.dumps(
+        {'base': 'EUR', 'rates': {'CZK': 25.5, 'USD': 1.25}}))
+    tmpdir.join('latest.USD.json').write(json.dumps(
+        {'base': 'USD', 'rates': {'CZK': 20.4, 'EUR': 0.8}}))
+    tmpdir.join('2017-11-28.json').write(json.dumps(
+        {'base': 'EUR', 'rates': {'CZK': 25.6, 'USD': 1.18}}))
+    return str(tmpdir)
+
+
+def test_http_provider(rates_server):
+    '''
+    Tests the latest (conditional) and historical downloads
+    '''
+    provider = HttpJsonProvider(rates_server.url, backoff=0)
+    latest_rates = provider.fetch_latest('EUR')
+    assert latest_rates == {'CZK': 25.5, 'USD': 1.25}
+    assert provider.fetch_latest('EUR', latest_rates) is latest_rates
+    assert provider.fetch_latest('USD') == {'CZK': 20.4, 'EUR': 0.8}
+    rates_server.publish({'CZK': 25.4, 'USD': 1.25})
+    assert provider.fetch_latest('EUR', latest_rates) == {'CZK': 25.4,
+                                                          'USD': 1.25}
+    rates_server.history[dt.date(2017, 11, 28)] = {'CZK': 25.6}
+    assert provider.fetch_historical('EUR', dt.date(2017, 11, 28)) == \
+        {'CZK': 25.6}
+    assert provider.list_currencies() == ['CZK', 'EUR', 'USD']
+    provider.close()
+
+
+def test_http_provider_failures(rates_server):
+    '''
+    Tests the request limit and the retried server errors
+    '''
+    provider = HttpJsonProvider(rates_server.url, backoff=0)
+    rates_server.limited = 1
+    with pytest.raises(currency_exceptions.FixerError):
+        provider.fetch_latest('EUR')
+    rates_server.failures = 2
+    assert provider.fetch_latest('EUR') == {'CZK': 25.5, 'USD': 1.25}
+    assert len(rates_server.requests) == 4
+    provider.close()
+    rates_server.stop()
+    with pytest.raises(ConnectionError):
+        HttpJsonProvider(rates_server.url, retries=0).fetch_latest('EUR')
+
+
+def test_static_provider(rates_directory):
+    '''
+    Tests reading the rates from a directory
+    '''
+    provider = StaticFileProvider(rates_directory)
+    latest_rates = provider.fetch_latest('EUR')
+    assert latest_rates == {'CZK': 25.5, 'USD': 1.25}
+    assert provider.fetch_latest('EUR', latest_rates) is latest_rates
+    assert provider.fetch_latest('USD') == {'CZK': 20.4, 'EUR': 0.8}
+    assert provider.fetch_historical('EUR', dt.date(2017, 11, 28)) == \
+        {'CZK': 25.6, 'USD': 1.18}
+    with pytest.raises(ConnectionError):
+        provider.fetch_historical('EUR', dt.date(2017, 11, 27))
+    with pytest.raises(ConnectionError):
+        provider.fetch_historical('USD', dt.date(2017, 11, 28))
+
+
+def test_offline_converter(rates_directory, tmpdir):
+    '''
+    Tests the whole converter with rates of a static provider
+    '''
+    rates_file = str(tmpdir.join('rates.snapshot'))
+    offline_converter = CurrencyConverter(
+        rates_file=rates_file,
+        history_file=str(tmpdir.join('rates.history')),
+        provider=StaticFileProvider(rates_directory))
+    assert os.path.isfile(rates_file)
+    assert sorted(offline_converter.available_currencies) == \
+        ['CZK', 'EUR', 'USD']
+    conversion = offline_converter.convert(10, 'USD', 'CZK')
+    assert conversion['output'] == {'CZK': 204.0}
+    conversion = offline_converter.convert(10, 'EUR', 'CZK',
+                                           on_date='2017-11-28')
+    assert conversion['output'] == {'CZK': 256.0}
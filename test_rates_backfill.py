@@ -0,0 +1,109 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import datetime as dt
+import pytest
+import requests
+from converter_class import CurrencyConverter
+from fake_rate_server import FakeRateServer
+from rate_providers import HttpJsonProvider
+import rates_backfill
+
+
+@pytest.fixture
+def rates_server():
+    '''
+    Runs a stand-in of fixer.io in a background thread
+    '''
+    with FakeRateServer({'CZK': 25.0, 'USD': 1.2}) as server:
+        server.history[dt.date(2017, 11, 7)] = {'CZK': 25.07, 'USD': 1.2}
+        yield server
+
+
+@pytest.fixture
+def history_converter(rates_server, tmpdir):
+    '''
+    Returns a CurrencyConverter downloading from the stand-in server
+    '''
+    return CurrencyConverter(history_file=str(tmpdir.join('rates.history')),
+                             provider=HttpJsonProvider(rates_server.url))
+
+
+def test_backfill(rates_server, history_converter):
+    '''
+    Tests, if only the missing days are downloaded, and the rerun is a no-op
+    '''
+    history_converter.fetch_historical_rates(dt.date(2017, 11, 3))
+    reports = []
+    report = rates_backfill.backfill(history_converter,
+                                     dt.date(2017, 11, 1),
+                                     dt.date(2017, 11, 10),
+                                     workers=3,
+                                     progress=reports.append)
+    assert (report.total, report.done, report.failed) == (9, 9, [])
+    assert len(reports) == 9
+    assert len(rates_server.requests) == 10
+    assert history_converter.get_missing_days(dt.date(2017, 11, 1),
+                                              dt.date(2017, 11, 10)) == []
+    conversion = history_converter.convert(100, 'EUR', 'CZK',
+                                           on_date='2017-11-07')
+    assert conversion['output'] == {'CZK': 2507.0}
+    report = rates_backfill.backfill(history_converter,
+                                     dt.date(2017, 11, 1),
+                                     dt.date(2017, 11, 10))
+    assert report.total == 0
+    assert len(rates_server.requests) == 10
+
+
+def test_download_errors(mocker, history_converter):
+    '''
+    Tests, that a download error fails only its day
+    '''
+    fetched_days = []
+
+    def fetch_historical_rates(day):
+        '''
+        Fails every download except of one day
+        '''
+        if day != dt.date(2017, 11, 2):
+            raise requests.exceptions.ChunkedEncodingError
+        fetched_days.append(day)
+
+    mocker.patch.object(history_converter, 'fetch_historical_rates',
+                        side_effect=fetch_historical_rates)
+    report = rates_backfill.backfill(history_converter,
+                                     dt.date(2017, 11, 1),
+                                     dt.date(2017, 11, 3),
+                                     workers=2)
+    assert report.done == 1
+    assert report.failed == [dt.date(2017, 11, 1), dt.date(2017, 11, 3)]
+    assert fetched_days == [dt.date(2017, 11, 2)]
+
+
+def test_backpressure(rates_server, history_converter):
+    '''
+    Tests, if the request limit pauses and retries the downloads
+    '''
+    rates_server.limited = 3
+    backpressure = rates_backfill.Backpressure(min_delay=0.01,
+                                               max_delay=0.05)
+    report = rates_backfill.backfill(history_converter,
+                                     dt.date(2017, 11, 1),
+                                     dt.date(2017, 11, 4),
+                                     workers=2,
+                                     backpressure=backpressure)
+    assert report.done == 4
+    assert report.throttled == 3
+    assert report.failed == []
+    rates_server.limited = 100
+    report = rates_backfill.backfill(history_converter,
+                                     dt.date(2017, 11, 5),
+                                     dt.date(2017, 11, 5),
+                                     max_attempts=2,
+                                     backpressure=backpressure)
+    assert report.failed == [dt.date(2017, 11, 5)]
+    assert history_converter.get_missing_days(dt.date(2017, 11, 1),
+                                              dt.date(2017, 11, 5)) == \
+        [dt.date(2017, 11, 5)]
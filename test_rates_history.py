@@ -0,0 +1,66 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import datetime as dt
+import pytest
+from rates_history import RatesHistory, HistoryError
+
+
+def test_add_and_get(tmpdir):
+    '''
+    Tests storing and looking up the rates of days (in any order)
+    '''
+    history = RatesHistory(str(tmpdir.join('rates.history')))
+    assert len(history) == 0
+    assert history.get_rates(dt.date(2017, 11, 28)) is None
+    assert history.add_rates(dt.date(2017, 11, 28), {'CZK': 25.5,
+                                                     'USD': 1.18})
+    assert history.add_rates(dt.date(2017, 11, 27), {'CZK': 25.6,
+                                                     'USD': 1.19})
+    assert not history.add_rates(dt.date(2017, 11, 27), {'CZK': 1.0})
+    assert history.days() == [dt.date(2017, 11, 27), dt.date(2017, 11, 28)]
+    assert history.get_rates(dt.date(2017, 11, 27)) == {'CZK': 25.6,
+                                                        'USD': 1.19}
+    assert dt.date(2017, 11, 28) in history
+    assert dt.date(2017, 11, 29) not in history
+
+
+def test_new_currency(tmpdir):
+    '''
+    Tests, if new currencies extend the columns of the stored days
+    '''
+    history = RatesHistory(str(tmpdir.join('rates.history')))
+    history.add_rates(dt.date(2017, 11, 27), {'CZK': 25.6})
+    history.add_rates(dt.date(2017, 11, 28), {'CZK': 25.5, 'USD': 1.18})
+    assert history.currencies == ('CZK', 'USD')
+    assert history.get_rates(dt.date(2017, 11, 27)) == {'CZK': 25.6}
+    assert history.get_rates(dt.date(2017, 11, 28)) == {'CZK': 25.5,
+                                                        'USD': 1.18}
+
+
+def test_shared_file(tmpdir):
+    '''
+    Tests, if days appended by another instance (process) are visible
+    '''
+    history_file = str(tmpdir.join('rates.history'))
+    history = RatesHistory(history_file)
+    other_history = RatesHistory(history_file)
+    history.add_rates(dt.date(2017, 11, 27), {'CZK': 25.6})
+    assert other_history.get_rates(dt.date(2017, 11, 27)) == {'CZK': 25.6}
+    other_history.add_rates(dt.date(2017, 11, 29), {'CZK': 25.4})
+    assert history.missing_days(dt.date(2017, 11, 26),
+                                dt.date(2017, 11, 29)) == \
+        [dt.date(2017, 11, 26), dt.date(2017, 11, 28)]
+    assert len(RatesHistory(history_file)) == 2
+
+
+def test_invalid_history(tmpdir):
+    '''
+    Tests, if a foreign file is refused
+    '''
+    history_file = tmpdir.join('rates.history')
+    history_file.write_binary(b'XXXX' + b'\0' * 16)
+    with pytest.raises(HistoryError):
+        RatesHistory(str(history_file))
@@ -0,0 +1,114 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import decimal
+import pytest
+from rates_matrix import CrossRateMatrix, calculate_cross_rate
+
+
+TEST_RATES = {'AUD': 1.5693,
+              'CZK': 25.524,
+              'DKK': 7.442,
+              'EUR': 1.0,
+              'GBP': 0.88115,
+              'HRK': 7.5553,
+              'JPY': 133.7,
+              'PLN': 4.2129,
+              'USD': 1.1885}
+
+
+@pytest.fixture
+def rates_matrix():
+    '''
+    Returns a CrossRateMatrix built from the test rates
+    '''
+    return CrossRateMatrix(TEST_RATES, 'EUR')
+
+
+def reference_rate(input_currency, output_currency):
+    '''
+    The conversion rate calculated directly with decimals
+    '''
+    if input_currency == output_currency:
+        return 1.0
+    if input_currency == 'EUR':
+        return TEST_RATES[output_currency]
+    rate = (decimal.Decimal(TEST_RATES[output_currency]) /
+            decimal.Decimal(TEST_RATES[input_currency]))
+    return float(rate.quantize(decimal.Decimal('.00001'),
+                               rounding=decimal.ROUND_HALF_UP))
+
+
+def test_matrix_currencies(rates_matrix):
+    '''
+    Tests the order and the size of the matrix
+    '''
+    assert rates_matrix.currencies == tuple(sorted(TEST_RATES))
+    assert len(rates_matrix) == len(TEST_RATES)
+
+
+def test_matrix_rates(rates_matrix):
+    '''
+    Tests every rate of the matrix against the decimal calculation
+    '''
+    for input_currency in TEST_RATES:
+        for output_currency in TEST_RATES:
+            expected_rate = reference_rate(input_currency, output_currency)
+            assert rates_matrix.rate(input_currency,
+                                     output_currency) == expected_rate
+            assert calculate_cross_rate(TEST_RATES,
+                                        'EUR',
+                                        input_currency,
+                                        output_currency) == expected_rate
+
+
+def test_matrix_row(rates_matrix):
+    '''
+    Tests if a row holds the rates in the order of the currencies
+    '''
+    row = rates_matrix.row('CZK')
+    expected_row = [reference_rate('CZK', currency)
+                    for currency in rates_matrix.currencies]
+    assert list(row) == expected_row
+
+
+def test_matrix_column(rates_matrix):
+    '''
+    Tests if a column holds the rates in the order of the currencies
+    '''
+    column = rates_matrix.column('CZK')
+    expected_column = [reference_rate(currency, 'CZK')
+                       for currency in rates_matrix.currencies]
+    assert list(column) == expected_column
+
+
+def test_matrix_missing_base():
+    '''
+    Tests if the base currency is added to the matrix
+    '''
+    base_rates = {'USD': 1.1885, 'GBP': 0.88115}
+    rates_matrix = CrossRateMatrix(base_rates, 'EUR')
+    assert 'EUR' in rates_matrix.currencies
+    assert rates_matrix.rate('EUR', 'USD') == 1.1885
+    assert rates_matrix.rate('USD', 'EUR') == 0.84140
+
+
+def test_matrix_unknown_currency(rates_matrix):
+    '''
+    Tests if an unknown currency raises KeyError
+    '''
+    with pytest.raises(KeyError):
+        rates_matrix.rate('EUR', 'XYZ')
+
+
+def test_matrix_version(rates_matrix):
+    '''
+    Tests, that the version depends only on the content of the matrix
+    '''
+    assert CrossRateMatrix(dict(TEST_RATES), 'EUR').version == \
+        rates_matrix.version
+    changed_rates = dict(TEST_RATES, CZK=25.525)
+    assert CrossRateMatrix(changed_rates, 'EUR').version != \
+        rates_matrix.version
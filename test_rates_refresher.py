@@ -0,0 +1,93 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import datetime as dt
+import subprocess
+import sys
+import pytest
+import requests
+from converter_class import CurrencyConverter
+from rates_refresher import RatesRefresher
+from pytest_mock import mocker
+
+
+@pytest.fixture
+def refresher():
+    '''
+    Returns a RatesRefresher of a CurrencyConverter object
+    '''
+    return RatesRefresher(CurrencyConverter(), retry_interval=10.0,
+                          max_retry_interval=30.0)
+
+
+def test_delay_until_next_update(refresher):
+    '''
+    Tests if the refresher waits until the next publication of the rates
+    '''
+    last_update = refresher.converter.actual_rates['last_update']
+    next_update = refresher.converter.get_rates_status()['next_update']
+    delay = refresher.get_delay(next_update - dt.timedelta(minutes=5))
+    assert delay == 300.0
+    assert refresher.get_delay(next_update + dt.timedelta(minutes=5)) == 0.0
+    assert next_update > last_update
+
+
+def test_failed_refresh(refresher, mocker):
+    '''
+    Tests the status and the retry delays after failed refreshes
+    '''
+    mocked_refresh = mocker.patch.object(CurrencyConverter,
+                                         'refresh_rates',
+                                         autospec=True)
+    mocked_refresh.side_effect = requests.exceptions.ConnectionError
+    assert not refresher.refresh()
+    assert refresher.get_delay() == 10.0
+    assert not refresher.refresh()
+    assert refresher.get_delay() == 20.0
+    assert not refresher.refresh()
+    assert refresher.get_delay() == 30.0
+    status = refresher.status()
+    assert status['failures'] == 3
+    assert status['last_error'].startswith('ConnectionError')
+    assert status['last_success'] is None
+
+    mocked_refresh.side_effect = None
+    mocked_refresh.return_value = True
+    assert refresher.refresh()
+    status = refresher.status()
+    assert status['consecutive_failures'] == 0
+    assert status['last_error'] is None
+    assert status['refreshes'] == 1
+
+
+def test_start_stop(refresher, mocker):
+    '''
+    Tests if the conversions don't refresh the rates while the refresher runs
+    '''
+    mocked_refresh = mocker.patch.object(CurrencyConverter,
+                                         'refresh_rates',
+                                         autospec=True)
+    mocked_refresh.return_value = False
+    converter = refresher.converter
+    refresher.start()
+    assert refresher.status()['running']
+    assert not converter.auto_refresh
+    calls = mocked_refresh.call_count
+    tomorrow = converter.actual_rates['last_update'] + dt.timedelta(days=1)
+    converter._check_rates_actuality(tomorrow)
+    assert mocked_refresh.call_count == calls
+    refresher.stop(timeout=5)
+    assert not refresher.is_alive()
+    assert converter.auto_refresh
+
+
+def test_lazy_requests_import():
+    '''
+    Tests, that importing the refresher doesn't import requests
+    '''
+    script = 'import sys; import rates_refresher; ' + \
+        'print("requests" in sys.modules)'
+    output = subprocess.check_output([sys.executable, '-c', script])
+    assert output.strip() == b'False'
@@ -0,0 +1,135 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import copy
+import datetime as dt
+import os
+import pickle
+import pytest
+import pytz
+import rates_snapshot
+from converter_class import CurrencyConverter
+
+
+TEST_RATES = {'last_update': dt.datetime(2026, 10, 16, 16, 5,
+                                         tzinfo=pytz.utc).astimezone(
+                                             pytz.timezone('CET')),
+              'rates': {'EUR': {'CZK': 25.524, 'GBP': 0.88115,
+                                'USD': 1.1885},
+                        'USD': {'CZK': 21.476, 'EUR': 0.84140}},
+              'validators': {'EUR': {'ETag': '"abc"'}}}
+
+
+def test_round_trip(tmpdir):
+    '''
+    Tests, if the snapshot gives back the same rates dictionary
+    '''
+    snapshot_file = str(tmpdir.join('rates.snapshot'))
+    rates_snapshot.write_snapshot(snapshot_file, TEST_RATES)
+    assert rates_snapshot.is_snapshot(snapshot_file)
+    assert rates_snapshot.load_rates(snapshot_file) == TEST_RATES
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='POSIX permissions')
+def test_snapshot_permissions(tmpdir):
+    '''
+    Tests, that the snapshot can be read by the other users like a file
+    written by open, and that a rewrite keeps the permissions
+    '''
+    snapshot_file = str(tmpdir.join('rates.snapshot'))
+    rates_snapshot.write_snapshot(snapshot_file, TEST_RATES)
+    tmpdir.join('opened').write('')
+    assert os.stat(snapshot_file).st_mode & 0o777 == \
+        os.stat(str(tmpdir.join('opened'))).st_mode & 0o777
+    os.chmod(snapshot_file, 0o640)
+    rates_snapshot.write_snapshot(snapshot_file, TEST_RATES)
+    assert os.stat(snapshot_file).st_mode & 0o777 == 0o640
+
+
+def test_snapshot_view(tmpdir):
+    '''
+    Tests the memory mapped view of the rates
+    '''
+    snapshot_file = str(tmpdir.join('rates.snapshot'))
+    rates_snapshot.write_snapshot(snapshot_file, TEST_RATES)
+    with rates_snapshot.RatesSnapshot(snapshot_file) as snapshot:
+        assert snapshot.bases == ('EUR', 'USD')
+        assert snapshot.currencies == ('CZK', 'EUR', 'GBP', 'USD')
+        assert isinstance(snapshot.rates, memoryview)
+        assert len(snapshot.rates) == 8
+        assert snapshot.rates[2] == 0.88115
+        assert snapshot.base_rates('USD') == TEST_RATES['rates']['USD']
+
+
+def test_rates_in_place(tmpdir, monkeypatch):
+    '''
+    Tests, that the loaded rates are read from the mapped snapshot, while
+    the snapshot can be replaced
+    '''
+    snapshot_file = str(tmpdir.join('rates.snapshot'))
+    rates_snapshot.write_snapshot(snapshot_file, TEST_RATES)
+    monkeypatch.setattr(rates_snapshot, 'READ_IN_PLACE', True)
+    actual_rates = rates_snapshot.load_rates(snapshot_file)
+    usd_rates = actual_rates['rates']['USD']
+    assert isinstance(usd_rates, rates_snapshot.BaseRates)
+    assert list(usd_rates) == ['CZK', 'EUR']
+    assert len(usd_rates) == 2
+    assert usd_rates['CZK'] == 21.476
+    assert 'GBP' not in usd_rates
+    assert type(copy.deepcopy(usd_rates)) is dict
+    assert pickle.loads(pickle.dumps(actual_rates)) == TEST_RATES
+    rates_snapshot.write_snapshot(snapshot_file, {'last_update': None,
+                                                  'rates': {'EUR': {}}})
+    assert usd_rates == TEST_RATES['rates']['USD']
+    monkeypatch.setattr(rates_snapshot, 'READ_IN_PLACE', False)
+    copied_rates = rates_snapshot.load_rates(snapshot_file)
+    assert copied_rates['rates'] == {'EUR': {}}
+    assert type(copied_rates['rates']['EUR']) is dict
+
+
+def test_invalid_snapshot(tmpdir):
+    '''
+    Tests, if truncated or foreign files are refused
+    '''
+    snapshot_file = str(tmpdir.join('rates.snapshot'))
+    data = rates_snapshot.dumps(TEST_RATES)
+    with open(snapshot_file, 'wb') as handle:
+        handle.write(data[:-4])
+    with pytest.raises(rates_snapshot.SnapshotError):
+        rates_snapshot.load_rates(snapshot_file)
+    with open(snapshot_file, 'wb') as handle:
+        handle.write(b'XXXX' + data[4:])
+    assert not rates_snapshot.is_snapshot(snapshot_file)
+    with pytest.raises(rates_snapshot.SnapshotError):
+        rates_snapshot.load_rates(snapshot_file)
+
+
+def test_legacy_pickle(tmpdir):
+    '''
+    Tests, if the converter still reads rates pickled by older versions
+    '''
+    pickle_file = str(tmpdir.join('rates.pickle'))
+    with open(pickle_file, 'wb') as handle:
+        pickle.dump(TEST_RATES, handle)
+    converter = CurrencyConverter()
+    assert converter._check_rates_file(pickle_file) == TEST_RATES
+
+
+def test_legacy_default_file(tmpdir):
+    '''
+    Tests, if the converter reads the legacy default rates.pickle, while the
+    default snapshot doesn't exist
+    '''
+    rates = {'last_update': TEST_RATES['last_update'],
+             'rates': {'EUR': {'CZK': 25.524, 'EUR': 1.0, 'USD': 1.1885}}}
+    with open(str(tmpdir.join('rates.pickle')), 'wb') as handle:
+        pickle.dump(rates, handle)
+    converter = CurrencyConverter(
+        rates_file=str(tmpdir.join('rates.snapshot')))
+    assert converter.actual_rates == rates
+    assert sorted(converter.available_currencies) == ['CZK', 'EUR', 'USD']
+    assert not tmpdir.join('rates.snapshot').check()
+    converter._rates_file = str(tmpdir.join('other.snapshot'))
+    assert converter._get_initial_rates_file() == converter._rates_file
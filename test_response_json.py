@@ -0,0 +1,77 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import json
+import pytest
+from converter_class import CurrencyConverter
+import response_json
+
+
+@pytest.fixture(scope='module')
+def converter():
+    '''
+    Returns a converter with the actual rates
+    '''
+    currency_converter = CurrencyConverter()
+    currency_converter.auto_refresh = False
+    return currency_converter
+
+
+def get_expected(converter, *arguments, **keywords):
+    '''
+    Returns the output of `convert` serialized by the json module
+    '''
+    result = converter.convert(*arguments, **keywords)
+    return json.dumps(result, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_same_as_json(converter, use_orjson):
+    '''
+    Tests, that the compact JSON is the same as the JSON of `convert`
+    '''
+    converter._response_serializer = response_json.ResponseSerializer(
+        converter._get_rates_matrix(), use_orjson=use_orjson)
+    conversions = [(100.0, 'EUR'), (100, 'CZK', '$'), (-0.0, 'USD'),
+                   (1.005, 'EUR', 'EUR'), (7, 'EUR', 'JPY'), (1, 'XXX'),
+                   ('text', 'EUR'), (True, 'EUR'), (10 ** 20, 'EUR', 'CZK')]
+    for conversion in conversions:
+        for output_format in ('float', 'decimal', 'minor'):
+            result = converter.convert_json(*conversion,
+                                            output_format=output_format)
+            assert result == get_expected(converter, *conversion,
+                                          output_format=output_format)
+    converter._response_serializer = None
+
+
+def test_serializer_per_snapshot(converter):
+    '''
+    Tests, that the serializer is prepared once for every cross-rate matrix
+    '''
+    converter.convert_json(1, 'EUR')
+    serializer = converter._get_response_serializer()
+    converter.convert_json(2, 'USD')
+    assert converter._get_response_serializer() is serializer
+    assert serializer.rates_matrix is converter._get_rates_matrix()
+
+
+def test_dumps():
+    '''
+    Tests the serialization of other results
+    '''
+    result = {'output': {'b': 1.5, 'a': 'x'}, 'input': {'amount': 2 ** 70}}
+    expected = b'{"input":{"amount":1180591620717411303424},' + \
+        b'"output":{"a":"x","b":1.5}}'
+    assert response_json.dumps(result) == expected
+    assert response_json.dumps(result, use_orjson=False) == expected
+
+
+def test_wrong_output_format(converter):
+    '''
+    Tests, that an unknown output format raises ValueError
+    '''
+    with pytest.raises(ValueError):
+        converter.convert_json(1, 'EUR', output_format='binary')
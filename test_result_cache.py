@@ -0,0 +1,109 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import copy
+import pytest
+from converter_class import CurrencyConverter
+import result_cache
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def converter():
+    '''
+    Returns a converter with a result cache
+    '''
+    currency_converter = CurrencyConverter()
+    currency_converter.auto_refresh = False
+    currency_converter.result_cache = ResultCache(max_size=16)
+    return currency_converter
+
+
+def test_lru_eviction():
+    '''
+    Tests, that the least recently used entry is evicted
+    '''
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 3,
+                             'misses': 1, 'hit_ratio': 0.75,
+                             'evictions': 1, 'expirations': 0}
+
+
+def test_fifo_eviction():
+    '''
+    Tests, that the oldest entry is evicted by the fifo policy
+    '''
+    cache = ResultCache(max_size=2, policy=result_cache.FIFO_POLICY)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('a') is None
+    assert len(cache) == 2
+
+
+def test_expiration(mocker):
+    '''
+    Tests the expiration of the entries
+    '''
+    monotonic = mocker.patch('result_cache.time.monotonic', return_value=10.0)
+    cache = ResultCache(ttl=5.0)
+    cache.put('a', 1)
+    monotonic.return_value = 14.0
+    assert cache.get('a') == 1
+    monotonic.return_value = 15.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_wrong_parameters():
+    '''
+    Tests the validation of the parameters
+    '''
+    with pytest.raises(ValueError):
+        ResultCache(max_size=0)
+    with pytest.raises(ValueError):
+        ResultCache(policy='random')
+
+
+def test_cached_conversion(converter):
+    '''
+    Tests, that the cached results are the same as the computed ones
+    '''
+    first = converter.convert(100, 'EUR', 'CZK')
+    first['output']['CZK'] = None
+    second = converter.convert(100, 'EUR', 'CZK')
+    assert second == converter.convert(100, 'EUR', 'CZK')
+    assert second['output']['CZK'] is not None
+    assert converter.result_cache.hits == 2
+    converter.convert(-0.0, 'EUR', 'CZK')
+    negative = converter.convert(-0.0, 'EUR', 'CZK')
+    assert str(negative['input']['amount']) == '-0.0'
+    response = converter.convert_json(100, 'EUR')
+    assert converter.convert_json(100, 'EUR') is response
+    converter.convert(1, 'XXX')
+    converter.convert(1, 'EUR', on_date='2017-12-01')
+    assert len(converter.result_cache) == 3
+
+
+def test_new_rates(converter):
+    '''
+    Tests, that the results of older rates aren't returned
+    '''
+    result = converter.convert(100, 'EUR', 'CZK')
+    actual_rates = copy.deepcopy(converter.actual_rates)
+    actual_rates['rates']['EUR']['CZK'] *= 2
+    converter.actual_rates = actual_rates
+    assert converter.convert(100, 'EUR', 'CZK')['output']['CZK'] == \
+        2 * result['output']['CZK']
+    assert converter.result_cache.hits == 0
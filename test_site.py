@@ -5,9 +5,13 @@ Created on 28. 11. 2017
 
 Tests for the api, using pytest-flask
 '''
+import copy
+import datetime as dt
 import json
 import pytest
+import pytz
 from flask_app import app
+from flask_app import data_handling
 
 
 @pytest.fixture
@@ -17,6 +21,20 @@ def client(request):
     return test_client
 
 
+@pytest.fixture
+def fresh_rates():
+    '''
+    Makes the rates of the shared converter fresh (updated right now)
+    '''
+    converter = data_handling.get_converter()
+    actual_rates = converter.actual_rates
+    fresh_rates = copy.copy(actual_rates)
+    fresh_rates['last_update'] = dt.datetime.now(tz=pytz.timezone('CET'))
+    converter.actual_rates = fresh_rates
+    yield converter
+    converter.actual_rates = actual_rates
+
+
 def json_of_response(response):
     '''
     json decoding
@@ -58,6 +76,25 @@ def test_converter_text_amount(client):
     assert response_json['output']['error'] == expected_output
 
 
+def test_converter_missing_input_currency(client):
+    '''
+    tests the response if the input currency is missing
+    '''
+    response = client.get('/currency_converter?amount=10&output_currency=EUR')
+    assert response.status_code == 400
+    assert json_of_response(response) == {'error': 'Wrong parameters'}
+
+
+def test_converter_missing_amount(client):
+    '''
+    tests the response if the amount is missing
+    '''
+    response = client.get('/currency_converter?input_currency=EUR' +
+                          '&output_currency=USD')
+    assert response.status_code == 400
+    assert json_of_response(response) == {'error': 'Wrong parameters'}
+
+
 def test_converter_unknown_currency(client):
     '''
     tests the response if an unknown currency is provided
@@ -84,3 +121,186 @@ def test_converter_toomuch_input_currency(client):
     expected_output = 'Conversion error, the input symbol represents more ' + \
                       'than one currency, try to use 3-letter currency code'
     assert response_json['output']['error'] == expected_output
+
+
+def test_shared_converter(client):
+    '''
+    tests if the requests are served by one shared converter
+    '''
+    first_converter = data_handling.get_converter()
+    client.get('/currency_converter?amount=100&input_currency=EUR')
+    assert data_handling.get_converter() is first_converter
+
+
+def test_batch_conversion(client):
+    '''
+    tests the batch endpoint with a JSON array
+    '''
+    items = [{'amount': 100, 'input_currency': 'EUR', 'output_currency': 'GBP'},
+             {'amount': 'blahblah', 'input_currency': 'EUR'},
+             {'amount': '10', 'input_currency': '$', 'output_currency': 'EUR'},
+             {'amount': 10, 'input_currency': '€', 'output_currency': 'GBP'}]
+    response = client.post('/currency_converter/batch',
+                           data=json.dumps(items),
+                           content_type='application/json')
+    response_json = json_of_response(response)
+    assert response.status_code == 200
+    assert len(response_json) == 4
+    single_uri = '/currency_converter?amount=100&input_currency=EUR' + \
+                 '&output_currency=GBP'
+    assert response_json[0] == json_of_response(client.get(single_uri))
+    assert response_json[1]['output']['error'] == \
+        'Conversion error, check the input parameters'
+    assert response_json[2]['output']['error'] == \
+        'Conversion error, the input symbol represents more ' + \
+        'than one currency, try to use 3-letter currency code'
+    assert response_json[3]['input']['currency'] == 'EUR'
+
+
+def test_batch_conversion_wrong_body(client):
+    '''
+    tests the batch endpoint if the body isn't a list of conversions
+    '''
+    for body in ('{"amount": 100}', '[{"amount": 100}]', 'blahblah'):
+        response = client.post('/currency_converter/batch',
+                               data=body,
+                               content_type='application/json')
+        assert response.status_code == 400
+
+
+def test_batch_conversion_ndjson(client):
+    '''
+    tests the batch endpoint with a NDJSON stream
+    '''
+    lines = ['{"amount": 100, "input_currency": "EUR", "output_currency": "GBP"}',
+             'blahblah',
+             '',
+             '{"amount": 100, "input_currency": "unknown"}']
+    response = client.post('/currency_converter/batch',
+                           data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+    results = [json.loads(line) for line
+               in response.data.decode('utf8').splitlines()]
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(results) == 3
+    assert 'GBP' in results[0]['output']
+    assert results[1]['output']['error'] == \
+        'Conversion error, check the input parameters'
+    assert results[2]['output']['error'] == \
+        'Conversion error, the currency can\'t be recognized'
+
+
+def test_status(client):
+    '''
+    tests the status of the rates
+    '''
+    response = client.get('/currency_converter/status')
+    response_json = json_of_response(response)
+    assert response.status_code == 200
+    assert not response_json['background_refresh']
+    assert 'last_update' in response_json
+    assert 'stale' in response_json
+
+
+def test_output_format(client):
+    '''
+    tests the output formats of the amounts
+    '''
+    base_uri = '/currency_converter?amount={0}&input_currency={1}' + \
+        '&output_currency={2}&format={3}'
+    response = client.get(base_uri.format('1000', 'EUR', 'JPY', 'minor'))
+    response_json = json_of_response(response)
+    assert response.status_code == 200
+    assert isinstance(response_json['output']['JPY'], int)
+    response = client.get(base_uri.format('1000', 'EUR', 'CZK', 'decimal'))
+    response_json = json_of_response(response)
+    assert response_json['output']['CZK'][-3] == '.'
+    response = client.get(base_uri.format('1000', 'EUR', 'CZK', 'binary'))
+    assert response.status_code == 400
+
+
+def test_compact_response(client):
+    '''
+    tests, that the conversion is returned as the compact JSON of the
+    converter
+    '''
+    response = client.get('/currency_converter?amount=10&input_currency=EUR')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    converter = data_handling.get_converter()
+    assert response.data == converter.convert_json(10.0, 'EUR')
+
+
+def test_http_caching(client, fresh_rates):
+    '''
+    tests the caching headers and the conditional requests
+    '''
+    uri = '/currency_converter?amount=10&input_currency=EUR'
+    response = client.get(uri)
+    etag = response.headers['ETag']
+    assert etag == '"{0}"'.format(fresh_rates.get_rates_version())
+    assert 'Last-Modified' in response.headers
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+    response = client.get(uri, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    response = client.get(uri, headers={'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    response = client.get(uri + '&date=2017-12-01',
+                          headers={'If-None-Match': etag})
+    assert response.status_code != 304
+    assert 'ETag' not in response.headers
+
+
+def test_portfolio_valuation(client):
+    '''
+    tests the valuation of a portfolio
+    '''
+    uri = '/currency_converter/portfolio'
+    body = {'holdings': {'USD': 10, '€': '2.5', 'Kč': 100},
+            'target_currency': 'CZK',
+            'format': 'minor',
+            'rounding': 'total'}
+    response = client.post(uri, json=body)
+    assert response.status_code == 200
+    response_json = json_of_response(response)
+    assert response_json['input']['currency'] == 'CZK'
+    assert sorted(response_json['output']['lines']) == ['CZK', 'EUR', 'USD']
+    assert response_json['output']['lines']['CZK'] == 10000
+    response = client.post(uri, json={'holdings': [], 'target_currency': 'X'})
+    assert response.status_code == 400
+    response = client.post(uri, json=dict(body, rounding='none'))
+    assert response.status_code == 400
+
+
+def test_matrix_export(client):
+    '''
+    tests the export of the cross-rate matrix
+    '''
+    response = client.get('/currency_converter/matrix')
+    assert response.status_code == 200
+    matrix = json_of_response(response)
+    assert len(matrix['rates']) == len(matrix['currencies'])
+    response = client.get('/currency_converter/matrix?format=binary')
+    assert response.mimetype == 'application/octet-stream'
+    assert response.data[:4] == b'CCRM'
+    response = client.get('/currency_converter/matrix?format=xml')
+    assert response.status_code == 400
+    response = client.get('/currency_converter/matrix?date=2999-01-01')
+    assert response.status_code == 400
+    assert 'date' in json_of_response(response)['error']
+
+
+def test_metrics(client):
+    '''
+    tests the Prometheus metrics of the conversions
+    '''
+    client.get('/currency_converter?amount=10&input_currency=XYZ')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    metrics = response.data.decode('utf-8')
+    assert '# TYPE currency_converter_stage_seconds histogram' in metrics
+    assert 'currency_converter_errors_total{error="CurrencyError"}' in metrics
+    assert 'currency_converter_snapshot_age_seconds ' in metrics
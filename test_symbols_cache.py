@@ -0,0 +1,98 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+'''
+import os
+import shutil
+from converter_class import CurrencyConverter
+import symbols_cache
+
+
+def _get_parse(calls):
+    '''
+    Returns a parser of the symbols file, which counts its calls
+    '''
+    def parse(file_name, separator):
+        calls.append(file_name)
+        return {b'$': ['AUD', 'USD'], b'\xe2\x82\xac': ['EUR']}
+    return parse
+
+
+def test_cache_reuse(tmpdir):
+    '''
+    Tests, that the symbols file is parsed only once and the compiled map is
+    read from the cache afterwards
+    '''
+    symbols_file = str(tmpdir.join('symbols.txt'))
+    tmpdir.join('symbols.txt').write('$\tUSD\n')
+    calls = []
+    first_map = symbols_cache.load_symbols_map(symbols_file, '\t',
+                                               ['USD', 'EUR'],
+                                               _get_parse(calls))
+    assert os.path.isfile(symbols_cache.get_cache_path(symbols_file))
+    second_map = symbols_cache.load_symbols_map(symbols_file, '\t',
+                                                ['EUR', 'USD'],
+                                                _get_parse(calls))
+    assert second_map == first_map
+    assert second_map[b'$'] == ['AUD', 'USD']
+    assert len(calls) == 1
+
+
+def test_cache_invalidation(tmpdir):
+    '''
+    Tests, that the cache isn't used for other currencies, other separator
+    or a changed symbols file
+    '''
+    symbols_file = str(tmpdir.join('symbols.txt'))
+    tmpdir.join('symbols.txt').write('$\tUSD\n')
+    calls = []
+    symbols_cache.load_symbols_map(symbols_file, '\t', ['USD'],
+                                   _get_parse(calls))
+    symbols_cache.load_symbols_map(symbols_file, '\t', ['USD', 'EUR'],
+                                   _get_parse(calls))
+    symbols_cache.load_symbols_map(symbols_file, ';', ['USD', 'EUR'],
+                                   _get_parse(calls))
+    assert len(calls) == 3
+    tmpdir.join('symbols.txt').write('$\tUSD\n\xa3\tGBP\n')
+    symbols_cache.load_symbols_map(symbols_file, ';', ['USD', 'EUR'],
+                                   _get_parse(calls))
+    assert len(calls) == 4
+
+
+def test_broken_cache(tmpdir):
+    '''
+    Tests, that an unreadable cache is replaced
+    '''
+    symbols_file = str(tmpdir.join('symbols.txt'))
+    tmpdir.join('symbols.txt').write('$\tUSD\n')
+    with open(symbols_cache.get_cache_path(symbols_file), 'wb') as handle:
+        handle.write(b'garbage')
+    calls = []
+    symbols_map = symbols_cache.load_symbols_map(symbols_file, '\t', ['USD'],
+                                                 _get_parse(calls))
+    assert symbols_map[b'$'] == ['AUD', 'USD']
+    assert len(calls) == 1
+    symbols_cache.load_symbols_map(symbols_file, '\t', ['USD'],
+                                   _get_parse(calls))
+    assert len(calls) == 1
+
+
+def test_lazy_symbols(tmpdir):
+    '''
+    Tests, that the symbols are loaded only when a token isn't a currency
+    code, and that the codes resolve the same way before and after
+    '''
+    shutil.copy('txt/symbols.txt', str(tmpdir.join('symbols.txt')))
+    converter = CurrencyConverter(
+        symbols_file=str(tmpdir.join('symbols.txt')))
+    assert converter._symbols is None
+    before = [converter._check_input_currency(currency)
+              for currency in converter.available_currencies]
+    assert converter._check_output_currency('EUR', 'usd') == ('USD',)
+    assert converter._symbols is None
+    assert 'USD' in converter._check_output_currency(None, '$')
+    assert converter._symbols
+    after = [converter._check_input_currency(currency)
+             for currency in converter.available_currencies]
+    assert before == after == converter.available_currencies
@@ -0,0 +1,61 @@
+'''
+Created on 18. 10. 2026
+
+@author: patex1987
+
+This module contains the vectorized counterpart of
+`CurrencyConverter._calculate_output_amount`
+- Amounts are multiplied by their conversion rates and rounded to 2 decimal
+places (ROUND_HALF_UP) with numpy, without creating Decimal objects
+- Products close to a half cent are rounded by the exact integer arithmetic
+of `fixed_point`
+- The results are exactly the same as the results of the Decimal calculation
+
+Google style documentation is used in this file. See guideline here:
+http://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+'''
+
+import numpy as np
+import fixed_point
+
+
+def round_amounts(input_amounts,
+                  conversion_rates,
+                  exponent=fixed_point.AMOUNT_EXPONENT):
+    '''Calculates the output amounts for arrays of amounts and rates
+
+    Vectorized version of `CurrencyConverter._calculate_output_amount`. The
+    products are calculated and rounded in floats. Only the products lying
+    (almost) exactly on a half-cent, where the float rounding could differ
+    from the exact decimal rounding, are recalculated one by one (see
+    `fixed_point.calculate_exact_amount`).
+
+    Args:
+        input_amounts (:obj:`numpy.ndarray`): amounts to be converted
+        conversion_rates (:obj:`numpy.ndarray`): conversion rates, the same
+            shape as `input_amounts` (or a scalar)
+        exponent (int): number of decimal places of the output amounts
+
+    Returns:
+        :obj:`numpy.ndarray`: converted output amounts (float64)
+    '''
+    input_amounts = np.asarray(input_amounts, dtype=np.float64)
+    conversion_rates = np.asarray(conversion_rates, dtype=np.float64)
+    scale = 10.0 ** exponent
+    cents = input_amounts * conversion_rates * scale
+    abs_cents = np.abs(cents)
+    whole_cents = np.floor(abs_cents)
+    fraction = abs_cents - whole_cents
+    rounded = np.where(fraction >= 0.5, whole_cents + 1.0, whole_cents)
+    output_amounts = np.copysign(rounded, cents) / scale
+    with np.errstate(invalid='ignore'):
+        ambiguous = ((np.abs(fraction - 0.5) <=
+                      fixed_point.TIE_MARGIN * abs_cents) |
+                     (abs_cents >= fixed_point.MAX_EXACT_FLOAT))
+    ambiguous &= np.isfinite(cents)
+    if ambiguous.any():
+        amounts, rates = np.broadcast_arrays(input_amounts, conversion_rates)
+        for position in zip(*np.nonzero(ambiguous)):
+            output_amounts[position] = fixed_point.calculate_exact_amount(
+                float(amounts[position]), float(rates[position]), exponent)
+    return output_amounts